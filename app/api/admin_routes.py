@@ -0,0 +1,115 @@
+"""
+API routes for index maintenance.
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Optional
+import hmac
+import logging
+
+from app.core.document_store import get_document_store_async
+from app.core.maintenance import MaintenanceInProgressError, check_index, compact_index
+from app.core.snapshots import SnapshotStore, snapshot_document_store
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Reject the request unless it carries the configured admin_token (when one is set)."""
+    token = get_app_config()["admin_token"]
+    if token and not hmac.compare_digest(x_admin_token or "", token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token header")
+
+# Create router
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+class CompactRequest(BaseModel):
+    """Index compaction request model."""
+    rebuild: bool = True
+    vacuum: bool = True
+    clean_orphans: bool = True
+    remove_missing: bool = False
+    quantization: Optional[str] = None
+    dry_run: bool = False
+
+class SnapshotRequest(BaseModel):
+    """Snapshot request model."""
+    name: Optional[str] = None
+
+@router.get("/admin/index/check")
+async def check():
+    """
+    Check that the document metadata and the vector index agree.
+
+    Returns:
+        The consistency report (see app.core.maintenance.check_index)
+    """
+    document_store = await get_document_store_async()
+    return await run_in_threadpool(check_index, document_store)
+
+@router.post("/admin/index/compact")
+async def compact(request: CompactRequest):
+    """
+    Compact the persisted index: remove orphaned chunks, rebuild the collections and vacuum.
+
+    Searches keep working while it runs; uploads and deletions wait for it.
+
+    Args:
+        request: Which steps to run, an optional new quantization for the
+            local index, and whether to only report what would be done
+
+    Returns:
+        The consistency report taken first, what was done, and the disk usage
+        before and after
+    """
+    document_store = await get_document_store_async()
+    try:
+        return await run_in_threadpool(
+            compact_index,
+            document_store,
+            request.rebuild,
+            request.vacuum,
+            request.clean_orphans,
+            request.remove_missing,
+            request.quantization,
+            request.dry_run,
+        )
+    except MaintenanceInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Index compaction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Index compaction failed: {str(e)}")
+
+@router.get("/admin/snapshots")
+async def list_snapshots():
+    """List the snapshots in snapshot_dir, oldest first."""
+    snapshots = SnapshotStore(get_app_config()["snapshot_dir"])
+    return {"snapshots": await run_in_threadpool(snapshots.list)}
+
+@router.post("/admin/snapshots")
+async def create_snapshot(request: SnapshotRequest):
+    """
+    Take an incremental snapshot of the persist directory while the service runs.
+
+    Uploads and deletions wait until it is taken; searches and conversations
+    continue. Restore snapshots with ``python -m app.cli restore``.
+
+    Args:
+        request: Optional snapshot name (defaults to the UTC time)
+
+    Returns:
+        The snapshot name, files, bytes, new bytes stored and seconds taken
+    """
+    document_store = await get_document_store_async()
+    snapshots = SnapshotStore(get_app_config()["snapshot_dir"])
+    try:
+        return await run_in_threadpool(snapshot_document_store, document_store, snapshots, request.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Snapshot failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Snapshot failed: {str(e)}")
@@ -3,18 +3,25 @@ API routes for configuration management.
 """
 import os
 import json
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-from app.utils.config import get_app_config
+from app.utils.config import get_app_config, get_ollama_base_urls
 from app.utils.env import get_settings, find_settings_file
-from app.core.ollama_models import get_ollama_models
+from app.core.keep_alive import prewarm_model_async
+from app.core.ollama_models import get_available_models
+from app.core.warmup import is_ready, readiness_report
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Background tasks started by requests (kept referenced until they finish)
+_background_tasks = set()
+
 class ConfigSettings(BaseModel):
     """Configuration settings model."""
     ollama_base_url: str
@@ -28,6 +35,7 @@ class HealthResponse(BaseModel):
     """Health check response model."""
     status: str
     model: str
+    ready: bool
 
 class ModelsResponse(BaseModel):
     """Models list response model."""
@@ -79,8 +87,22 @@ async def update_config(config: ConfigSettings):
         for key, value in config_dict.items():
             os.environ[key.upper()] = str(value)
         
-        # Write updated settings to file
-        write_settings_file(config_dict)
+        # Write updated settings to file, keeping settings not edited from the UI
+        settings = read_settings_file()
+        model_changed = (
+            settings.get("ollama_model") != config_dict["ollama_model"]
+            or settings.get("ollama_base_url") != config_dict["ollama_base_url"]
+        )
+        settings.update(config_dict)
+        write_settings_file(settings)
+        
+        # Load the newly selected model so the next question does not wait for it
+        if model_changed and get_app_config()["ollama_prewarm"]:
+            task = asyncio.create_task(
+                prewarm_model_async(config_dict["ollama_model"], get_ollama_base_urls(get_app_config()))
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
         
         return {"status": "success", "message": "Configuration updated successfully"}
     except Exception as e:
@@ -94,20 +116,39 @@ async def health_check():
         config = read_settings_file()
         return {
             "status": "ok",
-            "model": config["ollama_model"]
+            "model": config["ollama_model"],
+            "ready": is_ready()
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 200 once startup warm-up has finished, 503 before."""
+    report = readiness_report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @router.get("/models", response_model=ModelsResponse)
 async def get_models():
-    """Get list of available models from Ollama server."""
+    """Get list of available models from the Ollama servers (cached briefly)."""
     try:
-        config = read_settings_file()
-        base_url = config.get("ollama_base_url", "http://localhost:11434/")
-        models = get_ollama_models(base_url)
+        models = await get_available_models(get_ollama_base_urls(get_app_config()))
         return {"models": models}
     except Exception as e:
         logger.error(f"Error fetching models from Ollama: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching models from Ollama: {str(e)}")
+
+@router.post("/models/prewarm")
+async def prewarm_models():
+    """Load the configured model on every Ollama server (e.g. from a scheduled job)."""
+    config = get_app_config()
+    results = await prewarm_model_async(config["ollama_model"], get_ollama_base_urls(config))
+    if not any(results.values()):
+        raise HTTPException(status_code=503, detail=f"Could not load model {config['ollama_model']} on any Ollama server")
+    return {"model": config["ollama_model"], "servers": results}
@@ -1,29 +1,30 @@
 """
 API routes for document upload and management.
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 import logging
 
-from app.core.document_store import DocumentStore
+from app.core.document_store import get_document_store_async
+from app.core.extractors import supported_file_types
+from app.core.index_router import collection_for_group
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize document store
-document_store = DocumentStore()
-
 # Create router
 router = APIRouter(tags=["documents"])
 
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...), group: Optional[str] = Form(None)):
     """
     Upload a document to the system.
     
     Args:
-        file: The file to upload (PDF or TXT)
+        file: The file to upload (PDF, TXT, Markdown, HTML or DOCX)
+        group: Optional document group (e.g. a tenant); each group is indexed
+            in its own collection
         
     Returns:
         document_id: The ID of the uploaded document
@@ -35,19 +36,25 @@ async def upload_document(file: UploadFile = File(...)):
     filename = file.filename or "unknown_file"
     file_extension = filename.split(".")[-1].lower() if filename and "." in filename else ""
     
-    if file_extension not in ["pdf", "txt"]:
+    if file_extension not in supported_file_types():
         logger.warning(f"Unsupported file type: {file_extension}")
         raise HTTPException(
             status_code=400,
-            detail="Only PDF and TXT files are supported"
+            detail=f"Unsupported file type, expected one of: {', '.join(supported_file_types())}"
         )
+    try:
+        collection_for_group(group)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
         # Add document to store
+        document_store = await get_document_store_async()
         document_id = await document_store.add_document(
             file_content=content,
             file_name=filename,
-            file_type=file_extension
+            file_type=file_extension,
+            group=group
         )
         
         logger.info(f"Document uploaded successfully: {filename} (id: {document_id})")
@@ -64,6 +71,7 @@ async def upload_document(file: UploadFile = File(...)):
 async def list_documents():
     """List all uploaded documents."""
     try:
+        document_store = await get_document_store_async()
         documents = document_store.list_documents()
         logger.info(f"Retrieved list of {len(documents)} documents")
         return documents
@@ -85,6 +93,7 @@ async def get_document_stats():
     """
     try:
         # Get document metadata dictionary
+        document_store = await get_document_store_async()
         documents_metadata = document_store.list_documents()
         
         # Calculate total size (this is an estimate based on stored metadata)
@@ -123,6 +132,7 @@ async def delete_document(document_id: str):
         success: Whether the document was successfully deleted
     """
     try:
+        document_store = await get_document_store_async()
         success = document_store.delete_document(document_id)
         if success:
             logger.info(f"Document deleted successfully: {document_id}")
@@ -2,30 +2,58 @@
 API routes for question answering.
 """
 from fastapi import APIRouter, Form, HTTPException
-from langchain.chains import ConversationalRetrievalChain
-from typing import List, Optional, Dict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import AsyncIterator, List, Optional, Dict, Tuple
+from uuid import uuid4
+import asyncio
+import json
 import logging
 
-from app.core.document_store import DocumentStore
-from app.core.llm import get_llm
-from app.core.memory_store import get_or_create_memory, get_memory, list_conversation_ids, save_conversations
+from app.core.callbacks import QAMetricsCallbackHandler
+from app.core.document_store import get_document_store_async
+from app.core.ollama_pool import OllamaUnavailableError
+from app.core.condense import condense_question
+from app.core.prompting import QA_PROMPT, build_answer_prompt, build_retriever
+from app.core.reasoning import split_reasoning
+from app.core.metrics import QA_STAGE_DURATION, RETRIEVAL_HITS
+from app.core.scheduler import PRIORITY_BATCH, QueueFullError, SchedulerRejected, get_scheduler
+from app.core.tracing import RequestTrace
+from app.core.memory_store import get_or_create_memory, get_memory, list_conversation_ids, save_messages
 from app.utils.language import format_text_for_direction , is_arabic_text
 from app.utils.config import get_app_config
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize document store
-document_store = DocumentStore()
-
 # Create router
 router = APIRouter(tags=["qa"])
 
+# Times a batch question is retried after the LLM queue rejected it
+BATCH_MAX_ATTEMPTS = 3
+
+class BatchQuestions(BaseModel):
+    """Batch question answering request model."""
+    questions: List[str]
+    document_ids: Optional[List[str]] = None
+
+def _format_sources(documents) -> List[Dict]:
+    """Format source documents for a response."""
+    return [
+        {
+            "content": doc.page_content,
+            "metadata": doc.metadata
+        }
+        for doc in documents
+    ]
+
 @router.post("/ask")
 async def ask_question(
     question: str = Form(...),
     document_ids: Optional[List[str]] = Form(None),
     conversation_id: Optional[str] = Form(None),
+    debug: bool = Form(False),
 ):
     """
     Ask a question about the uploaded documents.
@@ -34,9 +62,11 @@ async def ask_question(
         question: The question to ask
         document_ids: Optional list of specific document IDs to query
         conversation_id: Optional conversation ID for maintaining context
+        debug: Include a per-stage timing breakdown and token counts in the response
     
     Returns:
-        The answer to the question
+        The answer to the question; the thinking of reasoning models is
+        returned separately in "reasoning"
     """
     logger.info(f"Question received: '{question}'")
     if document_ids:
@@ -44,24 +74,35 @@ async def ask_question(
     if conversation_id:
         logger.info(f"Using conversation ID: {conversation_id}")
     
+    trace = RequestTrace()
     try:
         # Initialize or get conversation memory
-        memory, conversation_id = get_or_create_memory(conversation_id)
+        with trace.stage("memory_load"):
+            memory, conversation_id = get_or_create_memory(conversation_id)
+            history_length = len(memory.chat_memory.messages)
         
         # Get retriever for the specified documents
-        retriever = document_store.get_retriever(document_ids)
+        document_store = await get_document_store_async()
+        # Chunks are passed to the prompt in document order, so follow-up
+        # prompts share their prefix and Ollama can reuse its prompt cache
+        retriever = build_retriever(document_store.get_retriever(document_ids))
         
+        # Imported on first use: LangChain's chain and LLM modules take seconds to import
+        from langchain.chains import ConversationalRetrievalChain
+        from app.core.llm import get_llm
+
         # Initialize LLM
         llm = get_llm()
         
-        # Create conversational chain
+        # Create conversational chain. The memory is not attached to the chain:
+        # only the final answer, without the model's reasoning, is kept in it
         qa_chain = ConversationalRetrievalChain.from_llm(
             llm=llm,
             retriever=retriever,
-            memory=memory,
+            combine_docs_chain_kwargs={"prompt": QA_PROMPT},
             return_source_documents=True,
             return_generated_question=False,
-            output_key="answer"  # Specify which output key to use for memory
+            output_key="answer"
         )
         
         # Get answer
@@ -71,41 +112,59 @@ async def ask_question(
         
         # Always use single input mode, as system_template is removed
         logger.info(f"Using single input mode (model: {current_model})")
-        result = qa_chain.invoke({"question": question})
+        async with get_scheduler().slot(conversation_id) as waited:
+            trace.add("queue_wait", waited)
+            result, standalone_question, condense_decision = await _run_chain(
+                qa_chain, question, memory.chat_memory.messages, trace, conversation_id
+            )
         
-        # Extract answer and sources
-        answer = result["answer"]
+        # Extract answer and sources, separating reasoning models' thinking from the answer
+        reasoning, answer = split_reasoning(result["answer"])
         
         # Format answer according to language direction
         formatted_answer = format_text_for_direction(answer)
         
-        # Save conversations after successful interaction
-        save_conversations()
+        # Save the new turn after successful interaction
+        with trace.stage("persistence"):
+            memory.chat_memory.add_user_message(question)
+            memory.chat_memory.add_ai_message(answer)
+            save_messages(conversation_id, memory.chat_memory.messages[history_length:])
         logger.info(f"Conversation {conversation_id} saved after new interaction.")
 
         # Extract and format source documents
-        sources = []
-        for doc in result.get("source_documents", []):
-            source = {
-                "content": doc.page_content,
-                "metadata": doc.metadata
-            }
-            sources.append(source)
+        sources = _format_sources(result.get("source_documents", []))
         
         logger.info(f"Answer generated with {len(sources)} source references")
+        QA_STAGE_DURATION.observe(trace.elapsed(), stage="total")
+        if debug:
+            logger.info(f"Timing breakdown: {trace.to_dict()}")
         
         # Determine text direction based on the content of the answer
         
         # Check if the formatted answer contains Arabic text
         is_rtl = is_arabic_text(formatted_answer)
         
-        return {
+        response = {
             "answer": formatted_answer,
+            "reasoning": reasoning,
             "sources": sources,
             "conversation_id": conversation_id,
             "direction": "rtl" if is_rtl else "ltr"
         }
+        if debug:
+            response["debug"] = trace.to_dict()
+            response["debug"]["condense"] = {"decision": condense_decision, "question": standalone_question}
+        return response
         
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=429 if isinstance(e, QueueFullError) else 503,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+    except OllamaUnavailableError as e:
+        logger.error(f"Failed to answer question: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to answer question: {str(e)}")
         raise HTTPException(
@@ -113,6 +172,136 @@ async def ask_question(
             detail=f"Failed to answer question: {str(e)}"
         )
 
+async def _run_chain(qa_chain, question: str, chat_history: List, trace: Optional[RequestTrace] = None,
+                     conversation_id: Optional[str] = None) -> Tuple[dict, str, str]:
+    """
+    Run the blocking QA chain in the thread pool with stage metrics.
+
+    A follow-up question is first rewritten into a standalone question when
+    the condense policy requires it (see app.core.condense); the chain itself
+    is then run without chat history, so it never makes that LLM call.
+
+    Callers hold an LLM scheduler slot, so the number of chains running
+    at once (and threads used) is bounded by llm_max_in_flight.
+
+    Returns:
+        Tuple of (chain result, standalone question, condense decision)
+    """
+    handler = QAMetricsCallbackHandler(trace, prefix_key=conversation_id)
+    standalone_question, decision = await run_in_threadpool(
+        condense_question, question, list(chat_history), callbacks=[handler]
+    )
+    result = await run_in_threadpool(
+        qa_chain.invoke, {"question": standalone_question, "chat_history": []}, config={"callbacks": [handler]}
+    )
+    return result, standalone_question, decision
+
+@router.post("/ask/batch")
+async def ask_batch(batch: BatchQuestions):
+    """
+    Answer many independent questions about the same documents.
+
+    All questions are embedded in one batch and retrieved with a single vector
+    query. Answers are generated concurrently, at batch priority so
+    interactive questions go first, and streamed back as NDJSON lines in the
+    order they complete.
+
+    Args:
+        batch: The questions and optional document IDs to query
+
+    Returns:
+        An application/x-ndjson stream with one line per question: its index,
+        question, answer, reasoning, sources and direction, or an error
+    """
+    questions = batch.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    max_questions = get_app_config()["batch_max_questions"]
+    if len(questions) > max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {max_questions} questions can be sent in one batch"
+        )
+    logger.info(f"Batch of {len(questions)} questions received")
+
+    try:
+        document_store = await get_document_store_async()
+        with QA_STAGE_DURATION.time(stage="batch_retrieval"):
+            results = await run_in_threadpool(document_store.search_many, questions, batch.document_ids)
+        from app.core.llm import get_llm
+        llm = get_llm()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to prepare question batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to answer questions: {str(e)}")
+
+    documents = [[doc for doc, _ in hits] for hits in results]
+    for hits in documents:
+        RETRIEVAL_HITS.observe(len(hits))
+    return StreamingResponse(
+        _stream_batch(llm, questions, documents),
+        media_type="application/x-ndjson"
+    )
+
+async def _stream_batch(llm, questions: List[str], documents: List[List]) -> AsyncIterator[str]:
+    """
+    Answer a batch of questions and yield NDJSON lines as answers complete.
+
+    At most llm_max_in_flight questions of the batch are queued for the LLM
+    at once, so a large batch never fills the scheduler queue.
+    """
+    batch_id = f"batch-{uuid4()}"
+    semaphore = asyncio.Semaphore(max(1, get_app_config()["llm_max_in_flight"]))
+
+    async def answer(index: int) -> Dict:
+        async with semaphore:
+            return await _answer_batch_question(llm, index, questions[index], documents[index], batch_id)
+
+    tasks = [asyncio.create_task(answer(index)) for index in range(len(questions))]
+    try:
+        for next_answer in asyncio.as_completed(tasks):
+            yield json.dumps(await next_answer, ensure_ascii=False) + "\n"
+    finally:
+        # The client went away (or the batch finished): stop pending questions
+        for task in tasks:
+            task.cancel()
+
+async def _answer_batch_question(llm, index: int, question: str, documents: List, batch_id: str) -> Dict:
+    """Generate the answer to one batch question from its retrieved chunks."""
+    try:
+        for attempt in range(1, BATCH_MAX_ATTEMPTS + 1):
+            try:
+                # The whole batch counts as one conversation for fair scheduling
+                async with get_scheduler().slot(batch_id, priority=PRIORITY_BATCH):
+                    raw_answer = await run_in_threadpool(_generate_answer, llm, question, documents)
+                break
+            except SchedulerRejected as e:
+                if attempt == BATCH_MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+        reasoning, answer = split_reasoning(raw_answer)
+        formatted_answer = format_text_for_direction(answer)
+        return {
+            "index": index,
+            "question": question,
+            "answer": formatted_answer,
+            "reasoning": reasoning,
+            "sources": _format_sources(documents),
+            "direction": "rtl" if is_arabic_text(formatted_answer) else "ltr"
+        }
+    except Exception as e:
+        logger.error(f"Failed to answer batch question {index}: {str(e)}")
+        return {"index": index, "question": question, "error": str(e)}
+
+def _generate_answer(llm, question: str, documents: List) -> str:
+    """Run one answer generation (blocking) with stage metrics."""
+    handler = QAMetricsCallbackHandler()
+    # Retrieval already happened for the whole batch: the LLM call is the generate stage
+    handler.retrieval_done = True
+    return llm.invoke(build_answer_prompt(question, documents), config={"callbacks": [handler]})
+
 @router.get("/conversation/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """
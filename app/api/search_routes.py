@@ -0,0 +1,122 @@
+"""
+API routes for retrieval-only search.
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.document_store import get_document_store_async
+from app.core.metrics import QA_STAGE_DURATION
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter(tags=["search"])
+
+# Deepest result a query can page to (offset + top_k)
+MAX_RESULTS_PER_QUERY = 1000
+
+class SearchRequest(BaseModel):
+    """Search request model."""
+    query: Optional[str] = None
+    queries: Optional[List[str]] = None
+    document_ids: Optional[List[str]] = None
+    filters: Optional[Dict[str, Any]] = None
+    top_k: int = 10
+    offset: int = 0
+    min_score: Optional[float] = None
+    include_content: bool = True
+
+@router.post("/search")
+async def search(request: SearchRequest):
+    """
+    Search the indexed chunks without generating an answer.
+
+    Several queries can be sent at once: they are embedded in one batch and
+    searched with a single vector query.
+
+    Args:
+        request: The query or queries, optional document IDs, a Chroma
+            metadata filter (e.g. {"file_name": "a.pdf"}), and paging
+            (top_k results per page starting at offset)
+
+    Returns:
+        One result set per query: ranked chunks with their ID, relevance
+        score (higher is closer), distance, metadata and content, and
+        whether more results follow
+    """
+    queries = list(request.queries or [])
+    if request.query:
+        queries.insert(0, request.query)
+    if not queries:
+        raise HTTPException(status_code=400, detail="No query given")
+    max_queries = get_app_config()["batch_max_questions"]
+    if len(queries) > max_queries:
+        raise HTTPException(status_code=413, detail=f"At most {max_queries} queries can be sent at once")
+    if request.top_k < 1 or request.offset < 0:
+        raise HTTPException(status_code=400, detail="top_k must be positive and offset must not be negative")
+    if request.offset + request.top_k > MAX_RESULTS_PER_QUERY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Results beyond the first {MAX_RESULTS_PER_QUERY} per query cannot be requested"
+        )
+
+    try:
+        document_store = await get_document_store_async()
+        relevance = document_store.relevance_score_fn()
+        # One extra result tells whether another page follows
+        wanted = request.offset + request.top_k + 1
+        k = wanted
+        with QA_STAGE_DURATION.time(stage="search"):
+            while True:
+                results = await run_in_threadpool(
+                    document_store.search_many, queries, request.document_ids, k, request.filters
+                )
+                # Results below min_score do not count: search deeper until a query has
+                # enough that pass, runs out of chunks, or reaches the depth limit
+                if request.min_score is None or k > MAX_RESULTS_PER_QUERY or not any(
+                    len(hits) == k
+                    and sum(relevance(distance) >= request.min_score for _, distance in hits) < wanted
+                    for hits in results
+                ):
+                    break
+                k = min(2 * k, MAX_RESULTS_PER_QUERY + 1)
+    except ValueError as e:
+        logger.warning(f"Invalid search request: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Invalid search request: {str(e)}")
+    except Exception as e:
+        logger.error(f"Search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    response = []
+    for query, hits in zip(queries, results):
+        # Filtered before paging: scores need not fall with rank (boilerplate demotion
+        # reorders hits), and has_more must only announce results that pass min_score
+        scored = [(doc, distance, relevance(distance)) for doc, distance in hits]
+        if request.min_score is not None:
+            scored = [hit for hit in scored if hit[2] >= request.min_score]
+        page = scored[request.offset:request.offset + request.top_k]
+        matches = []
+        for rank, (doc, distance, score) in enumerate(page, start=request.offset + 1):
+            match = {
+                "id": doc.id,
+                "rank": rank,
+                "score": score,
+                "distance": distance,
+                "metadata": doc.metadata,
+            }
+            if request.include_content:
+                match["content"] = doc.page_content
+            matches.append(match)
+        response.append({
+            "query": query,
+            "offset": request.offset,
+            "results": matches,
+            "has_more": len(scored) > request.offset + request.top_k,
+        })
+    logger.info(f"Searched {len(queries)} queries")
+    return {"results": response}
@@ -0,0 +1,201 @@
+"""
+Command-line tools for the document store.
+
+Usage:
+    python -m app.cli check                   # compare document metadata with the vector index
+    python -m app.cli compact                 # remove orphaned chunks, rebuild collections, vacuum
+    python -m app.cli compact --dry-run       # report what compact would do
+    python -m app.cli compact --quantization int8   # also re-quantize the local index
+    python -m app.cli snapshot                # incremental snapshot of the persist directory
+    python -m app.cli snapshots               # list the snapshots
+    python -m app.cli restore latest --target ./replica_db
+    python -m app.cli prune --keep 7          # delete older snapshots and their unused blocks
+    python -m app.cli export ./corpus         # chunks, metadata and vectors of every document
+    python -m app.cli import ./corpus         # bulk-load an export without re-embedding
+    python -m app.cli duplicates              # report duplicate and near-duplicate chunks
+    python -m app.cli duplicates --register   # also teach the ingestion filter the boilerplate found
+
+The commands except restore can run while the server is up: they take the
+same write lock as uploads and deletions, and searches keep being answered
+meanwhile. Restore into a directory no server is using.
+"""
+import argparse
+import json
+import logging
+import sys
+
+
+def _open_store(persist_directory=None):
+    from app.core.document_store import DocumentStore
+    from app.core.embeddings import LazyEmbeddings
+    # Maintenance never embeds text, so the embedding model is not loaded
+    return DocumentStore(persist_directory=persist_directory, embeddings=LazyEmbeddings())
+
+
+def _print(report: dict) -> None:
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def check(args) -> int:
+    from app.core.maintenance import check_index
+    report = check_index(_open_store(args.persist_dir))
+    _print(report)
+    return 0 if report["consistent"] else 1
+
+
+def compact(args) -> int:
+    from app.core.maintenance import compact_index
+    _print(compact_index(
+        _open_store(args.persist_dir),
+        rebuild=not args.no_rebuild,
+        vacuum=not args.no_vacuum,
+        clean_orphans=not args.keep_orphans,
+        remove_missing=args.remove_missing,
+        quantization=args.quantization,
+        dry_run=args.dry_run,
+    ))
+    return 0
+
+
+def _snapshot_store(args):
+    from app.core.snapshots import SnapshotStore
+    from app.utils.config import get_app_config
+    return SnapshotStore(args.snapshot_dir or get_app_config()["snapshot_dir"])
+
+
+def snapshot(args) -> int:
+    from app.core.snapshots import snapshot_document_store
+    _print(snapshot_document_store(_open_store(args.persist_dir), _snapshot_store(args), args.name))
+    return 0
+
+
+def snapshots(args) -> int:
+    _print({"snapshots": _snapshot_store(args).list()})
+    return 0
+
+
+def restore(args) -> int:
+    from app.utils.config import get_app_config
+    target = args.target or args.persist_dir or get_app_config()["chroma_persist_dir"]
+    try:
+        _print(_snapshot_store(args).restore(args.name, target, force=args.force))
+    except (KeyError, FileExistsError) as e:
+        print(f"Cannot restore: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def prune(args) -> int:
+    _print(_snapshot_store(args).prune(args.keep))
+    return 0
+
+
+def export(args) -> int:
+    from app.core.corpus import export_corpus
+    try:
+        _print(export_corpus(_open_store(args.persist_dir), args.directory, args.documents,
+                             "float16" if args.float16 else "float32"))
+    except (ValueError, FileExistsError) as e:
+        print(f"Cannot export: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def import_(args) -> int:
+    from app.core.corpus import import_corpus
+    try:
+        _print(import_corpus(_open_store(args.persist_dir), args.directory, force=args.force))
+    except ValueError as e:
+        print(f"Cannot import: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def duplicates(args) -> int:
+    from app.core.duplicates import find_duplicates
+    _print(find_duplicates(
+        _open_store(args.persist_dir),
+        threshold=args.threshold,
+        method=args.method,
+        min_documents=args.min_documents,
+        max_clusters=args.max_clusters,
+        register=args.register,
+    ))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the command-line tools."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Document QA Agent tools")
+    parser.add_argument("--persist-dir", help="Persist directory (defaults to chroma_persist_dir)")
+    parser.add_argument("--snapshot-dir", help="Snapshot directory (defaults to snapshot_dir)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_check = commands.add_parser("check", help="Compare document metadata with the vector index")
+    parser_check.set_defaults(handler=check)
+
+    parser_compact = commands.add_parser("compact", help="Compact and vacuum the persisted index")
+    parser_compact.add_argument("--no-rebuild", action="store_true", help="Do not rebuild the collections")
+    parser_compact.add_argument("--no-vacuum", action="store_true", help="Do not vacuum the SQLite databases")
+    parser_compact.add_argument("--keep-orphans", action="store_true",
+                                help="Keep chunks of documents without metadata and unused Chroma data")
+    parser_compact.add_argument("--remove-missing", action="store_true",
+                                help="Delete the metadata of documents that have no chunks")
+    parser_compact.add_argument("--quantization", choices=["none", "int8"],
+                                help="New quantization of the local index collections")
+    parser_compact.add_argument("--dry-run", action="store_true", help="Only report what would be done")
+    parser_compact.set_defaults(handler=compact)
+
+    parser_snapshot = commands.add_parser("snapshot", help="Take an incremental snapshot of the persist directory")
+    parser_snapshot.add_argument("--name", help="Snapshot name (defaults to the UTC time)")
+    parser_snapshot.set_defaults(handler=snapshot)
+
+    parser_snapshots = commands.add_parser("snapshots", help="List the snapshots")
+    parser_snapshots.set_defaults(handler=snapshots)
+
+    parser_restore = commands.add_parser("restore", help="Restore a snapshot (stop the server using the target first)")
+    parser_restore.add_argument("name", help='Snapshot name, or "latest"')
+    parser_restore.add_argument("--target", help="Directory to restore into (defaults to the persist directory)")
+    parser_restore.add_argument("--force", action="store_true",
+                                help="Replace a non-empty target (kept as <target>.before-restore)")
+    parser_restore.set_defaults(handler=restore)
+
+    parser_prune = commands.add_parser("prune", help="Delete all but the newest snapshots")
+    parser_prune.add_argument("--keep", type=int, required=True, help="Number of snapshots to keep")
+    parser_prune.set_defaults(handler=prune)
+
+    parser_export = commands.add_parser("export", help="Export chunks, metadata and vectors for another store")
+    parser_export.add_argument("directory", help="New or empty directory to write the export to")
+    parser_export.add_argument("--documents", nargs="+", help="IDs of the documents to export (defaults to all)")
+    parser_export.add_argument("--float16", action="store_true", help="Store the vectors as float16 (half the size)")
+    parser_export.set_defaults(handler=export)
+
+    parser_import = commands.add_parser("import", help="Bulk-load an export without parsing or embedding")
+    parser_import.add_argument("directory", help="Directory written by export")
+    parser_import.add_argument("--force", action="store_true",
+                               help="Import even if the export was made with another embedding model")
+    parser_import.set_defaults(handler=import_)
+
+    parser_duplicates = commands.add_parser("duplicates", help="Report duplicate and near-duplicate chunks")
+    parser_duplicates.add_argument("--threshold", type=float, default=0.95,
+                                   help="Cosine similarity of near-duplicates (default 0.95)")
+    parser_duplicates.add_argument("--method", choices=["auto", "exact", "lsh"], default="auto",
+                                   help="Compare every pair, or only pairs sharing an LSH bucket (default: auto)")
+    parser_duplicates.add_argument("--min-documents", type=int,
+                                   help="Documents a cluster must span to be boilerplate (default: boilerplate_min_documents)")
+    parser_duplicates.add_argument("--max-clusters", type=int, default=20, help="Largest clusters reported per collection")
+    parser_duplicates.add_argument("--register", action="store_true",
+                                   help="Register the boilerplate texts found for the ingestion filter")
+    parser_duplicates.set_defaults(handler=duplicates)
+    return parser
+
+
+def main(argv=None) -> int:
+    # Logs go to stderr so stdout only carries the JSON report
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s - %(levelname)s - %(message)s")
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
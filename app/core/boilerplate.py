@@ -0,0 +1,116 @@
+"""
+Boilerplate filter module.
+This module recognises boilerplate (page headers and footers, disclaimers and
+other text repeated across documents) during ingestion, before it is embedded.
+
+Two kinds are handled:
+
+- Lines repeated on most pages of a document (headers, footers, page
+  numbers) are removed from the pages before they are split into chunks.
+- Chunks whose text was already seen in ``boilerplate_min_documents``
+  documents, or was registered as boilerplate by the duplicate analysis
+  (``python -m app.cli duplicates --register``), are dropped or demoted.
+
+Texts are compared through fingerprints of their normalized form (case,
+whitespace and digits are ignored, so "Page 3 of 10" matches "Page 4 of 10").
+"""
+from typing import Any, Dict, List, Sequence, Set, Tuple
+import hashlib
+import logging
+import re
+
+from langchain_core.documents import Document
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+BOILERPLATE_MODES = ("off", "drop", "demote")
+
+# Metadata flag of the boilerplate chunks kept by the "demote" mode
+BOILERPLATE_KEY = "boilerplate"
+
+# Documents need this many pages before their repeated lines count as headers or footers
+MIN_PAGES = 3
+
+_DIGITS = re.compile(r"\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase a text, replace numbers with 0 and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _DIGITS.sub("0", text.lower())).strip()
+
+
+def fingerprint(text: str) -> str:
+    """Fingerprint of a text's normalized form (16 hex characters)."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def strip_repeated_lines(pages: List[Document], min_ratio: float = 0.5) -> Tuple[List[Document], int]:
+    """
+    Remove the lines that repeat on most pages of a document.
+
+    Args:
+        pages: Loaded pages of one document (changed in place)
+        min_ratio: Share of the pages a line must appear on to be removed
+
+    Returns:
+        The pages and the number of lines removed
+    """
+    if len(pages) < MIN_PAGES:
+        return pages, 0
+    page_counts: Dict[str, int] = {}
+    for page in pages:
+        for line in {normalize_text(line) for line in page.page_content.splitlines()}:
+            if line:
+                page_counts[line] = page_counts.get(line, 0) + 1
+    repeated = {line for line, count in page_counts.items() if count >= max(2, min_ratio * len(pages))}
+    if not repeated:
+        return pages, 0
+    removed = 0
+    for page in pages:
+        lines = page.page_content.splitlines()
+        kept = [line for line in lines if normalize_text(line) not in repeated]
+        removed += len(lines) - len(kept)
+        page.page_content = "\n".join(kept)
+    return pages, removed
+
+
+def filter_chunks(chunks: List[Document], fingerprints: Sequence[str], boilerplate: Set[str],
+                  mode: str) -> Tuple[List[Document], int]:
+    """
+    Drop or flag the chunks whose fingerprint is boilerplate.
+
+    Args:
+        chunks: Chunks of a document
+        fingerprints: Fingerprint of each chunk
+        boilerplate: Fingerprints that are boilerplate
+        mode: "drop" removes the chunks, "demote" flags them in their metadata
+
+    Returns:
+        The remaining chunks and the number of boilerplate chunks
+    """
+    kept = []
+    found = 0
+    for chunk, chunk_fingerprint in zip(chunks, fingerprints):
+        if chunk_fingerprint not in boilerplate:
+            kept.append(chunk)
+            continue
+        found += 1
+        if mode == "demote":
+            chunk.metadata[BOILERPLATE_KEY] = True
+            kept.append(chunk)
+    return kept, found
+
+
+def demote_boilerplate(results: List[List[Tuple[Document, Any]]], k: int) -> List[List[Tuple[Document, Any]]]:
+    """
+    Move boilerplate chunks behind the other hits of each query and keep k.
+
+    Search k * 2 chunks first, so boilerplate is only returned when there are
+    not enough other hits.
+    """
+    return [
+        sorted(hits, key=lambda hit: bool(hit[0].metadata.get(BOILERPLATE_KEY)))[:k]
+        for hits in results
+    ]
@@ -0,0 +1,137 @@
+"""
+LangChain callback handlers.
+This module provides callbacks that record per-stage latency and token metrics
+while a question answering chain runs.
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import time
+import logging
+
+from app.core.metrics import (
+    QA_STAGE_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_PROMPT_TOKENS,
+    LLM_GENERATED_TOKENS,
+    LLM_TOKENS_PER_SECOND,
+    LLM_IN_FLIGHT,
+    RETRIEVAL_HITS,
+)
+from app.core.prompting import prefix_tracker
+from app.core.tracing import RequestTrace
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class QAMetricsCallbackHandler(BaseCallbackHandler):
+    """Record stage timings and token counts for one question answering run.
+
+    LLM calls made before the retriever runs are attributed to the
+    ``condense`` stage (rewriting a follow-up question with chat history),
+    calls made after it to the ``generate`` stage.
+
+    When a RequestTrace is given, the same timings are added to it as
+    ``condense``, ``retrieval``, ``prompt_build``, ``llm_first_token`` and
+    ``llm_total`` together with the generation's token counts.
+
+    When a prefix_key is given, each answer prompt is compared with the
+    previous one under the same key to report prompt prefix reuse.
+    """
+
+    def __init__(self, trace: Optional[RequestTrace] = None, prefix_key: Optional[str] = None):
+        self.trace = trace
+        self.prefix_key = prefix_key
+        self._llm_runs: Dict[UUID, Dict[str, Any]] = {}
+        self._retriever_starts: Dict[UUID, float] = {}
+        self._retrieval_end: Optional[float] = None
+        self.retrieval_done = False
+
+    def _trace(self, stage: str, seconds: float) -> None:
+        if self.trace is not None:
+            self.trace.add(stage, seconds)
+
+    def _llm_stage(self) -> str:
+        return "generate" if self.retrieval_done else "condense"
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._retriever_starts[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        start = self._retriever_starts.pop(run_id, None)
+        if start is not None:
+            QA_STAGE_DURATION.observe(now - start, stage="retrieval")
+            self._trace("retrieval", now - start)
+        RETRIEVAL_HITS.observe(len(documents))
+        self._retrieval_end = now
+        self.retrieval_done = True
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._retriever_starts.pop(run_id, None)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        now = time.perf_counter()
+        stage = self._llm_stage()
+        if stage == "generate" and self._retrieval_end is not None:
+            # Time spent formatting retrieved chunks into the answer prompt
+            QA_STAGE_DURATION.observe(now - self._retrieval_end, stage="prompt_build")
+            self._trace("prompt_build", now - self._retrieval_end)
+            self._retrieval_end = None
+        if stage == "generate" and self.prefix_key and prompts:
+            reuse = prefix_tracker.observe(self.prefix_key, prompts[0])
+            if self.trace is not None:
+                self.trace.prompt_prefix_reuse = reuse
+        self._llm_runs[run_id] = {
+            "stage": stage,
+            "start": now,
+            "first_token": None,
+        }
+        LLM_IN_FLIGHT.inc()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+            LLM_TIME_TO_FIRST_TOKEN.observe(run["first_token"] - run["start"], stage=run["stage"])
+            if run["stage"] == "generate":
+                self._trace("llm_first_token", run["first_token"] - run["start"])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        LLM_IN_FLIGHT.dec()
+        stage = run["stage"]
+        elapsed = time.perf_counter() - run["start"]
+        QA_STAGE_DURATION.observe(elapsed, stage=stage)
+        self._trace("llm_total" if stage == "generate" else "condense", elapsed)
+
+        # Ollama reports token counts and durations on the final chunk
+        info = _generation_info(response)
+        prompt_tokens = info.get("prompt_eval_count")
+        generated_tokens = info.get("eval_count")
+        eval_duration = info.get("eval_duration")
+        if prompt_tokens is not None:
+            LLM_PROMPT_TOKENS.observe(prompt_tokens, stage=stage)
+        if generated_tokens is not None:
+            LLM_GENERATED_TOKENS.observe(generated_tokens, stage=stage)
+            if eval_duration:
+                # eval_duration is reported in nanoseconds
+                LLM_TOKENS_PER_SECOND.observe(generated_tokens / (eval_duration / 1e9), stage=stage)
+        if self.trace is not None and stage == "generate":
+            self.trace.prompt_tokens = prompt_tokens
+            self.trace.generated_tokens = generated_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if self._llm_runs.pop(run_id, None) is not None:
+            LLM_IN_FLIGHT.dec()
+
+
+def _generation_info(response) -> Dict[str, Any]:
+    """Return the generation_info of the first generation in an LLMResult."""
+    try:
+        return response.generations[0][0].generation_info or {}
+    except (AttributeError, IndexError):
+        return {}
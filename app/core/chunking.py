@@ -0,0 +1,277 @@
+"""
+Document chunking module.
+This module splits loaded documents into chunks using configurable, language-aware strategies.
+
+Chunk sizes are measured in tokens by default so that a chunk fits the embedding
+model's input window regardless of language: Arabic text produces far more
+tokens per character than English, so a fixed character size either truncates
+Arabic chunks or wastes space on English ones.
+"""
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import json
+import logging
+import math
+import re
+import threading
+
+from app.utils.config import get_app_config
+
+if TYPE_CHECKING:
+    from langchain_text_splitters import TextSplitter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Separators tried in order: paragraphs, lines, sentences (English and Arabic
+# terminators), clauses (including the Arabic comma and semicolon), words, characters
+BOUNDARY_SEPARATORS = [
+    r"\n\s*\n",
+    r"\n",
+    r"(?<=[.!?\u061F\u06D4])\s+",
+    r"(?<=[,;:\u060C\u061B])\s+",
+    r"\s+",
+    "",
+]
+
+# Separators for fixed-size windows that ignore sentence structure
+FIXED_SEPARATORS = [r"\s+", ""]
+
+ARABIC_CHARS = re.compile("[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]")
+TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+DEFAULT_PROFILE = {
+    "strategy": "recursive",
+    "chunk_size": 200,
+    "chunk_overlap": 20,
+    "length_unit": "tokens",
+    "tokenizer": "approximate",
+}
+
+TokenCounter = Callable[[str], int]
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Estimate the number of WordPiece tokens in a text without loading a tokenizer.
+
+    Latin words are counted as one token per ~6 characters and Arabic words as
+    one token per ~2 characters, which tracks the all-MiniLM-L6-v2 tokenizer closely
+    enough for sizing chunks. Punctuation marks count as one token each.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count
+    """
+    count = 0
+    for piece in TOKEN_PIECES.findall(text):
+        if ARABIC_CHARS.search(piece):
+            count += math.ceil(len(piece) / 2)
+        else:
+            count += math.ceil(len(piece) / 6)
+    return count
+
+
+_embedding_tokenizer = None
+_embedding_tokenizer_lock = threading.Lock()
+
+
+def _embedding_token_count(text: str) -> int:
+    """Count tokens with the embedding model's own tokenizer."""
+    return len(_embedding_tokenizer.encode(text, add_special_tokens=False))
+
+
+def get_token_counter(name: str = "approximate") -> TokenCounter:
+    """
+    Get a token counting function.
+
+    Args:
+        name: "approximate" for the regex estimate, or "embedding" to use the
+              embedding model's tokenizer (falls back to the estimate if it
+              cannot be loaded)
+
+    Returns:
+        A function returning the number of tokens in a text
+    """
+    global _embedding_tokenizer
+    if name == "embedding":
+        with _embedding_tokenizer_lock:
+            if _embedding_tokenizer is None:
+                try:
+                    from transformers import AutoTokenizer
+                    from app.core.embeddings import DEFAULT_EMBEDDING_MODEL
+                    _embedding_tokenizer = AutoTokenizer.from_pretrained(
+                        f"sentence-transformers/{DEFAULT_EMBEDDING_MODEL}"
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not load embedding tokenizer, using approximate token counts: {str(e)}")
+                    return approximate_token_count
+        return _embedding_token_count
+    if name != "approximate":
+        raise ValueError(f"Unknown tokenizer: {name}")
+    return approximate_token_count
+
+
+def _length_function(profile: Dict[str, Any]) -> Callable[[str], int]:
+    unit = profile.get("length_unit", "tokens")
+    if unit == "characters":
+        return len
+    if unit == "tokens":
+        return get_token_counter(profile.get("tokenizer", "approximate"))
+    raise ValueError(f"Unknown chunk length unit: {unit}")
+
+
+# Registry of chunking strategies: name -> factory(profile) -> TextSplitter
+CHUNKING_STRATEGIES: Dict[str, Callable[[Dict[str, Any]], "TextSplitter"]] = {}
+
+
+def register_strategy(name: str):
+    """
+    Register a chunking strategy under the given name.
+
+    The decorated factory receives the resolved profile dictionary and must
+    return a LangChain TextSplitter.
+    """
+    def decorator(factory: Callable[[Dict[str, Any]], "TextSplitter"]):
+        CHUNKING_STRATEGIES[name] = factory
+        return factory
+    return decorator
+
+
+@register_strategy("recursive")
+def _recursive_splitter(profile: Dict[str, Any]) -> "TextSplitter":
+    """Split on paragraph, then sentence, then clause and word boundaries."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        separators=BOUNDARY_SEPARATORS,
+        is_separator_regex=True,
+        keep_separator="end",
+        chunk_size=int(profile["chunk_size"]),
+        chunk_overlap=int(profile["chunk_overlap"]),
+        length_function=_length_function(profile),
+    )
+
+
+@register_strategy("fixed")
+def _fixed_splitter(profile: Dict[str, Any]) -> "TextSplitter":
+    """Split into fixed-size windows on word boundaries, ignoring sentences."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        separators=FIXED_SEPARATORS,
+        is_separator_regex=True,
+        keep_separator="end",
+        chunk_size=int(profile["chunk_size"]),
+        chunk_overlap=int(profile["chunk_overlap"]),
+        length_function=_length_function(profile),
+    )
+
+
+def get_chunking_profile(file_type: Optional[str] = None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Resolve the chunking profile for a document type.
+
+    The global chunk settings from the configuration are overridden by the
+    entry for the file type in ``chunking_profiles``, if any.
+
+    Args:
+        file_type: Type of the document (pdf, txt, etc.)
+        config: Application configuration (defaults to get_app_config())
+
+    Returns:
+        Profile dictionary with strategy, chunk_size, chunk_overlap, length_unit and tokenizer
+    """
+    config = config or get_app_config()
+    profile = dict(DEFAULT_PROFILE)
+    profile.update({
+        "strategy": config.get("chunk_strategy", profile["strategy"]),
+        "chunk_size": config.get("chunk_size", profile["chunk_size"]),
+        "chunk_overlap": config.get("chunk_overlap", profile["chunk_overlap"]),
+        "length_unit": config.get("chunk_length_unit", profile["length_unit"]),
+        "tokenizer": config.get("chunk_tokenizer", profile["tokenizer"]),
+    })
+    overrides = (config.get("chunking_profiles") or {}).get((file_type or "").lower())
+    if overrides:
+        profile.update(overrides)
+    if int(profile["chunk_overlap"]) >= int(profile["chunk_size"]):
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    return profile
+
+
+_splitter_cache: Dict[str, "TextSplitter"] = {}
+
+
+def get_text_splitter(profile: Dict[str, Any]) -> "TextSplitter":
+    """
+    Get a (cached) text splitter for a chunking profile.
+
+    Args:
+        profile: A profile as returned by get_chunking_profile
+
+    Returns:
+        The configured TextSplitter
+
+    Raises:
+        ValueError: If the profile names an unknown strategy
+    """
+    key = json.dumps(profile, sort_keys=True)
+    splitter = _splitter_cache.get(key)
+    if splitter is None:
+        strategy = profile.get("strategy", "recursive")
+        if strategy not in CHUNKING_STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+        splitter = CHUNKING_STRATEGIES[strategy](profile)
+        _splitter_cache[key] = splitter
+    return splitter
+
+
+def split_documents(documents, file_type: Optional[str] = None, profile: Optional[Dict[str, Any]] = None):
+    """
+    Split documents into chunks using the profile for their type.
+
+    Args:
+        documents: Loaded documents (pages)
+        file_type: Type of the documents, used to pick a profile
+        profile: Explicit profile overriding the configured one
+
+    Returns:
+        List of document chunks
+    """
+    from langchain_core.documents import Document
+
+    profile = profile or get_chunking_profile(file_type)
+    splitter = get_text_splitter(profile)
+    chunks = []
+    for document in documents:
+        text = document.page_content
+        pieces = splitter.split_text(text)
+        for chunk, start in zip(pieces, _chunk_offsets(text, pieces)):
+            chunks.append(Document(page_content=chunk, metadata=dict(document.metadata, start_index=start)))
+    return chunks
+
+
+def _chunk_offsets(text: str, chunks: List[str]) -> List[int]:
+    """
+    Find the character offset of each chunk in the text it was split from.
+
+    LangChain's ``add_start_index`` cannot be used: it steps back by
+    ``chunk_overlap``, which is counted in tokens here, not characters.
+    Each chunk starts after the previous one, so it is searched for from there.
+
+    Args:
+        text: Text of the document
+        chunks: Chunks of the text, in order
+
+    Returns:
+        Start offset of each chunk
+    """
+    offsets = []
+    previous_start, previous_end = -1, 0
+    for chunk in chunks:
+        start = text.find(chunk, previous_start + 1)
+        if start < 0:
+            # Not found verbatim (a splitter that rewrites its chunks): continue after the previous one
+            start = min(previous_end, len(text))
+        offsets.append(start)
+        previous_start, previous_end = start, start + len(chunk)
+    return offsets
@@ -0,0 +1,218 @@
+"""
+Question condensing module.
+This module decides whether a follow-up question has to be rewritten into a
+standalone question before retrieval, and does the rewriting.
+
+Rewriting costs a full LLM round trip before retrieval can start, which
+roughly doubles the latency of follow-up questions on CPU inference. It is
+skipped on the first turn of a conversation and for questions that do not
+refer back to it, can use a smaller model than the one answering, and
+rewrites are cached.
+"""
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+import hashlib
+import logging
+import re
+import threading
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import PromptTemplate
+
+from app.core.metrics import CONDENSE_DECISIONS, record_cache_lookup
+from app.core.reasoning import strip_reasoning
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CONDENSE_MODES = ("auto", "always", "never")
+
+# Same prompt as LangChain's ConversationalRetrievalChain uses
+CONDENSE_QUESTION_PROMPT = PromptTemplate.from_template(
+    "Given the following conversation and a follow up question, rephrase the follow up question "
+    "to be a standalone question, in its original language.\n\n"
+    "Chat History:\n{chat_history}\n"
+    "Follow Up Input: {question}\n"
+    "Standalone question:"
+)
+
+# Questions this short ("why?", "and then?") almost always depend on the conversation
+MIN_STANDALONE_WORDS = 4
+
+# Words that refer back to earlier turns
+_REFERRING_WORDS = {
+    "it", "its", "itself", "this", "that", "these", "those", "they", "them", "their", "theirs",
+    "he", "him", "his", "she", "her", "hers", "there", "then", "above", "previous", "previously",
+    "earlier", "former", "latter", "same", "also", "too", "else", "more", "another", "other",
+    "others", "one", "ones", "again", "continue", "elaborate",
+    # Arabic demonstratives, pronouns and references to the conversation ("هو" and
+    # "هي" are left out: "ما هو" / "ما هي" is how "what is" is asked)
+    "هذا", "هذه", "ذلك", "تلك", "هؤلاء", "أولئك", "هم", "هن", "هما",
+    "أيضا", "أيضاً", "السابق", "السابقة", "المذكور", "المذكورة",
+}
+_REFERRING_PHRASES = ("what about", "how about", "and what", "tell me more", "ماذا عن", "وماذا")
+# Arabic attached pronouns (e.g. "شروطها", "its conditions")
+_ARABIC_PRONOUN_SUFFIX = re.compile(r"[؀-ۿ]{2,}(?:ها|هم|هن|هما)$")
+_WORD = re.compile(r"[\w؀-ۿ]+")
+
+
+def get_condense_mode(config: Optional[dict] = None) -> str:
+    """Return the configured condense mode (auto, always or never)."""
+    config = config or get_app_config()
+    mode = config.get("condense_mode", "auto")
+    if mode not in CONDENSE_MODES:
+        logger.warning(f"Unknown condense_mode '{mode}', using 'auto'")
+        mode = "auto"
+    return mode
+
+
+def is_self_contained(question: str) -> bool:
+    """
+    Guess whether a question can be answered without the conversation.
+
+    Deliberately conservative: any word that may refer back to an earlier
+    turn means the question is rewritten.
+
+    Args:
+        question: The user's question
+
+    Returns:
+        True if the question does not appear to depend on earlier turns
+    """
+    text = question.strip().lower()
+    if any(text.startswith(phrase) for phrase in _REFERRING_PHRASES):
+        return False
+    words = _WORD.findall(text)
+    if len(words) < MIN_STANDALONE_WORDS:
+        return False
+    for word in words:
+        # Arabic prefixes the conjunction "and" (و) to the following word
+        bare = word[1:] if word.startswith("و") and len(word) > 2 else word
+        if word in _REFERRING_WORDS or bare in _REFERRING_WORDS:
+            return False
+        if _ARABIC_PRONOUN_SUFFIX.match(word):
+            return False
+    return True
+
+
+def format_chat_history(chat_history: List[BaseMessage]) -> str:
+    """Format messages the way ConversationalRetrievalChain does."""
+    roles = {"human": "Human: ", "ai": "Assistant: "}
+    return "".join(
+        f"\n{roles.get(msg.type, f'{msg.type}: ')}{msg.content}"
+        for msg in chat_history if msg.content
+    )
+
+
+class RewriteCache:
+    """Thread-safe LRU cache of standalone questions.
+
+    Keyed by the condensing model, the conversation so far and the follow-up
+    question, so a repeated question in the same conversation state (a retry,
+    or a second worker answering it) does not pay for another LLM call.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, history: str, question: str) -> str:
+        return hashlib.sha1("\x00".join((model, history, question)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            record_cache_lookup("condense", value is not None)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_rewrite_cache: Optional[RewriteCache] = None
+
+
+def get_rewrite_cache() -> RewriteCache:
+    """Get the shared rewrite cache, sized from condense_cache_size."""
+    global _rewrite_cache
+    max_size = get_app_config().get("condense_cache_size", 256)
+    if _rewrite_cache is None or _rewrite_cache.max_size != max_size:
+        _rewrite_cache = RewriteCache(max_size)
+    return _rewrite_cache
+
+
+def get_condense_llm(config: Optional[dict] = None):
+    """
+    Get the LLM used to rewrite follow-up questions.
+
+    Uses condense_model when it is set (a small model is good enough for
+    rewriting), otherwise the answering model. Rewrites use temperature 0 so
+    they are repeatable and safe to cache.
+    """
+    from app.core.llm import get_llm
+    config = config or get_app_config()
+    return get_llm(model_name=config.get("condense_model") or None, temperature=0)
+
+
+def condense_question(question: str, chat_history: List[BaseMessage], llm: Any = None,
+                      callbacks: Optional[list] = None) -> Tuple[str, str]:
+    """
+    Turn a follow-up question into a standalone question when needed.
+
+    Args:
+        question: The user's question
+        chat_history: Earlier messages of the conversation
+        llm: LLM to rewrite with (defaults to get_condense_llm())
+        callbacks: LangChain callbacks for the rewriting call
+
+    Returns:
+        Tuple of (question to retrieve and answer with, decision), where the
+        decision is one of first_turn, disabled, self_contained, cached or
+        rewritten
+    """
+    config = get_app_config()
+    mode = get_condense_mode(config)
+    if not chat_history:
+        decision = "first_turn"
+    elif mode == "never":
+        decision = "disabled"
+    elif mode == "auto" and is_self_contained(question):
+        decision = "self_contained"
+    else:
+        decision = None
+    if decision is not None:
+        CONDENSE_DECISIONS.inc(decision=decision)
+        return question, decision
+
+    history = format_chat_history(chat_history)
+    model = config.get("condense_model") or config["ollama_model"]
+    cache = get_rewrite_cache()
+    key = cache.key(model, history, question)
+    standalone = cache.get(key)
+    if standalone is not None:
+        CONDENSE_DECISIONS.inc(decision="cached")
+        return standalone, "cached"
+
+    llm = llm or get_condense_llm(config)
+    prompt = CONDENSE_QUESTION_PROMPT.format(chat_history=history, question=question)
+    output = llm.invoke(prompt, config={"callbacks": callbacks or []})
+    standalone = strip_reasoning(getattr(output, "content", output)).strip() or question
+    cache.put(key, standalone)
+    CONDENSE_DECISIONS.inc(decision="rewritten")
+    logger.info(f"Rewrote follow-up question as: '{standalone}'")
+    return standalone, "rewritten"
@@ -0,0 +1,272 @@
+"""
+Corpus export and import module.
+This module writes the chunks of a document store, with their metadata and
+embedding vectors, to a directory that another document store bulk-loads
+without parsing or embedding anything again, e.g. to seed a staging
+environment from production.
+
+Layout of an export::
+
+    manifest.json   format version, embedding model, vector dimensions and
+                    distance space, counts, and the metadata of every document
+    chunks.jsonl    one line per chunk: {"id": ..., "text": ..., "metadata": {...}}
+    vectors.npy     the chunk vectors (float32 or float16); row i belongs to
+                    line i of chunks.jsonl
+
+The manifest is written last, so a directory without one is an incomplete
+export. Vectors are read back memory-mapped, one batch at a time.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from app.core.index_router import DEFAULT_COLLECTION, collection_for_group
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "docqa-corpus"
+EXPORT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.jsonl"
+VECTORS_FILE = "vectors.npy"
+VECTOR_DTYPES = ("float32", "float16")
+
+# Chunks read, written or loaded at once
+_BATCH_CHUNKS = 4096
+
+
+def embedding_model_name(embeddings) -> str:
+    """Name of an embedding model, looking through wrappers such as InstrumentedEmbeddings."""
+    while not hasattr(embeddings, "model_name") and hasattr(embeddings, "embeddings"):
+        embeddings = embeddings.embeddings
+    return getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+def _collection(metadata: dict) -> str:
+    return metadata.get("collection") or DEFAULT_COLLECTION
+
+
+def export_corpus(store, directory: str, document_ids: Optional[List[str]] = None,
+                  vector_dtype: str = "float32") -> Dict[str, Any]:
+    """
+    Export the chunks, vectors and document metadata of a document store.
+
+    Uploads and deletions wait until the export is written; searches continue.
+    Chunks of documents without metadata are not exported.
+
+    Args:
+        store: The DocumentStore
+        directory: New or empty directory to write the export to
+        document_ids: Documents to export (defaults to all)
+        vector_dtype: "float32", or "float16" to halve the size of the vectors
+
+    Returns:
+        Number of documents and chunks exported, vector dimensions, bytes
+        written and seconds taken
+
+    Raises:
+        ValueError: If a document is unknown or the vector type is not supported
+        FileExistsError: If the directory is not empty
+    """
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector type '{vector_dtype}', expected one of {VECTOR_DTYPES}")
+    if os.path.isdir(directory) and os.listdir(directory):
+        raise FileExistsError(f"{directory} is not empty")
+    start_time = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+
+    with store.write_lock.acquire():
+        documents = store.list_documents()
+        if document_ids is not None:
+            unknown = sorted(set(document_ids) - set(documents))
+            if unknown:
+                raise ValueError(f"Unknown documents: {unknown}")
+            documents = {document_id: documents[document_id] for document_id in document_ids}
+        by_collection: Dict[str, set] = {}
+        for document_id, metadata in documents.items():
+            by_collection.setdefault(_collection(metadata), set()).add(document_id)
+
+        # The chunk count is stable under the write lock, so the vectors file can be sized upfront
+        total = sum(
+            chunks
+            for name, ids in by_collection.items()
+            for document_id, chunks in store._get_collection(name).document_chunk_counts().items()
+            if document_id in ids
+        )
+        vectors_file = None
+        written = 0
+        dimensions = 0
+        with open(os.path.join(directory, CHUNKS_FILE), "w", encoding="utf-8") as chunks_file:
+            for name in sorted(by_collection):
+                ids = by_collection[name]
+                for batch in store._get_collection(name).iter_chunks(_BATCH_CHUNKS):
+                    rows = [i for i, metadata in enumerate(batch.metadatas) if metadata.get("document_id") in ids]
+                    if not rows:
+                        continue
+                    if vectors_file is None:
+                        dimensions = batch.vectors.shape[1]
+                        vectors_file = open_memmap(
+                            os.path.join(directory, VECTORS_FILE), mode="w+", dtype=vector_dtype,
+                            shape=(total, dimensions)
+                        )
+                    if written + len(rows) > total:
+                        raise RuntimeError("The index changed during the export")
+                    vectors_file[written:written + len(rows)] = batch.vectors[rows]
+                    written += len(rows)
+                    chunks_file.writelines(
+                        json.dumps({"id": batch.ids[i], "text": batch.texts[i], "metadata": batch.metadatas[i]},
+                                   ensure_ascii=False) + "\n"
+                        for i in rows
+                    )
+        if vectors_file is None:
+            vectors_file = open_memmap(os.path.join(directory, VECTORS_FILE), mode="w+", dtype=vector_dtype,
+                                       shape=(0, 0))
+        vectors_file.flush()
+        del vectors_file
+        if written != total:
+            raise RuntimeError(f"Exported {written} of {total} chunks; the index changed during the export")
+
+    manifest = {
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": embedding_model_name(store.embeddings),
+        "space": store.index.space,
+        "dimensions": dimensions,
+        "vector_dtype": vector_dtype,
+        "chunk_count": written,
+        "documents": documents,
+    }
+    temp_path = os.path.join(directory, f"{MANIFEST_FILE}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(directory, MANIFEST_FILE))
+
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in (MANIFEST_FILE, CHUNKS_FILE, VECTORS_FILE))
+    seconds = time.perf_counter() - start_time
+    logger.info(f"Exported {len(documents)} documents ({written} chunks) to {directory} in {seconds:.1f}s")
+    return {
+        "directory": directory,
+        "documents": len(documents),
+        "chunks": written,
+        "dimensions": dimensions,
+        "bytes": size,
+        "seconds": round(seconds, 3),
+    }
+
+
+def load_manifest(directory: str) -> Dict[str, Any]:
+    """
+    Read the manifest of an export.
+
+    Raises:
+        ValueError: If the directory holds no complete export of a supported version
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise ValueError(f"{directory} holds no complete corpus export (no {MANIFEST_FILE})")
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != EXPORT_FORMAT or manifest.get("version") != EXPORT_VERSION:
+        raise ValueError(f"Unsupported export format {manifest.get('format')} version {manifest.get('version')}")
+    return manifest
+
+
+def _read_batches(directory: str, vectors: np.ndarray) -> Iterator[Tuple[List[dict], np.ndarray]]:
+    """Read the chunk lines together with their vectors, one batch at a time."""
+    lines: List[dict] = []
+    start = 0
+    with open(os.path.join(directory, CHUNKS_FILE), encoding="utf-8") as f:
+        for line in f:
+            lines.append(json.loads(line))
+            if len(lines) == _BATCH_CHUNKS:
+                yield lines, vectors[start:start + len(lines)]
+                start += len(lines)
+                lines = []
+    if lines:
+        yield lines, vectors[start:start + len(lines)]
+
+
+def import_corpus(store, directory: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Bulk-load an export into a document store, without parsing or embedding.
+
+    Documents the store already has are skipped. Each document goes to the
+    collection of its group, as if it had been uploaded. Uploads and deletions
+    wait until the import finishes; if it fails, the chunks it added are
+    removed again.
+
+    Args:
+        store: The DocumentStore
+        directory: Directory written by export_corpus()
+        force: Import even if the export was made with another embedding model
+
+    Returns:
+        Number of documents and chunks imported, the documents skipped and
+        seconds taken
+
+    Raises:
+        ValueError: If the export is incomplete or does not match the store's
+            embedding model (unless forced) or distance space
+    """
+    start_time = time.perf_counter()
+    manifest = load_manifest(directory)
+    model = embedding_model_name(store.embeddings)
+    if manifest["embedding_model"] != model and not force:
+        raise ValueError(
+            f"The export was embedded with {manifest['embedding_model']}, this store uses {model}; "
+            "its vectors would not match the store's queries"
+        )
+    if manifest["space"] != store.index.space:
+        raise ValueError(f"The export uses the {manifest['space']} distance, this store uses {store.index.space}")
+    vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+    if len(vectors) != manifest["chunk_count"]:
+        raise ValueError(f"{VECTORS_FILE} holds {len(vectors)} vectors, the manifest lists {manifest['chunk_count']}")
+
+    with store.write_lock.acquire():
+        existing = set(store.list_documents())
+        documents = {
+            document_id: dict(metadata, collection=collection_for_group(metadata.get("group")))
+            for document_id, metadata in manifest["documents"].items()
+            if document_id not in existing
+        }
+        skipped = sorted(set(manifest["documents"]) - set(documents))
+        chunks = 0
+        try:
+            for lines, batch_vectors in _read_batches(directory, vectors):
+                by_collection: Dict[str, List[int]] = {}
+                for i, line in enumerate(lines):
+                    metadata = documents.get(line["metadata"].get("document_id"))
+                    if metadata is not None:
+                        by_collection.setdefault(metadata["collection"], []).append(i)
+                for name, rows in by_collection.items():
+                    store._get_collection(name).add_vectors(
+                        [lines[i]["id"] for i in rows],
+                        [lines[i]["text"] for i in rows],
+                        [lines[i]["metadata"] for i in rows],
+                        np.asarray(batch_vectors[rows], dtype=np.float32),
+                    )
+                    chunks += len(rows)
+        except Exception:
+            logger.error(f"Import from {directory} failed; removing the {chunks} chunks it added")
+            for document_id, metadata in documents.items():
+                store._get_collection(metadata["collection"]).delete_document(document_id)
+            raise
+        for document_id, metadata in documents.items():
+            store.state.put_document(document_id, metadata)
+
+    seconds = time.perf_counter() - start_time
+    logger.info(f"Imported {len(documents)} documents ({chunks} chunks) from {directory} in {seconds:.1f}s")
+    return {
+        "documents": len(documents),
+        "chunks": chunks,
+        "skipped_documents": skipped,
+        "seconds": round(seconds, 3),
+    }
@@ -2,18 +2,43 @@
 Document storage and retrieval module.
 This module handles storing, processing, and retrieving documents using vector embeddings.
 """
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 import os
 import uuid
 import tempfile
 import logging
-import json
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from app.core.boilerplate import (
+    BOILERPLATE_MODES,
+    demote_boilerplate,
+    filter_chunks,
+    fingerprint,
+    strip_repeated_lines,
+)
+from app.core.chunking import split_documents
+from app.core.embeddings import get_embeddings
+from app.core.extractors import extract_document
+from app.core.index_router import (
+    DEFAULT_COLLECTION,
+    DocumentVectors,
+    VectorCache,
+    collection_for_group,
+    exact_search,
+    merge_results,
+    plan_search,
+)
+from app.core.metrics import BOILERPLATE_CHUNKS, INGEST_STAGE_DURATION, INGESTED_PAGES, INGESTED_CHUNKS
+from app.core.state_store import get_state_store
+from app.core.vector_index import VectorIndex, open_vector_index
 from app.utils.config import get_app_config
+from app.utils.file_lock import InterProcessLock
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,91 +47,63 @@ logger = logging.getLogger(__name__)
 app_config = get_app_config()
 
 class DocumentStore:
-    def __init__(self, persist_directory=None):
-        """Initialize the document store with a ChromaDB backend.
+    def __init__(self, persist_directory=None, embeddings=None):
+        """Initialize the document store with the configured vector backend.
         
         Args:
-            persist_directory: Directory where ChromaDB will store its data
+            persist_directory: Directory where the vector index and metadata are stored
+            embeddings: Embedding model to use (defaults to the local HuggingFace model)
         """
         self.persist_directory = persist_directory or app_config["chroma_persist_dir"]
         # Use a good local embedding model
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        # Create the persistent ChromaDB instance
-        self.db = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embeddings
-        )
-        # Keep track of document metadata
-        self.documents_metadata: Dict[str, dict] = {}
-        self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
+        self.embeddings = embeddings or get_embeddings()
         
         # Create directory if it doesn't exist
         os.makedirs(self.persist_directory, exist_ok=True)
         
-        # Load existing metadata if available
-        self._load_metadata()
+        # Open the default collection (Chroma or the local engine, see vector_backend)
+        self.index = open_vector_index(self.persist_directory, DEFAULT_COLLECTION, self.embeddings, app_config)
+        # LangChain Chroma store of the default collection (Chroma backend only)
+        self.db = getattr(self.index, "db", None)
+        # Collections of document groups, opened on first use
+        self._collections: Dict[str, VectorIndex] = {DEFAULT_COLLECTION: self.index}
+        self._collections_lock = threading.Lock()
+        # Document scopes up to this many chunks are searched exactly, from cached vectors
+        self.exact_search_max_chunks = app_config["exact_search_max_chunks"]
+        self.vector_cache = VectorCache(app_config["vector_cache_max_chunks"])
+        # Serializes writes to the local index files across worker processes
+        self.write_lock = InterProcessLock(os.path.join(self.persist_directory, ".write.lock"))
+        
+        # Document metadata lives in the shared state database
+        self.state = get_state_store(self.persist_directory)
+        self.metadata_file = os.path.join(self.persist_directory, "metadata.json")
+        self.state.import_legacy_documents(self.metadata_file)
         
         logger.info(f"Document store initialized with persist directory: {self.persist_directory}")
     
-    def _save_metadata(self):
-        """Save document metadata to disk."""
-        try:
-            with open(self.metadata_file, 'w') as f:
-                json.dump(self.documents_metadata, f)
-            logger.info(f"Saved metadata for {len(self.documents_metadata)} documents")
-        except Exception as e:
-            logger.error(f"Error saving metadata: {str(e)}")
-    
-    def _load_metadata(self):
-        """Load document metadata from disk if available."""
-        if os.path.exists(self.metadata_file):
-            try:
-                with open(self.metadata_file, 'r') as f:
-                    self.documents_metadata = json.load(f)
-                logger.info(f"Loaded metadata for {len(self.documents_metadata)} documents")
-            except Exception as e:
-                logger.error(f"Error loading metadata: {str(e)}")
-                self.documents_metadata = {}
-        else:
-            logger.info("No metadata file found, starting with empty metadata")
-            self.documents_metadata = {}
-    
-    def _get_loader(self, file_path: str, file_type: str):
-        """Get the appropriate document loader based on file type.
-        
-        Args:
-            file_path: Path to the document file
-            file_type: Type of the file (pdf, txt, etc.)
-            
-        Returns:
-            A document loader for the specified file type
-            
-        Raises:
-            ValueError: If file type is not supported
-        """
-        if file_type.lower() == "pdf":
-            return PyPDFLoader(file_path)
-        elif file_type.lower() in ["txt", "text"]:
-            return TextLoader(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+    def _get_collection(self, collection_name: str) -> VectorIndex:
+        """Get the vector index of a collection, opening it on first use."""
+        with self._collections_lock:
+            index = self._collections.get(collection_name)
+            if index is None:
+                index = open_vector_index(self.persist_directory, collection_name, self.embeddings, app_config)
+                self._collections[collection_name] = index
+            return index
     
-    def _process_documents(self, documents):
+    def _process_documents(self, documents, file_type: Optional[str] = None):
         """Split documents into smaller chunks for better retrieval.
         
         Args:
             documents: List of documents to process
+            file_type: Type of the documents, used to pick the chunking profile
             
         Returns:
             List of document chunks
         """
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        return text_splitter.split_documents(documents)
+        return split_documents(documents, file_type)
     
-    async def add_document(self, file_content: bytes, file_name: str, file_type: str) -> str:
+    async def add_document(self, file_content: bytes, file_name: str, file_type: str,
+                           group: Optional[str] = None) -> str:
         """
         Add a document to the store and return its ID.
         
@@ -114,16 +111,19 @@ class DocumentStore:
             file_content: The binary content of the file
             file_name: Original filename
             file_type: Type of the file (pdf, txt, etc.)
+            group: Optional document group; each group is indexed in its own collection
             
         Returns:
             document_id: Unique ID for the uploaded document
             
         Raises:
-            ValueError: If file type is not supported
+            ValueError: If file type is not supported or the group name is invalid
             Exception: For document processing errors
         """
+        collection_for_group(group)
         # Generate a unique ID for this document
         document_id = str(uuid.uuid4())
+        start_time = time.perf_counter()
         
         logger.info(f"Adding document: {file_name} (type: {file_type}, id: {document_id})")
         
@@ -134,32 +134,14 @@ class DocumentStore:
         
         try:
             # Load the document
-            loader = self._get_loader(temp_file_path, file_type)
-            documents = loader.load()
-            
-            # Add document metadata
-            for doc in documents:
-                doc.metadata["document_id"] = document_id
-                doc.metadata["file_name"] = file_name
-
-            # Process the documents (split into chunks)
-            chunks = self._process_documents(documents)
+            with INGEST_STAGE_DURATION.time(stage="load"):
+                documents = extract_document(temp_file_path, file_type, app_config)
+            INGESTED_PAGES.inc(len(documents))
             
-            logger.info(f"Document {document_id} split into {len(chunks)} chunks")
-            
-            # Add to ChromaDB
-            self.db.add_documents(chunks)
-            
-            # Store metadata
-            self.documents_metadata[document_id] = {
-                "file_name": file_name,
-                "file_type": file_type,
-                "chunk_count": len(chunks)
-            }
-            
-            # Save metadata to disk
-            self._save_metadata()
+            # Split, embed and store the pages
+            self._index_documents(document_id, file_name, file_type, documents, group)
             
+            INGEST_STAGE_DURATION.observe(time.perf_counter() - start_time, stage="total")
             return document_id
             
         except Exception as e:
@@ -170,6 +152,92 @@ class DocumentStore:
             if os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
     
+    def _index_documents(self, document_id: str, file_name: str, file_type: str, documents,
+                         group: Optional[str] = None) -> int:
+        """
+        Split loaded documents into chunks, index them and record their metadata.
+        
+        Args:
+            document_id: ID of the document the pages belong to
+            file_name: Original filename
+            file_type: Type of the file (pdf, txt, etc.)
+            documents: Loaded pages of the document
+            group: Optional document group (selects the collection)
+            
+        Returns:
+            Number of chunks added to the store
+
+        Raises:
+            ValueError: If boilerplate_filter is not a known mode
+        """
+        boilerplate_mode = app_config["boilerplate_filter"]
+        if boilerplate_mode not in BOILERPLATE_MODES:
+            raise ValueError(f"Unknown boilerplate_filter '{boilerplate_mode}', expected one of {BOILERPLATE_MODES}")
+
+        # Add document metadata
+        for doc in documents:
+            doc.metadata["document_id"] = document_id
+            doc.metadata["file_name"] = file_name
+
+        # Process the documents (split into chunks)
+        with INGEST_STAGE_DURATION.time(stage="split"):
+            if boilerplate_mode != "off":
+                documents, removed_lines = strip_repeated_lines(documents, app_config["boilerplate_page_ratio"])
+                if removed_lines:
+                    logger.info(f"Removed {removed_lines} header and footer lines from document {document_id}")
+            chunks = self._process_documents(documents, file_type)
+        
+        logger.info(f"Document {document_id} split into {len(chunks)} chunks")
+
+        # Drop or demote chunks already seen in many documents, before they are embedded
+        fingerprints = set()
+        boilerplate_chunks = 0
+        if boilerplate_mode != "off":
+            chunk_fingerprints = [fingerprint(chunk.page_content) for chunk in chunks]
+            fingerprints = set(chunk_fingerprints)
+            boilerplate = self.state.find_boilerplate(fingerprints, app_config["boilerplate_min_documents"] - 1)
+            chunks, boilerplate_chunks = filter_chunks(chunks, chunk_fingerprints, boilerplate, boilerplate_mode)
+            if boilerplate_chunks:
+                action = "dropped" if boilerplate_mode == "drop" else "demoted"
+                BOILERPLATE_CHUNKS.inc(boilerplate_chunks, action=action)
+                logger.info(f"Document {document_id}: {boilerplate_chunks} boilerplate chunks {action}")
+        
+        collection_name = collection_for_group(group)
+        metadata = {
+            "file_name": file_name,
+            "file_type": file_type,
+            "chunk_count": len(chunks),
+            "collection": collection_name
+        }
+        if group:
+            metadata["group"] = group
+        if boilerplate_chunks:
+            metadata["boilerplate_chunks"] = boilerplate_chunks
+        
+        # Add to the vector index (embedding time is recorded separately by the embeddings wrapper)
+        with INGEST_STAGE_DURATION.time(stage="index"):
+            with self.write_lock.acquire():
+                if chunks:
+                    self._get_collection(collection_name).add_documents(chunks)
+                # Recorded under the lock so index maintenance never sees the chunks without their metadata
+                self.state.put_document(document_id, metadata)
+                if fingerprints:
+                    self.state.add_chunk_fingerprints(document_id, fingerprints)
+        INGESTED_CHUNKS.inc(len(chunks))
+        return len(chunks)
+    
+    def _document_filter(self, document_ids: Optional[List[str]] = None,
+                         filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Chroma metadata filter restricting a search to the given documents and metadata filters."""
+        clauses = []
+        if document_ids:
+            clauses.append({"document_id": {"$in": document_ids}})
+        if filters:
+            clauses.append(filters)
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
     def get_retriever(self, document_ids: Optional[List[str]] = None):
         """
         Get a retriever for the specified documents or all documents.
@@ -179,27 +247,113 @@ class DocumentStore:
             
         Returns:
             A configured retriever
-        """        # If specific document IDs are provided, filter for those
+        """
         if document_ids:
             logger.info(f"Creating retriever for specific documents: {document_ids}")
-            retriever = self.db.as_retriever(
-                search_kwargs={
-                    "filter": {"document_id": {"$in": document_ids}},
-                    "k": app_config["max_context"]
-                }
-            )
         else:
-            # Otherwise return a retriever for all documents
             logger.info("Creating retriever for all documents")
-            retriever = self.db.as_retriever(
-                search_kwargs={"k": app_config["max_context"]}
-            )
-            
-        return retriever
+        # Searches go through the index router (see search_many)
+        return DocumentStoreRetriever(store=self, document_ids=document_ids, k=app_config["max_context"])
+
+    def search_many(self, queries: List[str], document_ids: Optional[List[str]] = None,
+                    k: Optional[int] = None,
+                    filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Retrieve chunks for one or many queries.
+
+        All queries are embedded in one batch. Small document scopes are
+        searched exactly over the documents' cached vectors; everything else
+        with one index query per collection holding the requested documents.
+
+        Args:
+            queries: The queries to search for
+            document_ids: List of document IDs to search in, or None for all documents
+            k: Number of chunks per query (defaults to max_context)
+            filters: Chroma "where" filter on chunk metadata, e.g. {"file_name": "a.pdf"}
+
+        Returns:
+            For each query, (chunk, distance) pairs, closest first; chunks
+            carry their chunk ID in ``id``
+
+        Raises:
+            ValueError: If the filter is invalid
+        """
+        if not queries:
+            return []
+        k = k or app_config["max_context"]
+        vectors = self._embed_queries(queries)
+        if document_ids:
+            documents = {doc_id: meta for doc_id in document_ids if (meta := self.state.get_document(doc_id))}
+        else:
+            # Only the collections in use matter for an unscoped search
+            # (documents indexed before groups existed are in the default one)
+            documents = {
+                name or DEFAULT_COLLECTION: {"collection": name or DEFAULT_COLLECTION}
+                for name in self.state.list_document_field_values("collection")
+            }
+        plan = plan_search(document_ids, documents, self.exact_search_max_chunks, bool(filters))
+        # Demoted boilerplate only fills the results when there are not enough other chunks
+        demote = app_config["boilerplate_filter"] == "demote"
+        fetch = k * 2 if demote else k
+        if plan.route == "exact":
+            results = self._exact_search(vectors, plan.document_ids, fetch)
+        else:
+            results = merge_results([
+                self._query_collection(name, vectors, fetch, self._document_filter(ids, filters))
+                for name, ids in plan.collections.items()
+            ], fetch)
+        return demote_boilerplate(results, k) if demote else results
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        if len(queries) == 1:
+            return [self.embeddings.embed_query(queries[0])]
+        embed = getattr(self.embeddings, "embed_queries", self.embeddings.embed_documents)
+        return embed(queries)
+
+    def _query_collection(self, collection_name: str, vectors: List[List[float]], k: int,
+                          where: Optional[Dict[str, Any]]) -> List[List[Tuple[Document, float]]]:
+        """Search one collection with all query vectors in a single query."""
+        return self._get_collection(collection_name).query(vectors, k, where)
+
+    def _document_vectors(self, document_id: str) -> DocumentVectors:
+        """Get the chunks and vectors of a document, from the cache or from its collection."""
+        entry = self.vector_cache.get(document_id)
+        if entry is None:
+            meta = self.state.get_document(document_id) or {}
+            entry = self._get_collection(meta.get("collection", DEFAULT_COLLECTION)).get_document(document_id)
+            self.vector_cache.put(document_id, entry)
+        return entry
+
+    def _exact_search(self, vectors: List[List[float]], document_ids: List[str],
+                      k: int) -> List[List[Tuple[Document, float]]]:
+        """Brute-force search over the vectors of a few documents."""
+        entries = [entry for entry in map(self._document_vectors, document_ids) if len(entry)]
+        if not entries:
+            return [[] for _ in vectors]
+        matrix = entries[0].vectors if len(entries) == 1 else np.concatenate([entry.vectors for entry in entries])
+        ids = [chunk_id for entry in entries for chunk_id in entry.ids]
+        texts = [text for entry in entries for text in entry.texts]
+        metadatas = [metadata for entry in entries for metadata in entry.metadatas]
+        indices, distances = exact_search(np.asarray(vectors), matrix, k, self._distance_space())
+        return [
+            [
+                (Document(id=ids[i], page_content=texts[i], metadata=metadatas[i]), float(distance))
+                for i, distance in zip(row_indices, row_distances)
+            ]
+            for row_indices, row_distances in zip(indices, distances)
+        ]
+
+    def _distance_space(self) -> str:
+        """Distance function of the collections."""
+        return self.index.space
+
+    def relevance_score_fn(self):
+        """Function turning a search distance into LangChain's relevance score (higher is closer)."""
+        return self.index.relevance_score_fn()
     
     def list_documents(self):
         """Return a list of stored documents with their metadata."""
-        return self.documents_metadata
+        return self.state.list_documents()
         
     def delete_document(self, document_id: str) -> bool:
         """
@@ -211,19 +365,20 @@ class DocumentStore:
         Returns:
             bool: True if the document was deleted, False otherwise
         """
-        if document_id not in self.documents_metadata:
+        metadata = self.state.get_document(document_id)
+        if metadata is None:
             logger.warning(f"Attempted to delete non-existent document: {document_id}")
             return False
             
         try:
-            # Delete from ChromaDB
-            self.db.delete(where={"document_id": document_id})
+            # Delete from the vector index
+            index = self._get_collection(metadata.get("collection", DEFAULT_COLLECTION))
+            with self.write_lock.acquire():
+                index.delete_document(document_id)
+            self.vector_cache.invalidate(document_id)
             
             # Remove from metadata
-            del self.documents_metadata[document_id]
-            
-            # Save updated metadata
-            self._save_metadata()
+            self.state.delete_document(document_id)
             
             logger.info(f"Document deleted: {document_id}")
             return True
@@ -231,3 +386,46 @@ class DocumentStore:
         except Exception as e:
             logger.error(f"Error deleting document {document_id}: {str(e)}")
             return False
+
+
+class DocumentStoreRetriever(BaseRetriever):
+    """Retriever searching a DocumentStore through its index router."""
+
+    store: Any
+    document_ids: Optional[List[str]] = None
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.store.search_many([query], self.document_ids, self.k)[0]]
+
+
+_document_store: Optional[DocumentStore] = None
+_document_store_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """
+    Get the shared document store, creating it on first use.
+
+    Creating the store loads the embedding model and opens the vector index, so it is
+    deferred until a request (or the startup warm-up) needs it.
+    """
+    global _document_store
+    if _document_store is None:
+        with _document_store_lock:
+            if _document_store is None:
+                _document_store = DocumentStore()
+    return _document_store
+
+
+async def get_document_store_async() -> DocumentStore:
+    """Get the shared document store without blocking the event loop while it is created."""
+    if _document_store is not None:
+        return _document_store
+    from fastapi.concurrency import run_in_threadpool
+    return await run_in_threadpool(get_document_store)
+
+
+def document_store_loaded() -> bool:
+    """Whether the shared document store has been created."""
+    return _document_store is not None
@@ -0,0 +1,246 @@
+"""
+Duplicate chunk analysis module.
+This module finds duplicate and near-duplicate chunks in the stored embeddings,
+such as page headers, footers and legal disclaimers repeated across documents,
+which waste index space and crowd useful chunks out of the top k.
+
+Chunks with the same normalized text (see app.core.boilerplate) are grouped
+first. Their representatives are then compared by cosine similarity:
+
+- ``exact``: blocked matrix products of the normalized vectors, comparing
+  every pair
+- ``lsh``: random-hyperplane locality-sensitive hashing; only chunks sharing
+  a hash bucket in one of the bands are compared, so near-duplicates are found
+  with high probability in time close to linear
+- ``auto`` (default): exact up to EXACT_MAX_CHUNKS representatives, LSH above
+
+Chunks linked by a similarity at or above the threshold form clusters. Each
+chunk is linked to at most MAX_NEIGHBOURS of its most similar chunks, which
+bounds memory when thousands of chunks are near-identical.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+
+from app.core.boilerplate import fingerprint
+from app.core.maintenance import collection_names
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DUPLICATE_METHODS = ("auto", "exact", "lsh")
+
+# Largest number of distinct texts compared pairwise by the "auto" method
+EXACT_MAX_CHUNKS = 50000
+# Rows of the similarity matrix computed at once
+_BLOCK_ROWS = 1024
+# Most similar chunks each chunk is linked to
+MAX_NEIGHBOURS = 64
+# LSH bands and hyperplanes per band: chunks at a cosine similarity of 0.95
+# share a bucket in at least one band with a probability of about 98%
+LSH_BANDS = 32
+LSH_ROWS = 20
+# Characters of the sample text reported per cluster
+_SAMPLE_CHARS = 200
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _neighbour_edges(block: np.ndarray, block_ids: np.ndarray, candidates: np.ndarray,
+                     candidate_ids: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs (block row, candidate) at or above the threshold, at most MAX_NEIGHBOURS per row."""
+    similarities = block @ candidates.T
+    similarities[block_ids[:, None] == candidate_ids[None, :]] = -1
+    if similarities.shape[1] > MAX_NEIGHBOURS:
+        top = np.argpartition(-similarities, MAX_NEIGHBOURS - 1, axis=1)[:, :MAX_NEIGHBOURS]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+    else:
+        top = np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+        top_similarities = similarities
+    rows, columns = np.nonzero(top_similarities >= threshold)
+    return block_ids[rows], candidate_ids[top[rows, columns]]
+
+
+def _exact_edges(vectors: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Similar pairs, comparing every vector with every other one block by block."""
+    ids = np.arange(len(vectors))
+    sources, targets = [], []
+    for start in range(0, len(vectors), _BLOCK_ROWS):
+        block_sources, block_targets = _neighbour_edges(
+            vectors[start:start + _BLOCK_ROWS], ids[start:start + _BLOCK_ROWS], vectors, ids, threshold
+        )
+        sources.append(block_sources)
+        targets.append(block_targets)
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def _lsh_edges(vectors: np.ndarray, threshold: float, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Similar pairs among the vectors sharing an LSH bucket in at least one band."""
+    rng = np.random.default_rng(seed)
+    weights = np.left_shift(np.int64(1), np.arange(LSH_ROWS, dtype=np.int64))
+    sources, targets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for _ in range(LSH_BANDS):
+        planes = rng.standard_normal((vectors.shape[1], LSH_ROWS)).astype(np.float32)
+        keys = ((vectors @ planes) > 0).astype(np.int64) @ weights
+        order = np.argsort(keys, kind="stable")
+        boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) < 2:
+                continue
+            members = vectors[bucket]
+            for start in range(0, len(bucket), _BLOCK_ROWS):
+                block_sources, block_targets = _neighbour_edges(
+                    members[start:start + _BLOCK_ROWS], bucket[start:start + _BLOCK_ROWS], members, bucket, threshold
+                )
+                sources.append(block_sources)
+                targets.append(block_targets)
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def connected_components(size: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Label each node with the smallest node of its component (min-label propagation)."""
+    labels = np.arange(size)
+    if not len(sources):
+        return labels
+    while True:
+        previous = labels.copy()
+        smallest = np.minimum(labels[sources], labels[targets])
+        np.minimum.at(labels, sources, smallest)
+        np.minimum.at(labels, targets, smallest)
+        # Pointer jumping: follow labels to their own labels until they settle
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            return labels
+
+
+class _Chunks:
+    """The chunks of a collection, with one normalized vector per distinct text."""
+
+    def __init__(self, index):
+        texts: Dict[str, int] = {}
+        self.samples: List[str] = []
+        representatives: List[np.ndarray] = []
+        chunk_texts: List[int] = []
+        self.documents: List[Optional[str]] = []
+        self.ids: List[str] = []
+        for batch in index.iter_chunks():
+            new_rows = []
+            for i, (chunk_id, text, metadata) in enumerate(zip(batch.ids, batch.texts, batch.metadatas)):
+                key = fingerprint(text)
+                if key not in texts:
+                    texts[key] = len(texts)
+                    self.samples.append(text[:_SAMPLE_CHARS])
+                    new_rows.append(i)
+                chunk_texts.append(texts[key])
+                self.documents.append(metadata.get("document_id"))
+                self.ids.append(chunk_id)
+            if new_rows:
+                representatives.append(_normalize(batch.vectors[new_rows]))
+        self.fingerprints = list(texts)
+        # Index of each chunk's text in fingerprints, samples and vectors
+        self.texts = np.asarray(chunk_texts, dtype=np.int64)
+        self.vectors = np.concatenate(representatives) if representatives else np.empty((0, 0), dtype=np.float32)
+
+
+def _clusters(chunks: _Chunks, threshold: float, method: str, min_documents: int,
+              max_clusters: int) -> Dict[str, Any]:
+    """Find the duplicate clusters among the chunks of one collection."""
+    used = method if method != "auto" else ("exact" if len(chunks.vectors) <= EXACT_MAX_CHUNKS else "lsh")
+    sources, targets = (_exact_edges if used == "exact" else _lsh_edges)(chunks.vectors, threshold)
+    chunk_labels = connected_components(len(chunks.vectors), sources, targets)[chunks.texts]
+
+    # Group the chunks by cluster with one sort
+    order = np.argsort(chunk_labels, kind="stable")
+    clusters = []
+    for members in np.split(order, np.flatnonzero(np.diff(chunk_labels[order])) + 1):
+        if len(members) < 2:
+            continue
+        documents = {chunks.documents[i] for i in members}
+        member_texts = np.unique(chunks.texts[members])
+        clusters.append({
+            "chunks": len(members),
+            "documents": len(documents),
+            "distinct_texts": len(member_texts),
+            "sample_text": chunks.samples[int(chunk_labels[members[0]])],
+            "sample_chunk_ids": [chunks.ids[i] for i in members[:5]],
+            "sample_document_ids": sorted(document for document in documents if document)[:5],
+            "fingerprints": [chunks.fingerprints[i] for i in member_texts],
+        })
+    clusters.sort(key=lambda cluster: (-cluster["chunks"], -cluster["documents"]))
+    duplicate_chunks = sum(cluster["chunks"] - 1 for cluster in clusters)
+    boilerplate = [cluster for cluster in clusters if cluster["documents"] >= min_documents]
+    return {
+        "chunks": len(chunks.ids),
+        "distinct_texts": len(chunks.fingerprints),
+        "duplicate_chunks": duplicate_chunks,
+        "duplicate_ratio": round(duplicate_chunks / len(chunks.ids), 4),
+        "clusters": len(clusters),
+        "boilerplate_clusters": len(boilerplate),
+        "method": used,
+        "top_clusters": [
+            {key: value for key, value in cluster.items() if key != "fingerprints"}
+            for cluster in clusters[:max_clusters]
+        ],
+        "fingerprints": sorted({key for cluster in boilerplate for key in cluster["fingerprints"]}),
+    }
+
+
+def find_duplicates(store, threshold: float = 0.95, method: str = "auto", min_documents: Optional[int] = None,
+                    max_clusters: int = 20, register: bool = False) -> Dict[str, Any]:
+    """
+    Report the duplicate and near-duplicate chunks of every collection.
+
+    The chunks are read under the store's write lock (uploads and deletions
+    wait meanwhile); the comparison runs after it is released.
+
+    Args:
+        store: The DocumentStore
+        threshold: Cosine similarity at or above which two chunks are near-duplicates
+        method: "exact", "lsh" or "auto"
+        min_documents: Documents a cluster must span to count as boilerplate
+            (defaults to boilerplate_min_documents)
+        max_clusters: Largest clusters reported per collection
+        register: Register the texts of the boilerplate clusters, so the
+            ingestion filter recognises them in new documents
+
+    Returns:
+        Per collection: chunk counts, the share of duplicate chunks, the
+        number of clusters and the largest ones, and how many texts were registered
+
+    Raises:
+        ValueError: If the method or threshold is invalid
+    """
+    if method not in DUPLICATE_METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {DUPLICATE_METHODS}")
+    if not 0 < threshold <= 1:
+        raise ValueError("The threshold must be a cosine similarity in (0, 1]")
+    min_documents = min_documents or get_app_config()["boilerplate_min_documents"]
+    start_time = time.perf_counter()
+    report: Dict[str, Any] = {"threshold": threshold, "min_documents": min_documents, "collections": {}}
+    registered = 0
+    for name in collection_names(store):
+        with store.write_lock.acquire():
+            chunks = _Chunks(store._get_collection(name))
+        if not chunks.ids:
+            continue
+        result = _clusters(chunks, threshold, method, min_documents, max_clusters)
+        fingerprints = result.pop("fingerprints")
+        if register and fingerprints:
+            registered += store.state.add_boilerplate_fingerprints(set(fingerprints))
+        report["collections"][name] = result
+        logger.info(f"Collection {name}: {result['duplicate_chunks']} of {result['chunks']} chunks are duplicates "
+                    f"({result['clusters']} clusters, {result['boilerplate_clusters']} boilerplate)")
+    if register:
+        report["registered_fingerprints"] = registered
+    report["seconds"] = round(time.perf_counter() - start_time, 3)
+    return report
@@ -0,0 +1,80 @@
+"""
+Embedding utility module.
+This module provides the embedding model used for indexing and retrieval.
+"""
+from langchain_core.embeddings import Embeddings
+from typing import List
+import logging
+
+from app.core.metrics import EMBEDDING_DURATION, EMBEDDED_TEXTS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Local embedding model used for documents and queries
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper that records latency and volume metrics."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with EMBEDDING_DURATION.time(operation="documents"):
+            vectors = self.embeddings.embed_documents(texts)
+        EMBEDDED_TEXTS.inc(len(texts), operation="documents")
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        with EMBEDDING_DURATION.time(operation="query"):
+            vector = self.embeddings.embed_query(text)
+        EMBEDDED_TEXTS.inc(operation="query")
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries in one batch (the local models encode queries and documents alike)."""
+        with EMBEDDING_DURATION.time(operation="queries"):
+            vectors = self.embeddings.embed_documents(texts)
+        EMBEDDED_TEXTS.inc(len(texts), operation="query")
+        return vectors
+
+
+def get_embeddings(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Embeddings:
+    """Get an instrumented local embedding model.
+
+    Args:
+        model_name: Name of the sentence-transformers model to load
+
+    Returns:
+        An Embeddings instance that records metrics
+    """
+    # Imported here because sentence-transformers pulls in torch, which takes seconds
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    logger.info(f"Loading embedding model: {model_name}")
+    return InstrumentedEmbeddings(HuggingFaceEmbeddings(model_name=model_name))
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings that load the model on first use.
+
+    For tools that open the document store without necessarily embedding
+    anything (such as index maintenance), so they start without loading torch.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._embeddings = None
+
+    def _model(self) -> Embeddings:
+        if self._embeddings is None:
+            self._embeddings = get_embeddings(self.model_name)
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._model().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._model().embed_query(text)
@@ -0,0 +1,309 @@
+"""
+Text extraction module.
+This module turns uploaded files into pages (LangChain Documents) through a
+registry of extractors, so new file types and faster parsers can be added
+without touching the upload route or the document store.
+
+Each file type has a default extractor, which the ``extractors`` setting can
+override per type, e.g. ``{"pdf": "pypdf-parallel"}``:
+
+- ``pypdf`` (PDF, default): LangChain's PyPDFLoader, one page after another
+- ``pypdf-parallel`` (PDF): the same pypdf text extraction, with the pages of
+  one PDF split over ``extract_workers`` processes. Documents shorter than
+  ``extract_parallel_min_pages`` pages are extracted in-process, where
+  handing them to the workers would cost more than it saves
+- ``pymupdf`` (PDF): PyMuPDF's C parser, much faster than pypdf but an
+  optional dependency (``pip install pymupdf``)
+- ``text`` (TXT), ``markdown`` (MD), ``html`` (HTML) and ``docx`` (DOCX),
+  which only need the standard library
+
+Run ``python -m benchmarks.bench_extraction`` to compare the PDF extractors
+on the machine before changing the default.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from xml.etree import ElementTree
+
+from langchain_core.documents import Document
+
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+Extractor = Callable[[str, Dict[str, Any]], List[Document]]
+
+# Registry of extractors: name -> function(file_path, config) -> pages
+EXTRACTORS: Dict[str, Extractor] = {}
+# File types each extractor can read
+EXTRACTOR_FILE_TYPES: Dict[str, Tuple[str, ...]] = {}
+
+# Extractor used for each supported file type unless the settings choose another
+DEFAULT_EXTRACTORS = {
+    "pdf": "pypdf",
+    "txt": "text",
+    "text": "text",
+    "md": "markdown",
+    "markdown": "markdown",
+    "html": "html",
+    "htm": "html",
+    "docx": "docx",
+}
+
+
+def register_extractor(name: str, file_types: Tuple[str, ...]):
+    """
+    Register a text extractor under the given name.
+
+    The decorated function receives the path of the file and the application
+    configuration, and returns the file's pages as Documents. It becomes the
+    default extractor of the file types that have none yet, which makes them
+    uploadable.
+
+    Args:
+        name: Name used in the ``extractors`` setting
+        file_types: File types (extensions) the extractor can read
+    """
+    def decorator(extractor: Extractor) -> Extractor:
+        EXTRACTORS[name] = extractor
+        EXTRACTOR_FILE_TYPES[name] = file_types
+        for file_type in file_types:
+            DEFAULT_EXTRACTORS.setdefault(file_type, name)
+        return extractor
+    return decorator
+
+
+def supported_file_types() -> List[str]:
+    """File types (extensions) that can be uploaded."""
+    return sorted(DEFAULT_EXTRACTORS)
+
+
+def get_extractor_name(file_type: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Resolve the extractor used for a file type.
+
+    Args:
+        file_type: Type of the file (pdf, txt, etc.)
+        config: Application configuration (defaults to get_app_config())
+
+    Returns:
+        Name of the registered extractor
+
+    Raises:
+        ValueError: If the file type is not supported, or the configured
+            extractor is unknown or cannot read the file type
+    """
+    config = config or get_app_config()
+    file_type = file_type.lower()
+    if file_type not in DEFAULT_EXTRACTORS:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    name = (config.get("extractors") or {}).get(file_type) or DEFAULT_EXTRACTORS[file_type]
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of {sorted(EXTRACTORS)}")
+    if file_type not in EXTRACTOR_FILE_TYPES[name]:
+        raise ValueError(f"Extractor '{name}' cannot read {file_type} files")
+    return name
+
+
+def extract_document(file_path: str, file_type: str, config: Optional[Dict[str, Any]] = None,
+                     extractor: Optional[str] = None) -> List[Document]:
+    """
+    Extract the pages of a file with the extractor configured for its type.
+
+    Args:
+        file_path: Path of the file
+        file_type: Type of the file (pdf, txt, etc.)
+        config: Application configuration (defaults to get_app_config())
+        extractor: Name of the extractor to use instead of the configured one
+
+    Returns:
+        The file's pages as Documents
+
+    Raises:
+        ValueError: If the file type is not supported or the extractor is invalid
+    """
+    config = config or get_app_config()
+    if extractor is None:
+        extractor = get_extractor_name(file_type, config)
+    elif extractor not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{extractor}', expected one of {sorted(EXTRACTORS)}")
+    return EXTRACTORS[extractor](file_path, config)
+
+
+@register_extractor("pypdf", ("pdf",))
+def _pypdf_loader(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Extract the pages of a PDF with LangChain's PyPDFLoader."""
+    from langchain_community.document_loaders import PyPDFLoader
+    return PyPDFLoader(file_path).load()
+
+
+def _pdf_page_texts(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages start to stop - 1 of a PDF (runs in the worker processes)."""
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    return [reader.pages[i].extract_text().strip() for i in range(start, stop)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared pool of extraction processes, started on first use."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned rather than forked: the server process runs threads
+            # (warm-up, scheduler) whose locks a fork would copy mid-use
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+@register_extractor("pypdf-parallel", ("pdf",))
+def _pypdf_parallel(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Extract the pages of a PDF with pypdf, in parallel over several processes."""
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    page_count = len(reader.pages)
+    labels = reader.page_labels
+    workers = int(config.get("extract_workers") or 0) or os.cpu_count() or 1
+    if workers < 2 or page_count < int(config.get("extract_parallel_min_pages", 16)):
+        texts = _pdf_page_texts(file_path, 0, page_count)
+    else:
+        # Two contiguous page ranges per worker: each range parses the PDF again,
+        # but a slow range (e.g. pages of vector drawings) does not hold up the others
+        ranges = min(page_count, workers * 2)
+        bounds = [page_count * i // ranges for i in range(ranges + 1)]
+        pool = _get_pool(workers)
+        futures = [pool.submit(_pdf_page_texts, file_path, start, stop)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        texts = [text for future in futures for text in future.result()]
+    return [
+        Document(
+            page_content=text,
+            metadata={"source": file_path, "total_pages": page_count, "page": i, "page_label": labels[i]},
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+@register_extractor("pymupdf", ("pdf",))
+def _pymupdf(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Extract the pages of a PDF with PyMuPDF."""
+    try:
+        import pymupdf
+    except ImportError:
+        raise ValueError("The pymupdf extractor needs PyMuPDF: pip install pymupdf")
+
+    with pymupdf.open(file_path) as pdf:
+        return [
+            Document(
+                page_content=page.get_text().strip(),
+                metadata={"source": file_path, "total_pages": pdf.page_count, "page": i,
+                          "page_label": page.get_label() or str(i + 1)},
+            )
+            for i, page in enumerate(pdf)
+        ]
+
+
+@register_extractor("text", ("txt", "text", "md", "markdown"))
+def _text(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Read a plain text file as one page."""
+    from langchain_community.document_loaders import TextLoader
+    return TextLoader(file_path).load()
+
+
+@register_extractor("markdown", ("md", "markdown"))
+def _markdown(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Read a Markdown file as one page, keeping its markup (headings help the chunker)."""
+    with open(file_path, encoding="utf-8") as f:
+        return [Document(page_content=f.read(), metadata={"source": file_path})]
+
+
+class _HTMLText(HTMLParser):
+    """Collect the visible text of an HTML page, one line per block element."""
+
+    SKIPPED = {"script", "style", "head", "noscript", "template"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article",
+              "header", "footer", "blockquote", "pre", "table", "ul", "ol", "td", "th"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skipping = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skipping += 1
+        self._in_title = tag == "title"
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED and self._skipping:
+            self._skipping -= 1
+        if tag == "title":
+            self._in_title = False
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skipping:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+@register_extractor("html", ("html", "htm"))
+def _html(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Extract the visible text of an HTML file as one page."""
+    parser = _HTMLText()
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        parser.feed(f.read())
+    parser.close()
+    metadata = {"source": file_path}
+    if parser.title.strip():
+        metadata["title"] = " ".join(parser.title.split())
+    return [Document(page_content=parser.text(), metadata=metadata)]
+
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@register_extractor("docx", ("docx",))
+def _docx(file_path: str, config: Dict[str, Any]) -> List[Document]:
+    """Extract the paragraphs (including table cells) of a Word document as one page."""
+    with zipfile.ZipFile(file_path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{_WORD_NAMESPACE}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{_WORD_NAMESPACE}t":
+                parts.append(node.text or "")
+            elif node.tag == f"{_WORD_NAMESPACE}tab":
+                parts.append("\t")
+            elif node.tag in (f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"):
+                parts.append("\n")
+        text = "".join(parts).strip()
+        if text:
+            paragraphs.append(text)
+    return [Document(page_content="\n\n".join(paragraphs), metadata={"source": file_path})]
@@ -0,0 +1,290 @@
+"""
+HNSW graph module.
+This module implements a Hierarchical Navigable Small World graph (Malkov and
+Yashunin) for approximate nearest neighbour search in NumPy.
+
+The graph only holds neighbour lists: vectors are read from the array passed
+to insert() and search(), typically a memory map, so the same vectors serve
+exact and approximate search. Distances follow Chroma's definitions
+(squared Euclidean for ``l2``, 1 - cosine similarity for ``cosine`` and
+1 - dot product for ``ip``).
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import heapq
+import logging
+import math
+import os
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Neighbours per node on the upper layers (twice as many on layer 0)
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 100
+
+
+def distances(query: np.ndarray, vectors: np.ndarray, space: str = "l2") -> np.ndarray:
+    """Distances from one query vector to each row of vectors."""
+    if space == "l2":
+        diff = vectors - query
+        return np.einsum("ij,ij->i", diff, diff)
+    products = vectors @ query
+    if space == "cosine":
+        products = products / np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+    return 1 - products
+
+
+def pairwise_distances(vectors: np.ndarray, space: str = "l2") -> np.ndarray:
+    """Distances between all pairs of rows of vectors."""
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    products = vectors @ vectors.T
+    if space == "l2":
+        squared = np.einsum("ij,ij->i", vectors, vectors)
+        return np.maximum(squared[:, None] + squared[None, :] - 2 * products, 0)
+    return 1 - products
+
+
+class GraphView(NamedTuple):
+    """The rows of a graph at one point in time: searches through a view skip rows inserted later."""
+
+    size: int
+    entry_point: int
+    max_level: int
+
+
+class HNSWGraph:
+    """HNSW graph over the rows of an external vector array.
+
+    Rows are inserted in order (row ``size`` is always the next one). Rows
+    are never removed: deleted rows are excluded from results with the
+    ``allowed`` mask of search() and still help to navigate the graph.
+    """
+
+    def __init__(self, space: str = "l2", m: int = DEFAULT_M,
+                 ef_construction: int = DEFAULT_EF_CONSTRUCTION):
+        """
+        Args:
+            space: Distance function (l2, cosine or ip)
+            m: Neighbours per node on the upper layers
+            ef_construction: Candidate list size while inserting
+        """
+        self.space = space
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.size = 0
+        self.entry_point = -1
+        self.max_level = -1
+        self.levels = np.zeros(0, dtype=np.int8)
+        # Layer 0 neighbour lists, padded with -1; upper layers only hold their few nodes
+        self.layer0 = np.full((0, self.m0), -1, dtype=np.int32)
+        self.upper: List[Dict[int, np.ndarray]] = []
+        self._level_mult = 1 / math.log(m)
+        self._rng = np.random.default_rng(0)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self.levels):
+            return
+        capacity = max(size, 2 * len(self.levels), 1024)
+        levels = np.zeros(capacity, dtype=np.int8)
+        levels[:self.size] = self.levels[:self.size]
+        layer0 = np.full((capacity, self.m0), -1, dtype=np.int32)
+        layer0[:self.size] = self.layer0[:self.size]
+        self.levels, self.layer0 = levels, layer0
+
+    def _neighbours(self, node: int, layer: int) -> np.ndarray:
+        row = self.layer0[node] if layer == 0 else self.upper[layer - 1][node]
+        return row[row >= 0]
+
+    def _set_neighbours(self, node: int, layer: int, neighbours) -> None:
+        if layer == 0:
+            row = self.layer0[node]
+        else:
+            row = self.upper[layer - 1][node]
+        # One assignment, so concurrent searches never see the row emptied
+        padded = np.full(len(row), -1, dtype=np.int32)
+        padded[:len(neighbours)] = neighbours
+        row[:] = padded
+
+    def view(self) -> GraphView:
+        """Current size and entry point (take it under the lock that guards insert())."""
+        return GraphView(self.size, self.entry_point, self.max_level)
+
+    def _search_layer(self, vectors: np.ndarray, query: np.ndarray, entry_points: List[Tuple[float, int]],
+                      ef: int, layer: int, allowed: Optional[np.ndarray] = None,
+                      size: Optional[int] = None) -> List[Tuple[float, int]]:
+        """
+        Best-first search of one layer; returns up to ef (distance, node) pairs, closest first.
+
+        Only rows below size are visited, so a search can run while rows are
+        inserted past it.
+        """
+        size = self.size if size is None else size
+        visited = np.zeros(size, dtype=bool)
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        results: List[Tuple[float, int]] = []
+        for dist, node in entry_points:
+            visited[node] = True
+            if allowed is None or allowed[node]:
+                heapq.heappush(results, (-dist, node))
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if len(results) >= ef and dist > -results[0][0]:
+                break
+            neighbours = self._neighbours(node, layer)
+            neighbours = neighbours[neighbours < size]
+            neighbours = neighbours[~visited[neighbours]]
+            if not len(neighbours):
+                continue
+            visited[neighbours] = True
+            for neighbour_dist, neighbour in zip(
+                distances(query, vectors[neighbours], self.space).tolist(), neighbours.tolist()
+            ):
+                if len(results) < ef or neighbour_dist < -results[0][0]:
+                    heapq.heappush(candidates, (neighbour_dist, neighbour))
+                    # Filtered-out nodes are walked through but never returned
+                    if allowed is None or allowed[neighbour]:
+                        heapq.heappush(results, (-neighbour_dist, neighbour))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+        return sorted((-neg_dist, node) for neg_dist, node in results)
+
+    def _select_neighbours(self, vectors: np.ndarray, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """Pick up to m neighbours, skipping candidates closer to a picked one than to the base node."""
+        if len(candidates) <= m:
+            return [node for _, node in candidates]
+        nodes = np.array([node for _, node in candidates])
+        base_distances = np.array([dist for dist, _ in candidates])
+        pairwise = pairwise_distances(np.asarray(vectors[nodes], dtype=np.float32), self.space)
+        selected: List[int] = []
+        for i in range(len(nodes)):
+            if not selected or (pairwise[i, selected] > base_distances[i]).all():
+                selected.append(i)
+                if len(selected) == m:
+                    break
+        return nodes[selected].tolist()
+
+    def insert(self, vectors: np.ndarray, node: int) -> None:
+        """
+        Link a row into the graph.
+
+        Args:
+            vectors: The vector array (must contain row ``node``)
+            node: Row to insert; rows are inserted in order
+        """
+        if node != self.size:
+            raise ValueError(f"Expected row {self.size}, got {node}")
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        self._reserve(node + 1)
+        self.levels[node] = level
+        while len(self.upper) < level:
+            self.upper.append({})
+        for layer in range(1, level + 1):
+            self.upper[layer - 1][node] = np.full(self.m, -1, dtype=np.int32)
+        self.size = node + 1
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+
+        query = np.asarray(vectors[node], dtype=np.float32)
+        entry = [(float(distances(query, vectors[[self.entry_point]], self.space)[0]), self.entry_point)]
+        for layer in range(self.max_level, level, -1):
+            entry = self._search_layer(vectors, query, entry, 1, layer)
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(vectors, query, entry, self.ef_construction, layer)
+            found = [(dist, other) for dist, other in found if other != node]
+            neighbours = self._select_neighbours(vectors, found, self.m)
+            self._set_neighbours(node, layer, neighbours)
+            max_neighbours = self.m0 if layer == 0 else self.m
+            for neighbour in neighbours:
+                current = self._neighbours(neighbour, layer)
+                if len(current) < max_neighbours:
+                    self._set_neighbours(neighbour, layer, np.append(current, node))
+                    continue
+                # The neighbour's list is full: keep the most useful links
+                linked = np.append(current, node)
+                linked_distances = distances(
+                    np.asarray(vectors[neighbour], dtype=np.float32), vectors[linked], self.space
+                )
+                order = np.argsort(linked_distances, kind="stable")
+                self._set_neighbours(neighbour, layer, self._select_neighbours(
+                    vectors, [(float(linked_distances[i]), int(linked[i])) for i in order], max_neighbours
+                ))
+            entry = found or entry
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int, ef: int = 64,
+               allowed: Optional[np.ndarray] = None, view: Optional[GraphView] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the k nearest rows to a query.
+
+        Args:
+            vectors: The vector array the graph was built over
+            query: Query vector
+            k: Number of neighbours
+            ef: Candidate list size (larger is slower and more accurate)
+            allowed: Optional boolean mask of the rows that may be returned
+            view: Rows to search, from view(); needed when other threads may
+                insert rows during the search (defaults to the current rows)
+
+        Returns:
+            Tuple of (rows, distances), closest first
+        """
+        size, entry_point, max_level = view or self.view()
+        if entry_point < 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        entry = [(float(distances(query, vectors[[entry_point]], self.space)[0]), entry_point)]
+        for layer in range(max_level, 0, -1):
+            entry = self._search_layer(vectors, query, entry, 1, layer, size=size)
+        found = self._search_layer(vectors, query, entry, max(ef, k), 0, allowed, size)[:k]
+        return (
+            np.array([node for _, node in found], dtype=np.int64),
+            np.array([dist for dist, _ in found], dtype=np.float32),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the graph to a file, replacing it atomically."""
+        arrays = {
+            "params": np.array([self.m, self.ef_construction, self.size, self.entry_point, self.max_level]),
+            "space": np.array(self.space),
+            "levels": self.levels[:self.size],
+            "layer0": self.layer0[:self.size],
+        }
+        for layer, links in enumerate(self.upper, start=1):
+            nodes = sorted(links)
+            arrays[f"nodes{layer}"] = np.array(nodes, dtype=np.int32)
+            arrays[f"links{layer}"] = np.array([links[node] for node in nodes], dtype=np.int32).reshape(-1, self.m)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWGraph":
+        """Read a graph written by save()."""
+        with np.load(path) as data:
+            m, ef_construction, size, entry_point, max_level = (int(value) for value in data["params"])
+            graph = cls(str(data["space"]), m, ef_construction)
+            graph.size, graph.entry_point, graph.max_level = size, entry_point, max_level
+            graph.levels = data["levels"].copy()
+            graph.layer0 = data["layer0"].copy()
+            layer = 1
+            while f"nodes{layer}" in data:
+                graph.upper.append({
+                    int(node): links.copy() for node, links in zip(data[f"nodes{layer}"], data[f"links{layer}"])
+                })
+                layer += 1
+        graph._rng = np.random.default_rng(size)
+        return graph
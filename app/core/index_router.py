@@ -0,0 +1,222 @@
+"""
+Index routing module.
+This module decides which index answers a search, and provides exact
+brute-force search for small document scopes.
+
+Chunks live in Chroma collections: the default collection, plus one
+collection per document group when documents are uploaded with a group.
+A search scoped to a few documents does not go through a filtered HNSW search
+(which loses recall or time on a large collection); the vectors of those
+documents are searched exhaustively with NumPy instead, which is exact and
+fast for up to tens of thousands of chunks. Larger scopes are searched in the
+smallest set of collections holding the requested documents.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import threading
+
+import numpy as np
+
+from app.core.metrics import RETRIEVAL_ROUTES, record_cache_lookup
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Collection used by langchain_chroma when no name is given (documents without a group)
+DEFAULT_COLLECTION = "langchain"
+GROUP_COLLECTION_PREFIX = "group-"
+
+# Chroma collection names: 3-512 characters from [a-zA-Z0-9._-], alphanumeric at both ends
+_GROUP_NAME = re.compile(r"^[a-zA-Z0-9](?:[a-zA-Z0-9._-]{0,500}[a-zA-Z0-9])?$")
+
+
+def collection_for_group(group: Optional[str]) -> str:
+    """
+    Get the Chroma collection holding a document group.
+
+    Args:
+        group: Group name, or None for the default collection
+
+    Returns:
+        The collection name
+
+    Raises:
+        ValueError: If the group name cannot be used in a collection name
+    """
+    if not group:
+        return DEFAULT_COLLECTION
+    if not _GROUP_NAME.match(group):
+        raise ValueError("Group names may only contain letters, digits, '.', '_' and '-'")
+    return f"{GROUP_COLLECTION_PREFIX}{group}"
+
+
+class SearchPlan:
+    """How a search is executed.
+
+    ``route`` is ``exact`` (brute force over the vectors of ``document_ids``),
+    ``collection`` (one Chroma collection) or ``fanout`` (several collections,
+    results merged by distance). ``collections`` maps each collection to
+    search to the document IDs to restrict it to (None for no restriction).
+    """
+
+    def __init__(self, route: str, collections: Dict[str, Optional[List[str]]],
+                 document_ids: Optional[List[str]] = None):
+        self.route = route
+        self.collections = collections
+        self.document_ids = document_ids or []
+
+
+def plan_search(document_ids: Optional[List[str]], documents: Dict[str, dict],
+                exact_max_chunks: int, has_filters: bool = False) -> SearchPlan:
+    """
+    Pick the smallest index covering a search.
+
+    Args:
+        document_ids: Documents the search is restricted to, or None for all
+        documents: Metadata of the stored documents keyed by ID (chunk_count
+            and collection are used)
+        exact_max_chunks: Largest scope, in chunks, searched by brute force
+        has_filters: Whether metadata filters apply (these are evaluated by Chroma)
+
+    Returns:
+        The search plan
+    """
+    if not document_ids:
+        collections = sorted({meta.get("collection", DEFAULT_COLLECTION) for meta in documents.values()})
+        plan = SearchPlan(
+            "collection" if len(collections) <= 1 else "fanout",
+            {name: None for name in collections or [DEFAULT_COLLECTION]}
+        )
+    else:
+        # Unknown IDs (deleted documents) cannot match anything; keep the request's order
+        known = [doc_id for doc_id in dict.fromkeys(document_ids) if doc_id in documents]
+        chunk_counts = [documents[doc_id].get("chunk_count") for doc_id in known]
+        if (not has_filters and exact_max_chunks > 0 and None not in chunk_counts
+                and sum(chunk_counts) <= exact_max_chunks):
+            plan = SearchPlan("exact", {}, known)
+        else:
+            collections: Dict[str, Optional[List[str]]] = {}
+            for doc_id in known:
+                name = documents[doc_id].get("collection", DEFAULT_COLLECTION)
+                collections.setdefault(name, []).append(doc_id)
+            if not collections:
+                # Nothing to search in, but keep the usual empty-result path
+                collections = {DEFAULT_COLLECTION: list(document_ids)}
+            plan = SearchPlan("collection" if len(collections) == 1 else "fanout", collections)
+    RETRIEVAL_ROUTES.inc(route=plan.route)
+    return plan
+
+
+class DocumentVectors:
+    """The chunks of one document with their embedding vectors."""
+
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors: np.ndarray):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class VectorCache:
+    """LRU cache of per-document vectors, bounded by the total number of chunks.
+
+    Documents never change after they are indexed, so entries only have to be
+    dropped when a document is deleted.
+    """
+
+    def __init__(self, max_chunks: int = 100000):
+        self.max_chunks = max_chunks
+        self._entries: "OrderedDict[str, DocumentVectors]" = OrderedDict()
+        self._chunks = 0
+        self._lock = threading.Lock()
+
+    def get(self, document_id: str) -> Optional[DocumentVectors]:
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None:
+                self._entries.move_to_end(document_id)
+            record_cache_lookup("document_vectors", entry is not None)
+            return entry
+
+    def put(self, document_id: str, entry: DocumentVectors) -> None:
+        if len(entry) > self.max_chunks:
+            return
+        with self._lock:
+            old = self._entries.pop(document_id, None)
+            if old is not None:
+                self._chunks -= len(old)
+            self._entries[document_id] = entry
+            self._chunks += len(entry)
+            while self._chunks > self.max_chunks:
+                _, evicted = self._entries.popitem(last=False)
+                self._chunks -= len(evicted)
+
+    def invalidate(self, document_id: str) -> None:
+        with self._lock:
+            old = self._entries.pop(document_id, None)
+            if old is not None:
+                self._chunks -= len(old)
+
+
+def exact_search(queries: np.ndarray, vectors: np.ndarray, k: int,
+                 space: str = "l2") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k nearest vectors for every query by brute force.
+
+    Distances follow Chroma's definitions, so scores match those of the HNSW
+    search: squared Euclidean distance for ``l2``, 1 - cosine similarity for
+    ``cosine`` and 1 - dot product for ``ip``.
+
+    Args:
+        queries: Query vectors, shape (queries, dimensions)
+        vectors: Candidate vectors, shape (candidates, dimensions)
+        k: Number of neighbours per query
+        space: Chroma distance function of the collection
+
+    Returns:
+        Tuple of (indices, distances), each of shape (queries, min(k, candidates)),
+        closest first
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    if k == 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    if space == "cosine":
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    products = queries @ vectors.T
+    if space == "l2":
+        distances = (
+            np.einsum("ij,ij->i", queries, queries)[:, None]
+            - 2 * products
+            + np.einsum("ij,ij->i", vectors, vectors)[None, :]
+        )
+        np.maximum(distances, 0, out=distances)
+    else:
+        distances = 1 - products
+
+    if k < len(vectors):
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(len(vectors)), distances.shape)
+    candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(candidate_distances, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_distances, order, axis=1)
+
+
+def merge_results(result_sets: List[List[List[Tuple[Any, float]]]], k: int) -> List[List[Tuple[Any, float]]]:
+    """Merge per-collection results (one list of (chunk, distance) per query) into the k closest per query."""
+    if len(result_sets) == 1:
+        return result_sets[0]
+    return [
+        sorted((hit for hits in per_query for hit in hits), key=lambda hit: hit[1])[:k]
+        for per_query in zip(*result_sets)
+    ]
@@ -0,0 +1,98 @@
+"""
+Model residency module.
+This module keeps the configured Ollama model loaded: it prewarms the model at
+startup and after a model switch, and can ping it periodically so Ollama does
+not unload it between questions.
+
+Ollama unloads an idle model after its keep_alive period (5 minutes by
+default); the next question then pays the full load time, which is tens of
+seconds for larger models.
+"""
+from typing import Any, Dict, List, Optional, Union
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.metrics import OLLAMA_PREWARM_DURATION
+from app.utils.config import get_app_config, get_ollama_base_urls
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Loading a large model from disk can take a while
+PREWARM_TIMEOUT = 300.0
+
+
+def get_keep_alive(config: Optional[Dict[str, Any]] = None) -> Union[str, int]:
+    """
+    Get the keep_alive value sent to Ollama with every request.
+
+    Durations such as "30m" or "2h" are passed through; plain numbers are
+    seconds, and a negative number keeps the model loaded indefinitely.
+    """
+    config = config or get_app_config()
+    value = config.get("ollama_keep_alive", "30m")
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def prewarm_model(model: Optional[str] = None, base_urls: Optional[List[str]] = None,
+                  timeout: float = PREWARM_TIMEOUT) -> Dict[str, bool]:
+    """
+    Load a model on every configured Ollama server.
+
+    Sends an empty-prompt generate request, which makes Ollama load the model
+    (or refresh its keep_alive timer) without generating anything.
+
+    Args:
+        model: Model to load (defaults to the configured ollama_model)
+        base_urls: Ollama servers to load it on (defaults to the configured ones)
+        timeout: Seconds to wait for each server
+
+    Returns:
+        Mapping of base URL to whether the model is loaded there
+    """
+    config = get_app_config()
+    model = model or config["ollama_model"]
+    base_urls = base_urls or get_ollama_base_urls(config)
+    payload = {"model": model, "prompt": "", "stream": False, "keep_alive": get_keep_alive(config)}
+    results = {}
+    for base_url in base_urls:
+        start = time.perf_counter()
+        try:
+            response = httpx.post(f"{base_url.rstrip('/')}/api/generate", json=payload, timeout=timeout)
+            response.raise_for_status()
+            results[base_url] = True
+            logger.info(f"Model {model} loaded on {base_url} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            results[base_url] = False
+            logger.warning(f"Could not prewarm model {model} on {base_url}: {str(e)}")
+        OLLAMA_PREWARM_DURATION.observe(
+            time.perf_counter() - start, result="success" if results[base_url] else "failure"
+        )
+    return results
+
+
+async def prewarm_model_async(model: Optional[str] = None, base_urls: Optional[List[str]] = None) -> Dict[str, bool]:
+    """Run prewarm_model in the thread pool."""
+    return await run_in_threadpool(prewarm_model, model, base_urls)
+
+
+async def keep_warm_loop(interval: float) -> None:
+    """
+    Ping the configured model every ``interval`` seconds so it stays loaded.
+
+    The model and servers are read from the settings on every ping, so a
+    model switch is picked up without a restart.
+    """
+    logger.info(f"Keeping the Ollama model warm every {interval:g}s")
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await prewarm_model_async()
+        except Exception as e:
+            logger.error(f"Keep-warm ping failed: {str(e)}")
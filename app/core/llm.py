@@ -3,16 +3,119 @@ LLM utility module.
 This module provides functions for working with language models.
 """
 from fastapi import HTTPException
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import BaseLLM
+from langchain_core.outputs import GenerationChunk, LLMResult
 from langchain_ollama import OllamaLLM
+from ollama import ResponseError
+from pydantic import ConfigDict, Field
+from typing import Any, Dict, Iterator, List, Optional, Set
+import httpx
 import logging
+import threading
 
+from app.core.keep_alive import get_keep_alive
+from app.core.ollama_pool import OllamaBackend, OllamaPool, get_ollama_pool
 from app.utils.config import get_app_config
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Get application configuration
-app_config = get_app_config()
+
+def _is_backend_failure(error: Exception) -> bool:
+    """Errors that mean the backend, not the request, is at fault."""
+    if isinstance(error, (ConnectionError, httpx.TransportError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+
+def _is_missing_model(error: Exception) -> bool:
+    return isinstance(error, ResponseError) and error.status_code == 404
+
+
+class PooledOllamaLLM(BaseLLM):
+    """OllamaLLM that sends each prompt to a backend chosen by an OllamaPool.
+
+    A prompt that fails to connect, hits a server error or finds the model
+    missing is retried on the next backend, so a dead server costs one fast
+    failure instead of a failed answer.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    pool: OllamaPool
+    model: str
+    llm_kwargs: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pool"
+
+    def _backend_llm(self, backend: OllamaBackend) -> OllamaLLM:
+        return _get_backend_llm(backend.url, self.model, self.llm_kwargs)
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            tried: Set[str] = set()
+            while True:
+                backend = self.pool.choose(self.model, exclude=tried)
+                try:
+                    # OllamaLLM's own _generate path: the public invoke()/stream() would drop the
+                    # final chunk's generation_info (Ollama's token counts and durations), or
+                    # report tokens under a child run. Private API, hence the pinned
+                    # langchain-ollama version range in requirements.txt
+                    chunk = self._backend_llm(backend)._stream_with_aggregation(
+                        prompt, stop=stop, run_manager=run_manager, verbose=self.verbose, **kwargs
+                    )
+                except Exception as e:
+                    # A missing model says nothing about the backend's health
+                    self.pool.release(backend, success=not _is_backend_failure(e))
+                    if not (_is_backend_failure(e) or _is_missing_model(e)):
+                        raise
+                    if _is_missing_model(e):
+                        self.pool.forget_model(backend, self.model)
+                    tried.add(backend.url)
+                    logger.warning(f"Ollama backend {backend.url} failed, trying another: {str(e)}")
+                    continue
+                self.pool.release(backend, success=True)
+                chunk.generation_info = dict(chunk.generation_info or {}, backend=backend.url)
+                generations.append([chunk])
+                break
+        return LLMResult(generations=generations)
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        with self.pool.request(self.model) as backend:
+            yield from self._backend_llm(backend)._stream(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+
+_backend_llms: Dict[tuple, OllamaLLM] = {}
+_backend_llms_lock = threading.Lock()
+
+
+def _get_backend_llm(url: str, model: str, llm_kwargs: Dict[str, Any]) -> OllamaLLM:
+    """Get a cached OllamaLLM (and its HTTP client) for one backend."""
+    key = (url, model, tuple(sorted(llm_kwargs.items())))
+    with _backend_llms_lock:
+        llm = _backend_llms.get(key)
+        if llm is None:
+            llm = OllamaLLM(model=model, base_url=url, **llm_kwargs)
+            _backend_llms[key] = llm
+        return llm
+
+
 
 def get_llm(model_name=None, temperature=None, base_url=None):
     """Get the Ollama language model.
@@ -20,25 +123,35 @@ def get_llm(model_name=None, temperature=None, base_url=None):
     Args:
         model_name: Name of the Ollama model to use (overrides config)
         temperature: Temperature for text generation (overrides config)
-        base_url: URL of the Ollama server (overrides config)
+        base_url: URL of the Ollama server (overrides config and bypasses the backend pool)
         
     Returns:
-        An initialized OllamaLLM instance
+        An initialized OllamaLLM instance, or a PooledOllamaLLM when several
+        backends are configured in ollama_base_urls
         
     Raises:
         HTTPException: If Ollama server is unavailable
     """
-    # Use provided values or defaults from config
+    # Use provided values or defaults from config (read on every call so a
+    # model switch from the settings page takes effect immediately)
+    app_config = get_app_config()
     model = model_name or app_config["ollama_model"]
     temp = temperature if temperature is not None else app_config["temperature"]
     url = base_url or app_config["ollama_base_url"]
+    keep_alive = get_keep_alive(app_config)
     
     try:
         logger.info(f"Initializing Ollama LLM with model: {model}")
+        if not base_url:
+            pool = get_ollama_pool()
+            if len(pool.backends) > 1:
+                return PooledOllamaLLM(pool=pool, model=model, llm_kwargs={"temperature": temp, "keep_alive": keep_alive})
+            url = pool.backends[0].url
         return OllamaLLM(
             model=model,
             temperature=temp,
-            base_url=url
+            base_url=url,
+            keep_alive=keep_alive
             # stop=["\n\n"]
         )
     except Exception as e:
@@ -0,0 +1,305 @@
+"""
+Index maintenance module.
+This module checks that the document metadata and the vector index agree, and
+compacts the persisted index: it removes orphaned chunks, rebuilds the
+collections without the space left by deleted chunks (which rebuilds their
+HNSW graphs too), deletes the data Chroma leaves behind for deleted
+collections and vacuums the SQLite databases.
+
+Maintenance holds the document store's write lock, so uploads and deletions
+wait until it finishes. Searches keep being answered from the current data
+until each rebuilt collection replaces it; only vacuuming Chroma's database
+locks it, for the second or so the copy takes.
+"""
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.core.index_router import DEFAULT_COLLECTION, GROUP_COLLECTION_PREFIX
+from app.core.quantization import QUANTIZATION_MODES
+from app.core.state_store import STATE_DB_NAME
+from app.core.vector_index import (
+    LOCAL_INDEX_DIR,
+    OLD_COLLECTION_PREFIX,
+    REBUILD_COLLECTION_PREFIX,
+    ChromaIndex,
+    LocalIndex,
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Database of an embedded Chroma store inside the persist directory
+CHROMA_DB_NAME = "chroma.sqlite3"
+
+# Only one maintenance run at a time per process (the write lock covers other processes)
+_running = threading.Lock()
+
+
+class MaintenanceInProgressError(RuntimeError):
+    """Raised when index maintenance is already running."""
+
+
+def _is_uuid(name: str) -> bool:
+    try:
+        uuid.UUID(name)
+        return True
+    except ValueError:
+        return False
+
+
+def _size(path: str) -> int:
+    """Bytes used by a file or directory tree (files removed meanwhile count as empty)."""
+    if not os.path.isdir(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return sum(_size(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def disk_usage(persist_directory: str) -> Dict[str, int]:
+    """
+    Measure the persist directory.
+
+    Args:
+        persist_directory: Directory holding the vector index and the state database
+
+    Returns:
+        Bytes in total, used by Chroma (database and collection data), by the
+        local index and by the state database
+    """
+    usage = {"total_bytes": 0, "chroma_bytes": 0, "local_index_bytes": 0, "state_bytes": 0}
+    if not os.path.isdir(persist_directory):
+        return usage
+    for name in os.listdir(persist_directory):
+        size = _size(os.path.join(persist_directory, name))
+        usage["total_bytes"] += size
+        if name == LOCAL_INDEX_DIR:
+            usage["local_index_bytes"] += size
+        elif name.startswith(STATE_DB_NAME):
+            usage["state_bytes"] += size
+        elif name.startswith(CHROMA_DB_NAME) or _is_uuid(name):
+            usage["chroma_bytes"] += size
+    return usage
+
+
+def collection_names(store) -> List[str]:
+    """
+    List the collections of a document store: those its documents use and those on disk.
+
+    Args:
+        store: The DocumentStore
+
+    Returns:
+        Collection names, sorted
+    """
+    names = {DEFAULT_COLLECTION}
+    names.update(name for name in store.state.list_document_field_values("collection") if name)
+    if isinstance(store.index, ChromaIndex):
+        names.update(
+            collection.name for collection in store.index.db._client.list_collections()
+            if collection.name == DEFAULT_COLLECTION or collection.name.startswith(GROUP_COLLECTION_PREFIX)
+        )
+    else:
+        local_directory = os.path.join(store.persist_directory, LOCAL_INDEX_DIR)
+        if os.path.isdir(local_directory):
+            names.update(os.listdir(local_directory))
+    return sorted(names)
+
+
+def _leftover_collections(store) -> List[str]:
+    """Temporary Chroma collections left by an interrupted rebuild."""
+    if not isinstance(store.index, ChromaIndex):
+        return []
+    return sorted(
+        collection.name for collection in store.index.db._client.list_collections()
+        if collection.name.startswith((REBUILD_COLLECTION_PREFIX, OLD_COLLECTION_PREFIX))
+    )
+
+
+def _orphaned_segments(persist_directory: str) -> List[str]:
+    """Chroma data directories that no collection uses any more (Chroma keeps them after deletion)."""
+    path = os.path.join(persist_directory, CHROMA_DB_NAME)
+    if not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        used = {segment_id for (segment_id,) in conn.execute("SELECT id FROM segments")}
+    finally:
+        conn.close()
+    return sorted(
+        name for name in os.listdir(persist_directory)
+        if _is_uuid(name) and name not in used and os.path.isdir(os.path.join(persist_directory, name))
+    )
+
+
+def check_index(store) -> Dict[str, Any]:
+    """
+    Compare the document metadata with the chunks stored in the vector index.
+
+    Args:
+        store: The DocumentStore
+
+    Returns:
+        Report with the chunks and documents of each collection, the disk
+        usage, and the problems found:
+
+        - ``missing_documents``: documents without chunks in their collection
+        - ``chunk_count_mismatches``: documents with another number of chunks
+          than their metadata records
+        - ``orphaned_documents``: chunks of documents without metadata (left
+          by an interrupted upload or deletion), per document and collection
+        - ``unattributed_chunks``: chunks without a document ID
+        - ``leftover_collections``: temporary collections of an interrupted rebuild
+        - ``orphaned_segments``: Chroma data directories of deleted collections
+
+        ``consistent`` is True when none were found.
+    """
+    documents = store.state.list_documents()
+    collections, found = {}, {}
+    unattributed = 0
+    for name in collection_names(store):
+        counts = store._get_collection(name).document_chunk_counts()
+        unattributed += counts.pop(None, 0)
+        collections[name] = {"chunks": sum(counts.values()), "documents": len(counts)}
+        for document_id, chunks in counts.items():
+            found[(name, document_id)] = chunks
+
+    missing, mismatches = [], []
+    for document_id, metadata in documents.items():
+        collection = metadata.get("collection", DEFAULT_COLLECTION)
+        chunks = found.get((collection, document_id), 0)
+        expected = metadata.get("chunk_count")
+        if not chunks and expected != 0:
+            missing.append(document_id)
+        elif expected is not None and chunks != expected:
+            mismatches.append({
+                "document_id": document_id, "collection": collection, "expected": expected, "found": chunks
+            })
+    orphaned = [
+        {"document_id": document_id, "collection": collection, "chunks": chunks}
+        for (collection, document_id), chunks in sorted(found.items())
+        if document_id not in documents
+    ]
+
+    report = {
+        "documents": len(documents),
+        "collections": collections,
+        "missing_documents": missing,
+        "chunk_count_mismatches": mismatches,
+        "orphaned_documents": orphaned,
+        "unattributed_chunks": unattributed,
+        "leftover_collections": _leftover_collections(store),
+        "orphaned_segments": _orphaned_segments(store.persist_directory),
+        "size": disk_usage(store.persist_directory),
+    }
+    report["consistent"] = not (
+        missing or mismatches or orphaned or unattributed
+        or report["leftover_collections"] or report["orphaned_segments"]
+    )
+    return report
+
+
+def _databases(store) -> List[str]:
+    """SQLite databases of the store that can be vacuumed."""
+    paths = [os.path.join(store.persist_directory, CHROMA_DB_NAME), store.state.path]
+    local_directory = os.path.join(store.persist_directory, LOCAL_INDEX_DIR)
+    if os.path.isdir(local_directory):
+        paths += [os.path.join(local_directory, name, "chunks.db") for name in sorted(os.listdir(local_directory))]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _vacuum(path: str) -> None:
+    """Rewrite a SQLite database without its free pages."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+        # Shrink the write-ahead log too (a no-op for databases without one)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def compact_index(store, rebuild: bool = True, vacuum: bool = True, clean_orphans: bool = True,
+                  remove_missing: bool = False, quantization: Optional[str] = None,
+                  dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Compact the persisted index of a document store.
+
+    Args:
+        store: The DocumentStore
+        rebuild: Rebuild every collection without the space of deleted chunks
+        vacuum: Vacuum the SQLite databases
+        clean_orphans: Delete the chunks of documents without metadata, and
+            Chroma data directories of deleted collections
+        remove_missing: Delete the metadata of documents that have no chunks
+        quantization: Change the quantization of local index collections
+            while rebuilding them
+        dry_run: Only report what would be done
+
+    Returns:
+        The consistency report taken before compacting, what was done, and
+        the disk usage before and after
+
+    Raises:
+        MaintenanceInProgressError: If maintenance is already running
+        ValueError: If the quantization is unknown or the backend does not support it
+    """
+    if quantization is not None:
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+        if not isinstance(store.index, LocalIndex):
+            raise ValueError("Quantization requires the local vector backend")
+    if not _running.acquire(blocking=False):
+        raise MaintenanceInProgressError("Index maintenance is already running")
+    try:
+        start_time = time.perf_counter()
+        report: Dict[str, Any] = {"dry_run": dry_run}
+        with store.write_lock.acquire():
+            check = check_index(store)
+            report["check"] = check
+            report["size_before"] = check["size"]
+            report["removed_orphaned_chunks"] = 0
+            report["removed_documents"] = []
+            report["removed_segments"] = []
+            report["rebuilt"] = {}
+            report["vacuumed"] = []
+            if not dry_run:
+                if clean_orphans:
+                    for orphan in check["orphaned_documents"]:
+                        store._get_collection(orphan["collection"]).delete_document(orphan["document_id"])
+                        report["removed_orphaned_chunks"] += orphan["chunks"]
+                if remove_missing:
+                    for document_id in check["missing_documents"]:
+                        store.state.delete_document(document_id)
+                        store.vector_cache.invalidate(document_id)
+                        report["removed_documents"].append(document_id)
+                if rebuild:
+                    for name in check["collections"]:
+                        report["rebuilt"][name] = store._get_collection(name).rebuild(quantization)
+                if clean_orphans:
+                    # Listed again: rebuilding leaves the directories of the replaced collections
+                    for name in _orphaned_segments(store.persist_directory):
+                        shutil.rmtree(os.path.join(store.persist_directory, name), ignore_errors=True)
+                        report["removed_segments"].append(name)
+                if vacuum:
+                    for path in _databases(store):
+                        _vacuum(path)
+                        report["vacuumed"].append(os.path.relpath(path, store.persist_directory))
+        report["size_after"] = disk_usage(store.persist_directory)
+        report["reclaimed_bytes"] = report["size_before"]["total_bytes"] - report["size_after"]["total_bytes"]
+        report["seconds"] = time.perf_counter() - start_time
+    finally:
+        _running.release()
+    logger.info(
+        f"Index maintenance {'(dry run) ' if dry_run else ''}finished in {report['seconds']:.1f}s: "
+        f"{report['removed_orphaned_chunks']} orphaned chunks removed, {len(report['rebuilt'])} collections rebuilt, "
+        f"{report['reclaimed_bytes']} bytes reclaimed"
+    )
+    return report
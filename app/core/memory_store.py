@@ -1,103 +1,111 @@
 \
-from langchain.memory import ConversationBufferMemory
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from uuid import uuid4
 import logging
-import json
 import os
-from langchain.schema.messages import HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 
 import warnings
 from langchain_core._api.deprecation import LangChainDeprecationWarning
 
+from app.core.reasoning import strip_reasoning
+from app.core.state_store import StateStore, get_state_store
+from app.utils.config import get_app_config
+
+if TYPE_CHECKING:
+    from langchain.memory import ConversationBufferMemory
+
 warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
 
 logger = logging.getLogger(__name__)
 
-# Define the path for the conversation store file in the project root
+# Legacy JSON conversation store in the project root, imported into the state database once
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
 CONVERSATION_STORE_FILE = os.path.join(PROJECT_ROOT, "conversation_store.json")
 
-# Initialize conversation memory
-conversation_memories: Dict[str, ConversationBufferMemory] = {}
-
-def save_conversations():
-    """Saves the current state of conversation_memories to a JSON file."""
-    serializable_memories = {}
-    for conv_id, memory in conversation_memories.items():
-        serializable_memories[conv_id] = [
-            {"type": getattr(msg, 'type', type(msg).__name__.replace('Message', '').lower()), "content": msg.content}
-            for msg in getattr(memory.chat_memory, 'messages', [])
-        ]
-    try:
-        with open(CONVERSATION_STORE_FILE, 'w') as f:
-            json.dump(serializable_memories, f, indent=4)
-        logger.info(f"Conversations saved to {CONVERSATION_STORE_FILE}")
-    except IOError as e:
-        logger.error(f"Error saving conversations to {CONVERSATION_STORE_FILE}: {e}")
-
-def load_conversations():
-    """Loads conversations from the JSON file into conversation_memories."""
-    if not os.path.exists(CONVERSATION_STORE_FILE):
-        logger.info(f"Conversation store file not found at {CONVERSATION_STORE_FILE}. Starting with empty memories.")
+_state_store: Optional[StateStore] = None
+
+def get_conversation_store() -> StateStore:
+    """
+    Get the state store holding conversations.
+
+    Conversations live in the shared SQLite state database of the configured
+    persist directory, so every worker process sees the same history.
+    """
+    global _state_store
+    if _state_store is None:
+        _state_store = get_state_store(get_app_config()["chroma_persist_dir"])
+        _state_store.import_legacy_conversations(CONVERSATION_STORE_FILE)
+    return _state_store
+
+def set_conversation_store(store: StateStore) -> None:
+    """Use the given state store for conversations (e.g. in tests and benchmarks)."""
+    global _state_store
+    _state_store = store
+
+def _new_memory() -> "ConversationBufferMemory":
+    # Imported here: langchain.memory pulls in the LLM base classes, which are slow to import
+    from langchain.memory import ConversationBufferMemory
+    return ConversationBufferMemory(
+        memory_key="chat_history",
+        output_key="answer",
+        return_messages=True
+    )
+
+def _to_message(msg_type: str, content: str) -> BaseMessage:
+    if msg_type == 'ai':
+        # Answers saved before reasoning was split off may still contain it
+        return AIMessage(content=strip_reasoning(content))
+    # Human messages and unknown types
+    return HumanMessage(content=content)
+
+def _message_type(msg: BaseMessage) -> str:
+    return getattr(msg, 'type', type(msg).__name__.replace('Message', '').lower())
+
+def _load_memory(conversation_id: str) -> "ConversationBufferMemory":
+    memory = _new_memory()
+    memory.chat_memory.messages = [
+        _to_message(msg_type, content)
+        for msg_type, content in get_conversation_store().get_messages(conversation_id)
+    ]
+    return memory
+
+def save_messages(conversation_id: str, messages: List[BaseMessage]) -> None:
+    """
+    Append new messages of a conversation to the shared store.
+
+    Args:
+        conversation_id: The ID of the conversation
+        messages: Messages added since the memory was loaded
+    """
+    if not messages:
         return
+    get_conversation_store().append_messages(
+        conversation_id,
+        [(_message_type(msg), msg.content) for msg in messages]
+    )
+    logger.info(f"Saved {len(messages)} messages for conversation {conversation_id}")
 
-    try:
-        with open(CONVERSATION_STORE_FILE, 'r') as f:
-            loaded_data = json.load(f)
-        
-        for conv_id, messages_data in loaded_data.items():
-            memory = ConversationBufferMemory(
-                memory_key="chat_history",
-                output_key="answer",
-                return_messages=True
-            )
-            reconstructed_messages = []
-            for msg_data in messages_data:
-                msg_type = msg_data.get('type')
-                if msg_type == 'human':
-                    reconstructed_messages.append(HumanMessage(content=msg_data['content']))
-                elif msg_type == 'ai':
-                    reconstructed_messages.append(AIMessage(content=msg_data['content']))
-                else:
-                    # Fallback for unknown types
-                    reconstructed_messages.append(HumanMessage(content=msg_data['content']))
-            memory.chat_memory.messages = reconstructed_messages
-            conversation_memories[conv_id] = memory
-        logger.info(f"Conversations loaded from {CONVERSATION_STORE_FILE}")
-    except (IOError, json.JSONDecodeError) as e:
-        logger.error(f"Error loading conversations from {CONVERSATION_STORE_FILE}: {e}. Starting with empty memories.")
-        conversation_memories.clear()
-
-
-def get_or_create_memory(conversation_id: Optional[str]) -> Tuple[ConversationBufferMemory, str]:
+def get_or_create_memory(conversation_id: Optional[str]) -> Tuple["ConversationBufferMemory", str]:
     """
     Retrieves an existing conversation memory or creates a new one.
-    Saves conversations after creation or retrieval of a new one.
+    New conversations are stored immediately so other workers can find them.
     """
-    created_new = False
-    if conversation_id and conversation_id in conversation_memories:
-        memory = conversation_memories[conversation_id]
+    store = get_conversation_store()
+    if conversation_id and store.conversation_exists(conversation_id):
+        memory = _load_memory(conversation_id)
         logger.info(f"Using existing conversation memory for {conversation_id}")
     else:
-        memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            output_key="answer",
-            return_messages=True
-        )
+        memory = _new_memory()
         if not conversation_id:
             conversation_id = str(uuid4())
             logger.info(f"Generated new conversation_id: {conversation_id}")
-        conversation_memories[conversation_id] = memory
+        store.create_conversation(conversation_id)
         logger.info(f"Created new conversation memory for {conversation_id}")
-        created_new = True
-    
-    if created_new: # Save only if a new memory was added or a new ID was generated
-        save_conversations()
-        
+
     return memory, conversation_id
 
-def get_memory(conversation_id: str) -> Optional[ConversationBufferMemory]:
+def get_memory(conversation_id: str) -> Optional["ConversationBufferMemory"]:
     """
     Retrieves an existing conversation memory.
 
@@ -107,7 +115,9 @@ def get_memory(conversation_id: str) -> Optional[ConversationBufferMemory]:
     Returns:
         The ConversationBufferMemory if found, else None.
     """
-    return conversation_memories.get(conversation_id)
+    if not get_conversation_store().conversation_exists(conversation_id):
+        return None
+    return _load_memory(conversation_id)
 
 def list_conversation_ids() -> List[str]:
     """
@@ -116,7 +126,4 @@ def list_conversation_ids() -> List[str]:
     Returns:
         A list of conversation IDs.
     """
-    return list(conversation_memories.keys())
-
-# Load conversations when the module is initialized
-load_conversations()
+    return get_conversation_store().list_conversation_ids()
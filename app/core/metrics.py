@@ -0,0 +1,412 @@
+"""
+Metrics module.
+This module provides a small Prometheus-compatible metrics registry and the
+latency, token and retrieval metrics recorded on the QA and ingestion hot paths.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Content type for the Prometheus text exposition format
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default latency buckets in seconds (CPU inference can take minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+RATIO_BUCKETS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects it."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    """Render a label set as {name="value",...}."""
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """Base class for metrics with an optional set of label names."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Validate the given labels and return their values in declaration order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        """Return (sample name, labels, value) tuples for exposition."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increment the counter by the given amount."""
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        """Return the current value for the given labels."""
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            (self.name, list(zip(self.labelnames, key)), value)
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge to the given value."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increment the gauge."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrement the gauge."""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        """Return the current value for the given labels."""
+        return self._values.get(self._label_values(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        """Increment the gauge for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            (self.name, list(zip(self.labelnames, key)), value)
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """A histogram with cumulative buckets, a sum and a count."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # Per label set: (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record a single observation."""
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time spent in the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        """Return the number of observations for the given labels."""
+        state = self._values.get(self._label_values(labels))
+        return state[2] if state else 0
+
+    def get_sum(self, **labels) -> float:
+        """Return the sum of observations for the given labels."""
+        state = self._values.get(self._label_values(labels))
+        return state[1] if state else 0.0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        result = []
+        for key, (bucket_counts, total, count) in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                result.append((f"{self.name}_bucket", labels + [("le", _format_value(bound))], bucket_count))
+            result.append((f"{self.name}_bucket", labels + [("le", "+Inf")], count))
+            result.append((f"{self.name}_sum", labels, total))
+            result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+class MetricsRegistry:
+    """A collection of metrics that can be rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Register a metric and return it."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all registered metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Global registry used by the application
+REGISTRY = MetricsRegistry()
+
+# HTTP layer
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "docqa_http_requests_in_flight",
+    "Number of HTTP requests currently being processed."
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "docqa_http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ["method", "route", "status"]
+))
+
+# Question answering pipeline
+QA_STAGE_DURATION = REGISTRY.register(Histogram(
+    "docqa_qa_stage_duration_seconds",
+    "Latency of each question answering stage in seconds.",
+    ["stage"]
+))
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "docqa_llm_time_to_first_token_seconds",
+    "Time from sending a prompt to receiving the first generated token.",
+    ["stage"]
+))
+LLM_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "docqa_llm_prompt_tokens",
+    "Number of prompt tokens evaluated per LLM call.",
+    ["stage"],
+    buckets=TOKEN_BUCKETS
+))
+LLM_GENERATED_TOKENS = REGISTRY.register(Histogram(
+    "docqa_llm_generated_tokens",
+    "Number of tokens generated per LLM call.",
+    ["stage"],
+    buckets=TOKEN_BUCKETS
+))
+LLM_TOKENS_PER_SECOND = REGISTRY.register(Histogram(
+    "docqa_llm_tokens_per_second",
+    "Generation throughput per LLM call in tokens per second.",
+    ["stage"],
+    buckets=RATE_BUCKETS
+))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "docqa_llm_in_flight",
+    "Number of LLM generations currently running."
+))
+PROMPT_PREFIX_REUSE = REGISTRY.register(Histogram(
+    "docqa_prompt_prefix_reuse_ratio",
+    "Share of an answer prompt that repeats the start of the conversation's previous prompt.",
+    buckets=RATIO_BUCKETS
+))
+PROMPT_PREFIX_CHARS = REGISTRY.register(Counter(
+    "docqa_prompt_prefix_chars_total",
+    "Answer prompt characters that repeat the previous prompt's prefix (reused) or not (new).",
+    ["kind"]
+))
+CONDENSE_DECISIONS = REGISTRY.register(Counter(
+    "docqa_condense_decisions_total",
+    "Follow-up question rewriting outcomes (first_turn, disabled, self_contained, cached or rewritten).",
+    ["decision"]
+))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "docqa_llm_queue_depth",
+    "Number of questions waiting in the LLM scheduler queue."
+))
+LLM_SLOTS_IN_USE = REGISTRY.register(Gauge(
+    "docqa_llm_slots_in_use",
+    "Number of LLM scheduler slots currently held by questions."
+))
+LLM_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "docqa_llm_queue_wait_seconds",
+    "Time questions waited in the LLM scheduler queue before starting."
+))
+LLM_REJECTED = REGISTRY.register(Counter(
+    "docqa_llm_rejected_total",
+    "Questions rejected by the LLM scheduler by reason (queue_full or timeout).",
+    ["reason"]
+))
+OLLAMA_BACKEND_REQUESTS = REGISTRY.register(Counter(
+    "docqa_ollama_backend_requests_total",
+    "LLM calls per Ollama backend by result (success or failure).",
+    ["backend", "result"]
+))
+OLLAMA_BACKEND_OUTSTANDING = REGISTRY.register(Gauge(
+    "docqa_ollama_backend_outstanding",
+    "LLM calls currently outstanding per Ollama backend.",
+    ["backend"]
+))
+OLLAMA_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "docqa_ollama_circuit_open",
+    "Whether an Ollama backend is out of rotation after repeated failures (1) or not (0).",
+    ["backend"]
+))
+OLLAMA_PREWARM_DURATION = REGISTRY.register(Histogram(
+    "docqa_ollama_prewarm_seconds",
+    "Time taken to load (or keep loaded) the model on an Ollama server, by result.",
+    ["result"]
+))
+RETRIEVAL_HITS = REGISTRY.register(Histogram(
+    "docqa_retrieval_hits",
+    "Number of chunks returned per retrieval.",
+    buckets=COUNT_BUCKETS
+))
+RETRIEVAL_ROUTES = REGISTRY.register(Counter(
+    "docqa_retrieval_routes_total",
+    "Searches by index route (exact, collection or fanout).",
+    ["route"]
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "docqa_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"]
+))
+
+# Embeddings
+EMBEDDING_DURATION = REGISTRY.register(Histogram(
+    "docqa_embedding_duration_seconds",
+    "Latency of embedding calls in seconds.",
+    ["operation"]
+))
+EMBEDDED_TEXTS = REGISTRY.register(Counter(
+    "docqa_embedded_texts_total",
+    "Number of texts embedded.",
+    ["operation"]
+))
+
+# Document ingestion
+INGEST_STAGE_DURATION = REGISTRY.register(Histogram(
+    "docqa_ingest_stage_duration_seconds",
+    "Latency of each document ingestion stage in seconds.",
+    ["stage"]
+))
+INGESTED_PAGES = REGISTRY.register(Counter(
+    "docqa_ingested_pages_total",
+    "Number of document pages loaded during ingestion."
+))
+INGESTED_CHUNKS = REGISTRY.register(Counter(
+    "docqa_ingested_chunks_total",
+    "Number of chunks written to the vector store during ingestion."
+))
+BOILERPLATE_CHUNKS = REGISTRY.register(Counter(
+    "docqa_boilerplate_chunks_total",
+    "Number of boilerplate chunks found during ingestion, by action taken.",
+    ["action"]
+))
+
+# Startup
+WARMUP_DURATION = REGISTRY.register(Gauge(
+    "docqa_warmup_step_seconds",
+    "Duration of each startup warm-up step in seconds.",
+    ["step"]
+))
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Record a cache lookup result for hit rate reporting."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render_metrics() -> str:
+    """Render all application metrics in the Prometheus text format."""
+    return REGISTRY.render()
@@ -1,19 +1,131 @@
 import requests
-from typing import List
+import httpx
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
 
-def get_ollama_models(base_url: str) -> List[str]:
+from app.core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for Ollama when listing models
+MODELS_TIMEOUT = 3.0
+# Seconds a model list is served from the cache before it is refreshed in the background
+MODELS_CACHE_TTL = 30.0
+
+def _parse_models(data: dict) -> List[str]:
+    # The models are typically under the 'models' or 'models' key, depending on Ollama's API
+    # We'll try both for compatibility
+    if 'models' in data:
+        return [m['name'] for m in data['models']]
+    elif 'tags' in data:
+        return [m['name'] for m in data['tags']]
+    else:
+        return []
+
+def get_ollama_models(base_url: str, timeout: float = MODELS_TIMEOUT) -> List[str]:
     """Fetches the list of available models from the Ollama server."""
     try:
-        response = requests.get(f"{base_url.rstrip('/')}/api/tags")
+        response = requests.get(f"{base_url.rstrip('/')}/api/tags", timeout=timeout)
         response.raise_for_status()
-        data = response.json()
-        # The models are typically under the 'models' or 'models' key, depending on Ollama's API
-        # We'll try both for compatibility
-        if 'models' in data:
-            return [m['name'] for m in data['models']]
-        elif 'tags' in data:
-            return [m['name'] for m in data['tags']]
-        else:
-            return []
+        return _parse_models(response.json())
     except Exception as e:
         raise RuntimeError(f"Failed to fetch models from Ollama: {e}")
+
+async def fetch_ollama_models(base_url: str, timeout: float = MODELS_TIMEOUT) -> List[str]:
+    """Fetches the list of available models from the Ollama server without blocking the event loop."""
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(f"{base_url.rstrip('/')}/api/tags")
+            response.raise_for_status()
+            return _parse_models(response.json())
+    except Exception as e:
+        raise RuntimeError(f"Failed to fetch models from Ollama: {e}")
+
+class ModelListCache:
+    """Short-lived cache of model lists per Ollama base URL.
+
+    Fresh entries are returned directly. Stale entries are still returned
+    immediately while a refresh runs in the background, and are kept if the
+    refresh fails. Only the first request for a URL waits for Ollama, and
+    concurrent requests for it share a single fetch.
+    """
+
+    def __init__(self, ttl: float = MODELS_CACHE_TTL, timeout: float = MODELS_TIMEOUT):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries: Dict[str, Tuple[float, List[str]]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get(self, base_url: str) -> List[str]:
+        """
+        Get the models available on an Ollama server.
+
+        Args:
+            base_url: Base URL of the Ollama server
+
+        Returns:
+            List of model names
+
+        Raises:
+            RuntimeError: If nothing is cached and Ollama cannot be reached
+        """
+        entry = self._entries.get(base_url)
+        if entry is not None:
+            record_cache_lookup("ollama_models", True)
+            if time.monotonic() - entry[0] >= self.ttl:
+                self._refresh(base_url)
+            return entry[1]
+        record_cache_lookup("ollama_models", False)
+        return await asyncio.shield(self._refresh(base_url))
+
+    def _refresh(self, base_url: str) -> asyncio.Task:
+        """Start (or join) a refresh of one URL's model list."""
+        task = self._refreshing.get(base_url)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(base_url))
+            self._refreshing[base_url] = task
+            task.add_done_callback(lambda done: self._finish_refresh(base_url, done))
+        return task
+
+    def _finish_refresh(self, base_url: str, task: asyncio.Task) -> None:
+        self._refreshing.pop(base_url, None)
+        if not task.cancelled() and task.exception() is not None and base_url in self._entries:
+            logger.warning(f"Background refresh of models for {base_url} failed: {task.exception()}")
+
+    async def _fetch(self, base_url: str) -> List[str]:
+        models = await fetch_ollama_models(base_url, self.timeout)
+        self._entries[base_url] = (time.monotonic(), models)
+        return models
+
+    def invalidate(self, base_url: Optional[str] = None) -> None:
+        """Drop the cached list for one URL, or for all URLs."""
+        if base_url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(base_url, None)
+
+# Shared cache used by the API
+model_list_cache = ModelListCache()
+
+async def get_available_models(base_urls: List[str]) -> List[str]:
+    """
+    Get the models available on any of the given Ollama servers.
+
+    Args:
+        base_urls: Base URLs of the Ollama servers
+
+    Returns:
+        Sorted model names (first server's order when there is only one server)
+
+    Raises:
+        RuntimeError: If no server could be reached
+    """
+    results = await asyncio.gather(*(model_list_cache.get(url) for url in base_urls), return_exceptions=True)
+    lists = [result for result in results if not isinstance(result, BaseException)]
+    if not lists:
+        raise results[0]
+    if len(lists) == 1:
+        return lists[0]
+    return sorted(set(model for models in lists for model in models))
@@ -0,0 +1,226 @@
+"""
+Ollama backend pool module.
+This module spreads LLM calls over several Ollama servers, routing each call to
+a healthy backend that has the requested model with the fewest outstanding
+requests, and taking failing backends out of rotation for a while (circuit breaking).
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+import itertools
+import logging
+import threading
+import time
+
+import httpx
+
+from app.core.metrics import OLLAMA_BACKEND_OUTSTANDING, OLLAMA_BACKEND_REQUESTS, OLLAMA_CIRCUIT_OPEN
+from app.utils.config import get_app_config, get_ollama_base_urls
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Timeout for /api/tags lookups used for routing (seconds)
+TAGS_TIMEOUT = 2.0
+
+
+class OllamaUnavailableError(Exception):
+    """Raised when no Ollama backend can take a request."""
+
+
+def normalize_model_name(name: str) -> str:
+    """Return a model name with an explicit tag ("llama3" -> "llama3:latest")."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class OllamaBackend:
+    """State of one Ollama server: load, health and known models."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.models: Optional[Set[str]] = None
+        self.models_checked_at = 0.0
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.open_until > 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit": "open" if self.circuit_open else "closed",
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class OllamaPool:
+    """Least-outstanding-requests router over several Ollama backends.
+
+    Health is checked passively: failed calls count against a backend, and
+    after ``failure_threshold`` consecutive failures its circuit opens for
+    ``cooldown`` seconds. Once the cooldown has passed a single trial request
+    is let through; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, urls: List[str], failure_threshold: int = 3, cooldown: float = 30.0, tags_ttl: float = 60.0):
+        """
+        Args:
+            urls: Base URLs of the Ollama servers
+            failure_threshold: Consecutive failures before a backend is taken out of rotation
+            cooldown: Seconds a failing backend stays out of rotation
+            tags_ttl: Seconds a backend's model list (from /api/tags) is reused
+        """
+        if not urls:
+            raise ValueError("At least one Ollama base URL is required")
+        self.backends = [OllamaBackend(url) for url in dict.fromkeys(urls)]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.tags_ttl = tags_ttl
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+
+    def _available(self, backend: OllamaBackend, now: float) -> bool:
+        """Whether a backend may take a request (circuit closed, or due for a trial)."""
+        if not backend.circuit_open:
+            return True
+        # Half-open: allow a single trial request after the cooldown
+        return now >= backend.open_until and not backend.trial_in_flight
+
+    def _refresh_models(self, backend: OllamaBackend) -> None:
+        """
+        Update a backend's model list from /api/tags if it is stale.
+
+        Failed lookups are not retried before the TTL either (the model list
+        stays unknown meanwhile), so a backend answering /api/tags with errors
+        does not slow down every request.
+        """
+        if time.time() - backend.models_checked_at < self.tags_ttl:
+            return
+        try:
+            response = httpx.get(f"{backend.url.rstrip('/')}/api/tags", timeout=TAGS_TIMEOUT)
+            response.raise_for_status()
+            backend.models = {normalize_model_name(m["name"]) for m in response.json().get("models", [])}
+        except Exception as e:
+            logger.warning(f"Could not list models on Ollama backend {backend.url}: {str(e)}")
+            backend.models = None
+            if isinstance(e, httpx.TransportError):
+                with self._lock:
+                    self._record(backend, success=False)
+        backend.models_checked_at = time.time()
+
+    def choose(self, model: Optional[str] = None, exclude: Optional[Set[str]] = None) -> OllamaBackend:
+        """
+        Pick the backend for a request and count it as outstanding.
+
+        Backends known to have the model are preferred, then backends whose
+        model list is unknown; among those the least loaded one wins.
+
+        Args:
+            model: Model the request needs
+            exclude: URLs of backends that already failed this request
+
+        Returns:
+            The chosen backend; pass it to release() when the request finishes
+
+        Raises:
+            OllamaUnavailableError: If every backend is excluded or out of rotation
+        """
+        exclude = exclude or set()
+        wanted = normalize_model_name(model) if model else None
+        now = time.time()
+        candidates = [b for b in self.backends if b.url not in exclude and self._available(b, now)]
+        if not candidates:
+            raise OllamaUnavailableError("No healthy Ollama backend is available")
+
+        if wanted and len(self.backends) > 1:
+            for backend in candidates:
+                self._refresh_models(backend)
+            with_model = [b for b in candidates if b.models is not None and wanted in b.models]
+            unknown = [b for b in candidates if b.models is None]
+            candidates = with_model or unknown or candidates
+
+        with self._lock:
+            offset = next(self._rotation)
+            ordered = candidates[offset % len(candidates):] + candidates[:offset % len(candidates)]
+            backend = min(ordered, key=lambda b: b.outstanding)
+            backend.outstanding += 1
+            if backend.circuit_open:
+                backend.trial_in_flight = True
+        OLLAMA_BACKEND_OUTSTANDING.inc(backend=backend.url)
+        return backend
+
+    def _record(self, backend: OllamaBackend, success: bool) -> None:
+        """Update a backend's health after a call; the caller holds the lock."""
+        if success:
+            if backend.circuit_open:
+                logger.info(f"Ollama backend {backend.url} recovered")
+            backend.consecutive_failures = 0
+            backend.open_until = 0.0
+        else:
+            backend.consecutive_failures += 1
+            if backend.circuit_open or backend.consecutive_failures >= self.failure_threshold:
+                backend.open_until = time.time() + self.cooldown
+                logger.warning(
+                    f"Ollama backend {backend.url} taken out of rotation for {self.cooldown:g}s "
+                    f"after {backend.consecutive_failures} failures"
+                )
+        OLLAMA_BACKEND_REQUESTS.inc(backend=backend.url, result="success" if success else "failure")
+        OLLAMA_CIRCUIT_OPEN.set(1 if backend.circuit_open else 0, backend=backend.url)
+
+    def release(self, backend: OllamaBackend, success: bool) -> None:
+        """Finish a request on a backend and update its health."""
+        with self._lock:
+            backend.outstanding -= 1
+            backend.trial_in_flight = False
+            self._record(backend, success)
+        OLLAMA_BACKEND_OUTSTANDING.dec(backend=backend.url)
+
+    def forget_model(self, backend: OllamaBackend, model: str) -> None:
+        """Record that a backend does not have a model (e.g. after a 404)."""
+        with self._lock:
+            if backend.models is not None:
+                backend.models.discard(normalize_model_name(model))
+
+    @contextmanager
+    def request(self, model: Optional[str] = None, exclude: Optional[Set[str]] = None) -> Iterator[OllamaBackend]:
+        """Choose a backend for the duration of the block, marking it failed if the block raises."""
+        backend = self.choose(model, exclude)
+        success = False
+        try:
+            yield backend
+            success = True
+        finally:
+            self.release(backend, success)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Describe every backend (for health endpoints)."""
+        return [backend.to_dict() for backend in self.backends]
+
+
+_pool: Optional[OllamaPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ollama_pool() -> OllamaPool:
+    """
+    Get the process-wide pool of configured Ollama backends.
+
+    The pool is rebuilt when the configured URLs change.
+    """
+    global _pool
+    config = get_app_config()
+    urls = get_ollama_base_urls(config)
+    with _pool_lock:
+        if _pool is None or [b.url for b in _pool.backends] != list(dict.fromkeys(urls)):
+            _pool = OllamaPool(
+                urls,
+                failure_threshold=int(config["ollama_circuit_failures"]),
+                cooldown=float(config["ollama_circuit_cooldown"]),
+            )
+            logger.info(f"Ollama backend pool: {', '.join(urls)}")
+        return _pool
@@ -0,0 +1,148 @@
+"""
+Prompt assembly module.
+This module lays out the answer prompt so consecutive prompts share as long a
+prefix as possible, and measures how much of each prompt repeats the previous
+one.
+
+Ollama keeps the KV cache of the last prompt a model processed and only
+evaluates the tokens after the longest prefix shared with it. The answer
+prompt therefore puts stable content first (the instructions, then the
+retrieved context in document order) and the question last. Retrieved chunks
+are sorted by their position in their document instead of by relevance, so
+follow-up questions that retrieve mostly the same chunks produce the same
+prompt prefix and skip re-evaluating it.
+"""
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import logging
+import os
+import threading
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.prompts import PromptTemplate
+from langchain_core.retrievers import BaseRetriever
+
+from app.core.metrics import PROMPT_PREFIX_CHARS, PROMPT_PREFIX_REUSE
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CONTEXT_ORDERS = ("stable", "relevance")
+
+# Instructions and context first, the question last (same wording as
+# LangChain's default question answering prompt)
+QA_PROMPT = PromptTemplate.from_template(
+    "Use the following pieces of context to answer the question at the end. If you don't know "
+    "the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\n"
+    "Question: {question}\n"
+    "Helpful Answer:"
+)
+
+
+def get_context_order(config: Optional[dict] = None) -> str:
+    """Return the configured context order (stable or relevance)."""
+    config = config or get_app_config()
+    order = config.get("context_order", "stable")
+    if order not in CONTEXT_ORDERS:
+        logger.warning(f"Unknown context_order '{order}', using 'stable'")
+        order = "stable"
+    return order
+
+
+def _position(doc: Document) -> Tuple:
+    metadata = doc.metadata or {}
+    return (
+        str(metadata.get("file_name", "")),
+        str(metadata.get("document_id", "")),
+        int(metadata.get("page", 0) or 0),
+        int(metadata.get("start_index", 0) or 0),
+        doc.page_content,
+    )
+
+
+def stable_order(documents: List[Document]) -> List[Document]:
+    """Sort retrieved chunks by document and position within the document."""
+    return sorted(documents, key=_position)
+
+
+class StableOrderRetriever(BaseRetriever):
+    """Retriever that returns another retriever's chunks in document order."""
+
+    retriever: BaseRetriever
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # The inner retriever runs without callbacks so retrieval is only reported once
+        return stable_order(self.retriever.invoke(query))
+
+
+def build_retriever(retriever: BaseRetriever, config: Optional[dict] = None) -> BaseRetriever:
+    """Wrap a retriever according to the configured context_order."""
+    if get_context_order(config) == "stable":
+        return StableOrderRetriever(retriever=retriever)
+    return retriever
+
+
+def build_answer_prompt(question: str, documents: List[Document], config: Optional[dict] = None) -> str:
+    """
+    Build the answer prompt for a question and its retrieved chunks.
+
+    Formats the chunks like the chain's "stuff" step (joined by blank
+    lines), in the configured context order.
+    """
+    if get_context_order(config) == "stable":
+        documents = stable_order(documents)
+    context = "\n\n".join(doc.page_content for doc in documents)
+    return QA_PROMPT.format(context=context, question=question)
+
+
+def common_prefix_length(first: str, second: str) -> int:
+    """Length of the longest common prefix of two strings."""
+    return len(os.path.commonprefix([first, second]))
+
+
+class PrefixReuseTracker:
+    """Remember the last answer prompt per key and report how much the next one reuses.
+
+    The reuse ratio is the share of a prompt's characters that repeat the
+    start of the previous prompt with the same key (a conversation). It is an
+    upper bound on Ollama's cache hits: another conversation's prompt on the
+    same server may have replaced the cache in between.
+    """
+
+    def __init__(self, max_keys: int = 256):
+        self.max_keys = max_keys
+        self._prompts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, prompt: str) -> Optional[float]:
+        """
+        Record a prompt and compare it with the previous one for the key.
+
+        Args:
+            key: What prompts are compared by (e.g. the conversation ID)
+            prompt: The prompt about to be sent
+
+        Returns:
+            Share of the prompt repeating the previous prompt's prefix, or
+            None for the first prompt of a key
+        """
+        with self._lock:
+            previous = self._prompts.pop(key, None)
+            self._prompts[key] = prompt
+            while len(self._prompts) > self.max_keys:
+                self._prompts.popitem(last=False)
+        if previous is None or not prompt:
+            return None
+        shared = common_prefix_length(previous, prompt)
+        ratio = shared / len(prompt)
+        PROMPT_PREFIX_REUSE.observe(ratio)
+        PROMPT_PREFIX_CHARS.inc(shared, kind="reused")
+        PROMPT_PREFIX_CHARS.inc(len(prompt) - shared, kind="new")
+        return ratio
+
+
+# Shared tracker used by the question answering route
+prefix_tracker = PrefixReuseTracker()
@@ -0,0 +1,152 @@
+"""
+Vector quantization module.
+This module stores vectors as int8 codes with one float32 scale per vector
+(symmetric scalar quantization) and searches them with full-precision
+re-scoring.
+
+Codes take a quarter of the memory of float32 vectors. Searching the codes
+ranks candidates approximately; the best k * rescore_factor candidates are
+then ranked again with their float32 vectors, which are read from disk for
+those rows only. Results therefore carry exact distances, and the float32
+vectors do not have to stay in memory.
+"""
+from typing import List, Tuple
+import logging
+
+import numpy as np
+
+from app.core.hnsw import distances
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "int8")
+INT8_MAX = 127
+
+# Rows scored at once by quantized_search (bounds its temporary memory)
+SEARCH_BLOCK_ROWS = 8192
+
+
+def quantize_int8(vectors) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize vectors to int8, each with its own scale.
+
+    Args:
+        vectors: Vectors, shape (rows, dimensions)
+
+    Returns:
+        Tuple of (int8 codes, float32 scales) such that codes * scales
+        approximates the vectors
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1, initial=0) / INT8_MAX
+    scales = np.where(scales > 0, scales, 1).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Approximate float32 vectors from int8 codes and their scales."""
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+class QuantizedVectors:
+    """Read-only view of int8 vectors that dequantizes the rows it is indexed with.
+
+    Lets the HNSW graph walk the codes instead of the float32 vectors.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray, norms: np.ndarray):
+        self.codes = codes
+        self.scales = scales
+        self.norms = norms
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.codes.shape
+
+    def __getitem__(self, index) -> np.ndarray:
+        return dequantize_int8(self.codes[index], self.scales[index])
+
+
+def squared_norms(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Squared norms of the vectors approximated by int8 codes."""
+    codes = codes.astype(np.float32)
+    return (np.einsum("ij,ij->i", codes, codes) * np.square(scales)).astype(np.float32)
+
+
+def quantized_search(queries: np.ndarray, codes: np.ndarray, scales: np.ndarray, norms: np.ndarray,
+                     k: int, space: str = "l2") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Approximate brute-force search over int8 vectors.
+
+    Scores are computed from the codes, scales and squared norms without
+    dequantizing the vectors, block by block so memory use stays bounded.
+
+    Args:
+        queries: Query vectors, shape (queries, dimensions)
+        codes: int8 codes, shape (rows, dimensions)
+        scales: Scale of each row
+        norms: Squared norm of each row (see squared_norms)
+        k: Number of candidates per query
+        space: Distance function (l2, cosine or ip)
+
+    Returns:
+        Tuple of (row indices, approximate distances), closest first
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_distances = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(codes), SEARCH_BLOCK_ROWS):
+        stop = start + SEARCH_BLOCK_ROWS
+        products = (queries @ codes[start:stop].astype(np.float32).T) * scales[start:stop]
+        if space == "l2":
+            block_distances = query_norms + norms[start:stop] - 2 * products
+        elif space == "cosine":
+            block_distances = 1 - products / np.maximum(np.sqrt(query_norms * norms[start:stop]), 1e-12)
+        else:
+            block_distances = 1 - products
+        block_rows = np.broadcast_to(np.arange(start, start + products.shape[1]), products.shape)
+        rows = np.concatenate([best_rows, block_rows], axis=1)
+        block_distances = np.concatenate([best_distances, block_distances], axis=1)
+        if block_distances.shape[1] > k:
+            keep = np.argpartition(block_distances, k - 1, axis=1)[:, :k]
+            rows = np.take_along_axis(rows, keep, axis=1)
+            block_distances = np.take_along_axis(block_distances, keep, axis=1)
+        best_rows, best_distances = rows, block_distances
+    order = np.argsort(best_distances, axis=1, kind="stable")
+    return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_distances, order, axis=1)
+
+
+def rescore(queries: np.ndarray, candidates: List[np.ndarray], vectors: np.ndarray, k: int,
+            space: str = "l2") -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Rank candidate rows again with their full-precision vectors.
+
+    Args:
+        queries: Query vectors
+        candidates: Candidate rows for each query
+        vectors: Full-precision vectors (e.g. a memory map; only candidate rows are read)
+        k: Number of rows to keep per query
+        space: Distance function (l2, cosine or ip)
+
+    Returns:
+        Tuple of (rows, exact distances) per query, closest first
+    """
+    all_rows, all_distances = [], []
+    for query, rows in zip(np.asarray(queries, dtype=np.float32), candidates):
+        # Sorted rows read the memory map sequentially
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if not len(rows):
+            all_rows.append(rows)
+            all_distances.append(np.empty(0, dtype=np.float32))
+            continue
+        exact = distances(query, np.asarray(vectors[rows], dtype=np.float32), space)
+        order = np.argsort(exact, kind="stable")[:k]
+        all_rows.append(rows[order])
+        all_distances.append(exact[order])
+    return all_rows, all_distances
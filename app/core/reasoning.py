@@ -0,0 +1,68 @@
+"""
+Reasoning output module.
+This module separates the reasoning ("thinking") of reasoning models such as
+deepseek-r1 from their final answer.
+
+These models wrap their reasoning in <think>...</think> before the answer.
+The reasoning is often longer than the answer itself, so it is returned to the
+client separately and never stored in the conversation memory, where it would
+be sent back to the model with every later question.
+"""
+from typing import Optional, Tuple
+import logging
+import re
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+_THINK_BLOCK = re.compile(r"<think>(.*?)</think>", re.DOTALL | re.IGNORECASE)
+
+
+def split_reasoning(text: str) -> Tuple[Optional[str], str]:
+    """
+    Split a model response into its reasoning and its final answer.
+
+    Handles complete <think> blocks, a response cut off inside an unclosed
+    <think> block, and a closing </think> without an opening tag (some chat
+    templates put the opening tag in the prompt).
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        Tuple of (reasoning or None, final answer)
+    """
+    if not text:
+        return None, text or ""
+
+    parts = []
+
+    def _collect(match: re.Match) -> str:
+        parts.append(match.group(1).strip())
+        return ""
+
+    answer = _THINK_BLOCK.sub(_collect, text)
+
+    lowered = answer.lower()
+    close = lowered.find(THINK_CLOSE)
+    if close != -1 and THINK_OPEN not in lowered[:close]:
+        # Opening tag was part of the prompt
+        parts.insert(0, answer[:close].strip())
+        answer = answer[close + len(THINK_CLOSE):]
+    else:
+        start = lowered.find(THINK_OPEN)
+        if start != -1:
+            # The response ended before the reasoning did: there is no answer
+            parts.append(answer[start + len(THINK_OPEN):].strip())
+            answer = answer[:start]
+
+    reasoning = "\n\n".join(part for part in parts if part)
+    return reasoning or None, answer.strip()
+
+
+def strip_reasoning(text: str) -> str:
+    """Return only the final answer of a model response."""
+    return split_reasoning(text)[1]
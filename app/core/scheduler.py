@@ -0,0 +1,228 @@
+"""
+LLM scheduling module.
+This module provides admission control for LLM work: a bounded priority queue
+in front of a fixed number of generation slots, with per-conversation fairness
+and queue-time deadlines.
+
+Ollama can only serve a few generations at once; everything beyond that is
+held here, where it is visible in the metrics and rejected quickly when the
+queue is full or a question has waited too long.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from app.core.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_REJECTED, LLM_SLOTS_IN_USE
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class SchedulerRejected(Exception):
+    """Raised when a request cannot be admitted to the LLM."""
+
+    reason = "rejected"
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(SchedulerRejected):
+    """The queue already holds the maximum number of waiting requests."""
+
+    reason = "queue_full"
+
+
+class QueueTimeoutError(SchedulerRejected):
+    """The request waited longer than the queue timeout."""
+
+    reason = "timeout"
+
+
+class _Waiter:
+    __slots__ = ("future", "conversation", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, conversation: str):
+        self.future = future
+        self.conversation = conversation
+        self.enqueued_at = time.perf_counter()
+
+
+class LLMScheduler:
+    """Bounded priority queue with per-conversation fairness in front of the LLM.
+
+    Waiting requests are ordered by (priority, round, arrival). A conversation's
+    round grows with each request it already has waiting or running, so one
+    client firing many questions is interleaved with everyone else instead of
+    starving them. All state is touched from the event loop only.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queue: int = 32, queue_timeout: float = 60.0):
+        """
+        Args:
+            max_in_flight: Number of requests allowed to use the LLM at once
+            max_queue: Maximum number of waiting requests (0 = no waiting, reject when busy)
+            queue_timeout: Seconds a request may wait for a slot before it is rejected
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._heap: List[Tuple[int, int, int, _Waiter]] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        # Requests waiting or running per conversation, used to compute rounds
+        self._active: Dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of slots currently held."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return self._queued
+
+    def _retry_after(self) -> float:
+        """Rough estimate of how long until the queue has room again."""
+        return max(1.0, round(self.queue_timeout / 2))
+
+    def _track(self, conversation: str, delta: int) -> None:
+        count = self._active.get(conversation, 0) + delta
+        if count > 0:
+            self._active[conversation] = count
+        else:
+            self._active.pop(conversation, None)
+
+    def _grant(self) -> None:
+        """Hand free slots to the best waiting requests."""
+        while self._heap and self._in_flight < self.max_in_flight:
+            waiter = heapq.heappop(self._heap)[-1]
+            if waiter.future.done():
+                # Timed out or cancelled; already removed from the counts
+                continue
+            self._queued -= 1
+            LLM_QUEUE_DEPTH.dec()
+            self._in_flight += 1
+            LLM_SLOTS_IN_USE.inc()
+            waiter.future.set_result(None)
+
+    def _release(self, conversation: str) -> None:
+        self._in_flight -= 1
+        LLM_SLOTS_IN_USE.dec()
+        self._track(conversation, -1)
+        self._grant()
+
+    def _reject(self, error: SchedulerRejected) -> SchedulerRejected:
+        LLM_REJECTED.inc(reason=error.reason)
+        logger.warning(f"LLM request rejected ({error.reason}): {error}")
+        return error
+
+    async def _acquire(self, conversation: str, priority: int) -> float:
+        """Wait for a slot; returns the time spent waiting in seconds."""
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            LLM_SLOTS_IN_USE.inc()
+            self._track(conversation, 1)
+            LLM_QUEUE_WAIT.observe(0.0)
+            return 0.0
+
+        if self._queued >= self.max_queue:
+            raise self._reject(QueueFullError(
+                f"LLM queue is full ({self._queued} waiting)", self._retry_after()
+            ))
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), conversation)
+        round_number = self._active.get(conversation, 0)
+        heapq.heappush(self._heap, (priority, round_number, next(self._sequence), waiter))
+        self._queued += 1
+        LLM_QUEUE_DEPTH.inc()
+        self._track(conversation, 1)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just as we gave up on it; hand it back
+                self._release(conversation)
+            else:
+                waiter.future.cancel()
+                self._queued -= 1
+                LLM_QUEUE_DEPTH.dec()
+                self._track(conversation, -1)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(QueueTimeoutError(
+                    f"Timed out after waiting {self.queue_timeout:g}s for the LLM", self._retry_after()
+                )) from None
+            raise
+
+        waited = time.perf_counter() - waiter.enqueued_at
+        LLM_QUEUE_WAIT.observe(waited)
+        return waited
+
+    @asynccontextmanager
+    async def slot(self, conversation_id: Optional[str] = None, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[float]:
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Args:
+            conversation_id: Conversation the request belongs to, used for fairness
+            priority: Lower values are served first (see PRIORITY_INTERACTIVE and PRIORITY_BATCH)
+
+        Yields:
+            Seconds the request waited in the queue
+
+        Raises:
+            QueueFullError: If the queue is full
+            QueueTimeoutError: If no slot became free within the queue timeout
+        """
+        conversation = conversation_id or ""
+        waited = await self._acquire(conversation, priority)
+        try:
+            yield waited
+        finally:
+            self._release(conversation)
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    Get the process-wide LLM scheduler configured from the application settings.
+
+    The limits apply per worker process; with several workers the effective
+    number of concurrent generations is llm_max_in_flight times the worker count.
+    """
+    global _scheduler
+    if _scheduler is None:
+        config = get_app_config()
+        _scheduler = LLMScheduler(
+            max_in_flight=int(config["llm_max_in_flight"]),
+            max_queue=int(config["llm_queue_size"]),
+            queue_timeout=float(config["llm_queue_timeout"]),
+        )
+        logger.info(
+            f"LLM scheduler: {_scheduler.max_in_flight} in flight, "
+            f"queue size {_scheduler.max_queue}, timeout {_scheduler.queue_timeout:g}s"
+        )
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[LLMScheduler]) -> None:
+    """Replace the process-wide scheduler (None rebuilds it from the settings on next use)."""
+    global _scheduler
+    _scheduler = scheduler
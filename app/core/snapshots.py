@@ -0,0 +1,354 @@
+"""
+Snapshot module.
+This module takes point-in-time snapshots of the persist directory (the
+vector index, document metadata and conversations) and restores them.
+
+Snapshots are incremental: files are split into fixed-size blocks stored once
+under their SHA-256 in a shared object directory, and each snapshot is a
+manifest listing the blocks of every file. Files whose size and modification
+time did not change since the previous snapshot are not read again, and
+append-only files (such as the local index vectors) only add their new
+blocks. SQLite databases are copied with SQLite's online backup, so they are
+consistent even while the service writes to them.
+
+Layout of a snapshot directory::
+
+    objects/ab/abcdef...    blocks, named after their SHA-256
+    manifests/<name>.json   one manifest per snapshot
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from app.utils.file_lock import InterProcessLock
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Size of the blocks files are split into
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Files that are never part of a snapshot: locks, temporary files, and SQLite
+# journals (databases are backed up whole)
+_EXCLUDED_FILE = re.compile(r"(^\.write\.lock$|\.tmp$|-(wal|shm|journal)$)")
+_SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def _is_sqlite(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def _backup_sqlite(path: str, destination: str) -> None:
+    """Copy a SQLite database consistently, while other connections may write to it."""
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        target = sqlite3.connect(destination)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+class SnapshotStore:
+    """Directory of incremental snapshots sharing their blocks."""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directory of the snapshots (created if missing)
+        """
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.manifests_dir = os.path.join(self.root, "manifests")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        # Keeps prune() from removing blocks of a snapshot being written
+        self.lock = InterProcessLock(os.path.join(self.root, ".lock"))
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.manifests_dir, f"{name}.json")
+
+    def _store_blocks(self, path: str) -> Tuple[List[str], int]:
+        """Split a file into blocks and store the new ones; returns (block digests, bytes stored)."""
+        digests, stored = [], 0
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(BLOCK_SIZE)
+                if not block:
+                    break
+                digest = hashlib.sha256(block).hexdigest()
+                digests.append(digest)
+                object_path = self._object_path(digest)
+                if os.path.exists(object_path):
+                    continue
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                temp_path = f"{object_path}.{os.getpid()}.tmp"
+                with open(temp_path, "wb") as out:
+                    out.write(block)
+                os.replace(temp_path, object_path)
+                stored += len(block)
+        return digests, stored
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the snapshots (name, creation time, files and bytes), oldest first."""
+        snapshots = []
+        for file_name in os.listdir(self.manifests_dir):
+            if file_name.endswith(".json"):
+                manifest = self.load(file_name[:-len(".json")])
+                snapshots.append({key: value for key, value in manifest.items() if key != "files"})
+        return sorted(snapshots, key=lambda snapshot: snapshot["created_at"])
+
+    def load(self, name: str) -> Dict[str, Any]:
+        """
+        Read the manifest of a snapshot.
+
+        Args:
+            name: Snapshot name, or ``latest``
+
+        Raises:
+            KeyError: If there is no such snapshot
+        """
+        if name == "latest":
+            snapshots = self.list()
+            if not snapshots:
+                raise KeyError("There are no snapshots")
+            name = snapshots[-1]["name"]
+        path = self._manifest_path(name)
+        if not _SNAPSHOT_NAME.match(name) or not os.path.exists(path):
+            raise KeyError(f"Snapshot not found: {name}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def create(self, persist_directory: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Snapshot a directory.
+
+        Callers keep the files from changing meanwhile (except SQLite
+        databases, which are backed up online); see snapshot_document_store.
+
+        Args:
+            persist_directory: Directory to snapshot
+            name: Snapshot name (defaults to the UTC time)
+
+        Returns:
+            The snapshot summary: name, creation time, files, bytes, bytes
+            stored by this snapshot and seconds taken
+
+        Raises:
+            ValueError: If the name is invalid or already used
+        """
+        start_time = time.perf_counter()
+        created_at = datetime.now(timezone.utc)
+        name = name or created_at.strftime("%Y%m%dT%H%M%S%fZ")
+        if not _SNAPSHOT_NAME.match(name) or name == "latest":
+            raise ValueError(f"Invalid snapshot name: {name}")
+        persist_directory = os.path.abspath(persist_directory)
+        with self.lock.acquire():
+            if os.path.exists(self._manifest_path(name)):
+                raise ValueError(f"Snapshot {name} already exists")
+            previous = self.list()
+            previous_files = self.load(previous[-1]["name"])["files"] if previous else {}
+            files, stored = {}, 0
+            with tempfile.TemporaryDirectory(dir=self.root) as temp_dir:
+                for relative_path, path in _walk(persist_directory, exclude=self.root):
+                    stat = os.stat(path)
+                    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                    if _is_sqlite(path):
+                        copy_path = os.path.join(temp_dir, "backup.db")
+                        _backup_sqlite(path, copy_path)
+                        entry["size"] = os.path.getsize(copy_path)
+                        entry["blocks"], file_stored = self._store_blocks(copy_path)
+                        os.remove(copy_path)
+                    else:
+                        unchanged = previous_files.get(relative_path)
+                        if unchanged and (unchanged["size"], unchanged["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                            entry["blocks"], file_stored = unchanged["blocks"], 0
+                        else:
+                            entry["blocks"], file_stored = self._store_blocks(path)
+                    files[relative_path] = entry
+                    stored += file_stored
+            manifest = {
+                "name": name,
+                "created_at": created_at.isoformat(),
+                "source": persist_directory,
+                "file_count": len(files),
+                "bytes": sum(entry["size"] for entry in files.values()),
+                "stored_bytes": stored,
+                "seconds": round(time.perf_counter() - start_time, 3),
+                "files": files,
+            }
+            temp_path = f"{self._manifest_path(name)}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, self._manifest_path(name))
+        logger.info(
+            f"Snapshot {name}: {manifest['file_count']} files, {manifest['bytes']} bytes "
+            f"({stored} new) in {manifest['seconds']}s"
+        )
+        return {key: value for key, value in manifest.items() if key != "files"}
+
+    def restore(self, name: str, target: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Restore a snapshot into a directory.
+
+        The files are written to a temporary sibling of the target and
+        verified, then swapped in; an existing target is kept next to it as
+        ``<target>.before-restore``. Nothing may use the target meanwhile
+        (stop the server, or restore into a new directory).
+
+        Args:
+            name: Snapshot name, or ``latest``
+            target: Directory to restore into
+            force: Replace a target that is not empty
+
+        Returns:
+            The snapshot restored, files and bytes written, the path of the
+            previous contents (if any) and seconds taken
+
+        Raises:
+            KeyError: If there is no such snapshot
+            FileExistsError: If the target is not empty and force is not set
+            ValueError: If a block is missing or corrupt
+        """
+        start_time = time.perf_counter()
+        manifest = self.load(name)
+        target = os.path.abspath(target)
+        if os.path.isdir(target) and os.listdir(target) and not force:
+            raise FileExistsError(f"{target} is not empty; pass force to replace it")
+        parent = os.path.dirname(target)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f"{os.path.basename(target)}.restore-", dir=parent)
+        for relative_path in manifest["files"]:
+            if relative_path.startswith("/") or ".." in relative_path.split("/"):
+                raise ValueError(f"Snapshot {manifest['name']} has an invalid path: {relative_path}")
+        try:
+            with ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) + 4)) as executor:
+                list(executor.map(
+                    lambda item: self._restore_file(item[1], os.path.join(staging, *item[0].split("/"))),
+                    manifest["files"].items()
+                ))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        previous = None
+        if os.path.exists(target):
+            previous = f"{target}.before-restore"
+            shutil.rmtree(previous, ignore_errors=True)
+            os.replace(target, previous)
+        os.replace(staging, target)
+        seconds = round(time.perf_counter() - start_time, 3)
+        logger.info(f"Restored snapshot {manifest['name']} into {target} in {seconds}s")
+        return {
+            "name": manifest["name"],
+            "target": target,
+            "file_count": manifest["file_count"],
+            "bytes": manifest["bytes"],
+            "previous": previous,
+            "seconds": seconds,
+        }
+
+    def _restore_file(self, entry: Dict[str, Any], path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            for digest in entry["blocks"]:
+                try:
+                    with open(self._object_path(digest), "rb") as f:
+                        block = f.read()
+                except FileNotFoundError:
+                    raise ValueError(f"Snapshot block {digest} is missing") from None
+                if hashlib.sha256(block).hexdigest() != digest:
+                    raise ValueError(f"Snapshot block {digest} is corrupt")
+                out.write(block)
+        if os.path.getsize(path) != entry["size"]:
+            raise ValueError(f"Restored {path} has the wrong size")
+
+    def prune(self, keep: int) -> Dict[str, Any]:
+        """
+        Delete all but the newest snapshots, and the blocks only they used.
+
+        Args:
+            keep: Number of snapshots to keep (at least 1)
+
+        Returns:
+            Names of the deleted snapshots, and blocks and bytes freed
+        """
+        if keep < 1:
+            raise ValueError("At least one snapshot must be kept")
+        with self.lock.acquire():
+            snapshots = self.list()
+            deleted = [snapshot["name"] for snapshot in snapshots[:-keep]]
+            for name in deleted:
+                os.remove(self._manifest_path(name))
+            used = {
+                digest
+                for snapshot in snapshots[-keep:]
+                for entry in self.load(snapshot["name"])["files"].values()
+                for digest in entry["blocks"]
+            }
+            blocks = freed = 0
+            for path in _object_files(self.objects_dir):
+                if os.path.basename(path) not in used:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    blocks += 1
+        logger.info(f"Pruned {len(deleted)} snapshots, freeing {freed} bytes")
+        return {"deleted": deleted, "blocks": blocks, "bytes": freed}
+
+
+def _walk(directory: str, exclude: str) -> Iterator[Tuple[str, str]]:
+    """Files to snapshot, as (path relative to directory with '/' separators, absolute path)."""
+    for root, directories, names in os.walk(directory):
+        # The snapshots themselves may live inside the directory
+        directories[:] = sorted(name for name in directories if os.path.join(root, name) != exclude)
+        for name in sorted(names):
+            if _EXCLUDED_FILE.search(name):
+                continue
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, directory).replace(os.sep, "/"), path
+
+
+def _object_files(objects_dir: str) -> Iterator[str]:
+    for root, _, names in os.walk(objects_dir):
+        for name in names:
+            yield os.path.join(root, name)
+
+
+def snapshot_document_store(store, snapshots: SnapshotStore, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Snapshot the persist directory of a document store while it keeps serving.
+
+    The store's write lock is held so no upload, deletion or index
+    maintenance changes the index files meanwhile; searches continue, and
+    conversations keep being written (the databases are backed up online).
+
+    Args:
+        store: The DocumentStore
+        snapshots: Where to store the snapshot
+        name: Snapshot name (defaults to the UTC time)
+
+    Returns:
+        The snapshot summary (see SnapshotStore.create)
+    """
+    if not os.path.exists(os.path.join(store.persist_directory, "chroma.sqlite3")) and store.db is not None:
+        logger.warning("The Chroma collections are on a Chroma server and are not part of the snapshot")
+    with store.write_lock.acquire():
+        return snapshots.create(store.persist_directory, name)
@@ -0,0 +1,317 @@
+"""
+Shared application state module.
+This module stores conversations and document metadata in SQLite (WAL mode) so that
+several server worker processes can read and write the same state safely.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# File name of the state database inside the persist directory
+STATE_DB_NAME = "app_state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunk_fingerprints (
+    fingerprint TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, document_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chunk_fingerprints_document ON chunk_fingerprints (document_id);
+CREATE TABLE IF NOT EXISTS boilerplate_fingerprints (
+    fingerprint TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+# Largest number of SQLite parameters used in one statement
+_SQL_BATCH = 900
+
+
+class StateStore:
+    """SQLite-backed store for conversations and document metadata.
+
+    Each thread gets its own connection. The database runs in WAL mode so
+    readers never block the single writer, and writers from different
+    processes are serialized by SQLite's locking with a busy timeout.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the SQLite database file (created if missing)
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction, taking the write lock up front."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close the current thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # Conversations
+
+    def create_conversation(self, conversation_id: str) -> bool:
+        """Create a conversation; returns False if it already exists."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (conversation_id, now, now)
+            )
+            return cursor.rowcount == 1
+
+    def conversation_exists(self, conversation_id: str) -> bool:
+        """Check whether a conversation exists."""
+        row = self._connect().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_messages(self, conversation_id: str) -> List[Tuple[str, str]]:
+        """Return the (type, content) messages of a conversation in order."""
+        rows = self._connect().execute(
+            "SELECT type, content FROM messages WHERE conversation_id = ? ORDER BY seq",
+            (conversation_id,)
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def append_messages(self, conversation_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Append (type, content) messages to a conversation, creating it if needed."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                (conversation_id, now, now)
+            )
+            next_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, type, content) VALUES (?, ?, ?, ?)",
+                [(conversation_id, next_seq + i, msg_type, content)
+                 for i, (msg_type, content) in enumerate(messages)]
+            )
+
+    def list_conversation_ids(self) -> List[str]:
+        """Return all conversation IDs, oldest first."""
+        rows = self._connect().execute("SELECT id FROM conversations ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def count_conversations(self) -> int:
+        """Return the number of stored conversations."""
+        return self._connect().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    # Documents
+
+    def put_document(self, document_id: str, metadata: dict) -> None:
+        """Insert or replace the metadata of a document."""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO documents (id, metadata, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET metadata = excluded.metadata",
+                (document_id, json.dumps(metadata, ensure_ascii=False), time.time())
+            )
+
+    def get_document(self, document_id: str) -> Optional[dict]:
+        """Return the metadata of a document, or None if it does not exist."""
+        row = self._connect().execute(
+            "SELECT metadata FROM documents WHERE id = ?", (document_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_document(self, document_id: str) -> bool:
+        """Delete the metadata of a document; returns False if it did not exist."""
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            conn.execute("DELETE FROM chunk_fingerprints WHERE document_id = ?", (document_id,))
+            return cursor.rowcount == 1
+
+    def list_documents(self) -> Dict[str, dict]:
+        """Return the metadata of all documents keyed by document ID, oldest first."""
+        rows = self._connect().execute(
+            "SELECT id, metadata FROM documents ORDER BY created_at"
+        ).fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def list_document_field_values(self, field: str) -> List:
+        """Return the distinct values of a metadata field across all documents."""
+        rows = self._connect().execute(
+            "SELECT DISTINCT json_extract(metadata, ?) FROM documents", (f"$.{field}",)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def count_documents(self) -> int:
+        """Return the number of stored documents."""
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # Chunk fingerprints (see app.core.boilerplate)
+
+    def add_chunk_fingerprints(self, document_id: str, fingerprints: Set[str]) -> None:
+        """Record the fingerprints of a document's chunks."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_fingerprints (fingerprint, document_id) VALUES (?, ?)",
+                [(fingerprint, document_id) for fingerprint in fingerprints]
+            )
+
+    def find_boilerplate(self, fingerprints: Set[str], min_documents: int) -> Set[str]:
+        """
+        Return the fingerprints that are boilerplate.
+
+        Args:
+            fingerprints: Fingerprints to look up
+            min_documents: Number of documents a fingerprint must already be
+                recorded for to be boilerplate
+
+        Returns:
+            The fingerprints recorded for at least min_documents documents or
+            registered with add_boilerplate_fingerprints()
+        """
+        conn = self._connect()
+        found: Set[str] = set()
+        fingerprints = list(fingerprints)
+        for start in range(0, len(fingerprints), _SQL_BATCH):
+            batch = fingerprints[start:start + _SQL_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT fingerprint FROM boilerplate_fingerprints WHERE fingerprint IN ({placeholders})", batch
+            ))
+            if min_documents > 0:
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT fingerprint FROM chunk_fingerprints WHERE fingerprint IN ({placeholders}) "
+                    "GROUP BY fingerprint HAVING COUNT(*) >= ?",
+                    batch + [min_documents]
+                ))
+        return found
+
+    def add_boilerplate_fingerprints(self, fingerprints: Set[str]) -> int:
+        """Register fingerprints as boilerplate; returns how many were new."""
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO boilerplate_fingerprints (fingerprint) VALUES (?)",
+                [(fingerprint,) for fingerprint in fingerprints]
+            )
+            return conn.total_changes - before
+
+    # Migration from the JSON files used by earlier versions
+
+    def import_legacy_documents(self, metadata_file: str) -> int:
+        """Import a legacy metadata.json file (renamed to *.migrated afterwards)."""
+        if not os.path.exists(metadata_file) or self.count_documents():
+            return 0
+        try:
+            with open(metadata_file, "r") as f:
+                documents = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading legacy metadata file {metadata_file}: {e}")
+            return 0
+        for document_id, metadata in documents.items():
+            self.put_document(document_id, metadata)
+        _mark_migrated(metadata_file)
+        logger.info(f"Imported metadata for {len(documents)} documents from {metadata_file}")
+        return len(documents)
+
+    def import_legacy_conversations(self, conversation_file: str) -> int:
+        """Import a legacy conversation_store.json file (renamed to *.migrated afterwards)."""
+        if not os.path.exists(conversation_file) or self.count_conversations():
+            return 0
+        try:
+            with open(conversation_file, "r") as f:
+                conversations = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading legacy conversation file {conversation_file}: {e}")
+            return 0
+        for conversation_id, messages in conversations.items():
+            self.create_conversation(conversation_id)
+            if messages:
+                self.append_messages(conversation_id, [
+                    (msg.get("type", "human"), msg.get("content", "")) for msg in messages
+                ])
+        _mark_migrated(conversation_file)
+        logger.info(f"Imported {len(conversations)} conversations from {conversation_file}")
+        return len(conversations)
+
+
+def _mark_migrated(path: str) -> None:
+    """Rename an imported legacy file so it is not imported again."""
+    try:
+        os.replace(path, path + ".migrated")
+    except OSError as e:
+        logger.warning(f"Could not rename imported file {path}: {e}")
+
+
+_stores: Dict[str, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(persist_directory: str) -> StateStore:
+    """
+    Get the shared state store for a persist directory.
+
+    Args:
+        persist_directory: Directory holding the vector store and the state database
+
+    Returns:
+        The StateStore for that directory (one instance per process)
+    """
+    path = os.path.abspath(os.path.join(persist_directory, STATE_DB_NAME))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = StateStore(path)
+            _stores[path] = store
+        return store
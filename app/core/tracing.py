@@ -0,0 +1,56 @@
+"""
+Request tracing module.
+This module collects a per-request timing breakdown of the question answering pipeline.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import time
+
+from app.core.metrics import QA_STAGE_DURATION
+from app.utils.request_context import get_request_id
+
+
+class RequestTrace:
+    """Timing breakdown and token counts for a single request.
+
+    Stage timings are accumulated in seconds; a stage that runs more than
+    once (e.g. several LLM calls) reports the total time spent in it.
+    """
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or get_request_id()
+        self.timings: Dict[str, float] = {}
+        self.prompt_tokens: Optional[int] = None
+        self.generated_tokens: Optional[int] = None
+        self.prompt_prefix_reuse: Optional[float] = None
+        self._start = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage."""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time the block as a stage and record it in the stage latency metric."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(stage, elapsed)
+            QA_STAGE_DURATION.observe(elapsed, stage=stage)
+
+    def elapsed(self) -> float:
+        """Seconds since the trace was started."""
+        return time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the trace as a JSON-serializable dictionary."""
+        return {
+            "request_id": self.request_id,
+            "timings": {stage: round(seconds, 6) for stage, seconds in self.timings.items()},
+            "total": round(self.elapsed(), 6),
+            "prompt_tokens": self.prompt_tokens,
+            "generated_tokens": self.generated_tokens,
+            "prompt_prefix_reuse": self.prompt_prefix_reuse,
+        }
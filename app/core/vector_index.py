@@ -0,0 +1,1044 @@
+"""
+Vector index module.
+This module defines the interface the document store uses to store and search
+chunk vectors, with two implementations:
+
+- ``chroma``: a Chroma collection (embedded on disk or on a Chroma server)
+- ``local``: an in-process engine keeping float32 vectors in a memory-mapped
+  file and chunk texts and metadata in SQLite, searched exactly with NumPy or
+  through an HNSW graph, optionally over int8-quantized vectors
+
+The local engine has no client/server or serialization layer between the
+application and the vectors, so it opens instantly and adds little overhead to
+each query; it only supports a single host (several worker processes on the
+same disk are fine).
+"""
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from contextlib import ExitStack, contextmanager
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.core.hnsw import GraphView, HNSWGraph
+from app.core.index_router import DocumentVectors, exact_search
+from app.core.quantization import (
+    QUANTIZATION_MODES,
+    QuantizedVectors,
+    quantize_int8,
+    quantized_search,
+    rescore,
+    squared_norms,
+)
+from app.utils.config import get_app_config
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("chroma", "local")
+LOCAL_SEARCH_MODES = ("auto", "exact", "hnsw")
+
+# Directory of the local engine's collections inside the persist directory
+LOCAL_INDEX_DIR = "local_index"
+
+# Largest number of SQLite parameters used in one statement
+_SQL_BATCH = 900
+
+# Files of a segment of a local index: name -> (stem, extension)
+_SEGMENT_FILES = {
+    "vectors": ("vectors", "f32"),
+    "codes": ("vectors", "i8"),
+    "scales": ("scales", "f32"),
+    "norms": ("norms", "f32"),
+    "graph": ("hnsw", "npz"),
+}
+_SEGMENT_FILE = re.compile(r"^(vectors|scales|norms|hnsw)(\.[0-9a-f]+)?\.(f32|i8|npz)(\.tmp)?$")
+# Times a read is retried when a rebuild replaces the files it uses
+_READ_ATTEMPTS = 5
+# Attempts, and the pause between them, to find a Chroma collection renamed by a rebuild
+_REOPEN_ATTEMPTS = 5
+_REOPEN_DELAY = 0.05
+# Rows copied at once by a rebuild
+_REBUILD_BLOCK_ROWS = 8192
+
+# Prefixes of the temporary Chroma collections of a rebuild
+REBUILD_COLLECTION_PREFIX = "rebuild-"
+OLD_COLLECTION_PREFIX = "old-"
+
+
+class VectorIndex:
+    """A collection of chunk vectors that can be searched.
+
+    Distances are those of Chroma: smaller is closer, and
+    ``relevance_score_fn()`` turns them into LangChain relevance scores.
+    """
+
+    space = "l2"
+
+    def add_documents(self, documents: List[Document]) -> List[str]:
+        """Embed and store chunks; returns their IDs."""
+        raise NotImplementedError
+
+    def query(self, vectors: List[List[float]], k: int,
+              where: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the k closest chunks for each query vector.
+
+        Args:
+            vectors: Query vectors
+            k: Number of chunks per query
+            where: Chroma "where" filter on chunk metadata
+
+        Returns:
+            For each query, (chunk, distance) pairs, closest first
+
+        Raises:
+            ValueError: If the filter is invalid
+        """
+        raise NotImplementedError
+
+    def add_vectors(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors) -> List[str]:
+        """Store chunks with precomputed vectors (nothing is embedded); returns their IDs."""
+        raise NotImplementedError
+
+    def get_document(self, document_id: str) -> DocumentVectors:
+        """Get the chunks of a document with their vectors."""
+        raise NotImplementedError
+
+    def iter_chunks(self, batch_size: int = 4096) -> Iterator[DocumentVectors]:
+        """
+        Read every chunk with its vector, in batches of up to batch_size chunks.
+
+        Hold DocumentStore.write_lock while iterating, so that no chunks are
+        added, deleted or renumbered meanwhile.
+        """
+        raise NotImplementedError
+
+    def delete_document(self, document_id: str) -> None:
+        """Remove the chunks of a document."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of chunks stored."""
+        raise NotImplementedError
+
+    def document_chunk_counts(self) -> Dict[Optional[str], int]:
+        """Number of chunks stored per document ID (None for chunks without one)."""
+        raise NotImplementedError
+
+    def rebuild(self, quantization: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rewrite the index without the space left by deleted chunks.
+
+        Readers keep searching the current data until the rebuilt index
+        replaces it. Writers must be serialized by the caller
+        (DocumentStore.write_lock).
+
+        Args:
+            quantization: New quantization, for backends that support it
+
+        Returns:
+            Number of chunks in the rebuilt index and backend details
+        """
+        raise NotImplementedError
+
+    def relevance_score_fn(self) -> Callable[[float], float]:
+        """Function turning a distance into a relevance score (higher is closer)."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release files and connections held by the index."""
+
+
+class ChromaIndex(VectorIndex):
+    """Vector index backed by a LangChain Chroma collection.
+
+    A rebuild replaces the collection with a new one of the same name, so
+    every operation reopens the collection by name once if it is gone (in
+    other processes, the old collection disappears at the end of a rebuild).
+    """
+
+    def __init__(self, db: "Chroma"):
+        self.db = db
+        self.name = db._collection.name
+
+    @property
+    def space(self) -> str:
+        """Distance function of the collection (Chroma's default is l2)."""
+        try:
+            return (self.db._collection.configuration.get("hnsw") or {}).get("space") or "l2"
+        except Exception:
+            return "l2"
+
+    def reopen(self) -> None:
+        """
+        Look the collection up again by name.
+
+        While a rebuild swaps the collections no collection has the name:
+        the rebuilt copy, still under its temporary name, is used meanwhile.
+        It is complete by then, and keeps its ID when it is renamed.
+
+        Raises:
+            NotFoundError: If neither collection is found after a few attempts
+        """
+        from chromadb.errors import NotFoundError
+        client = self.db._client
+        names = (self.name, f"{REBUILD_COLLECTION_PREFIX}{self.db._chroma_collection.id}")
+        for attempt in range(_REOPEN_ATTEMPTS):
+            for name in names:
+                try:
+                    self.db._chroma_collection = client.get_collection(name)
+                    return
+                except NotFoundError:
+                    if attempt == _REOPEN_ATTEMPTS - 1 and name == names[-1]:
+                        raise
+            time.sleep(_REOPEN_DELAY * (attempt + 1))
+
+    def _call(self, operation: Callable[[Any], Any]) -> Any:
+        """Run operation(collection), reopening the collection once if it was replaced."""
+        from chromadb.errors import NotFoundError
+        try:
+            return operation(self.db._collection)
+        except NotFoundError:
+            logger.info(f"Collection {self.name} was replaced; reopening it")
+            self.reopen()
+            return operation(self.db._collection)
+
+    def add_documents(self, documents: List[Document]) -> List[str]:
+        return self._call(lambda _: self.db.add_documents(documents))
+
+    def query(self, vectors: List[List[float]], k: int,
+              where: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        from chromadb.errors import InvalidArgumentError
+        try:
+            result = self._call(lambda collection: collection.query(
+                query_embeddings=vectors,
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas", "distances"],
+            ))
+        except InvalidArgumentError as e:
+            # Malformed filters; raised as ValueError like Chroma's other validation errors
+            raise ValueError(str(e)) from e
+        return [
+            [
+                (Document(id=chunk_id, page_content=text, metadata=metadata or {}), distance)
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+
+    def add_vectors(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors) -> List[str]:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one vector per chunk")
+
+        def add(collection) -> None:
+            batch = self.db._client.get_max_batch_size()
+            for start in range(0, len(ids), batch):
+                collection.add(
+                    ids=list(ids[start:start + batch]),
+                    embeddings=vectors[start:start + batch],
+                    documents=list(texts[start:start + batch]),
+                    metadatas=[metadata or None for metadata in metadatas[start:start + batch]],
+                )
+        self._call(add)
+        return list(ids)
+
+    def get_document(self, document_id: str) -> DocumentVectors:
+        result = self._call(lambda collection: collection.get(
+            where={"document_id": document_id},
+            include=["embeddings", "documents", "metadatas"],
+        ))
+        return DocumentVectors(
+            result["ids"],
+            result["documents"],
+            [metadata or {} for metadata in result["metadatas"]],
+            np.asarray(result["embeddings"], dtype=np.float32),
+        )
+
+    def delete_document(self, document_id: str) -> None:
+        self._call(lambda _: self.db.delete(where={"document_id": document_id}))
+
+    def count(self) -> int:
+        return self._call(lambda collection: collection.count())
+
+    def _pages(self, collection, include: List[str], batch_size: Optional[int] = None) -> Iterator[dict]:
+        """Read all records of a collection, one batch at a time."""
+        batch = min(batch_size or self.db._client.get_max_batch_size(), self.db._client.get_max_batch_size())
+        offset = 0
+        while True:
+            page = collection.get(include=include, limit=batch, offset=offset)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
+
+    def iter_chunks(self, batch_size: int = 4096) -> Iterator[DocumentVectors]:
+        collection = self._call(lambda current: current)
+        for page in self._pages(collection, ["embeddings", "documents", "metadatas"], batch_size):
+            yield DocumentVectors(
+                page["ids"],
+                page["documents"],
+                [metadata or {} for metadata in page["metadatas"]],
+                np.asarray(page["embeddings"], dtype=np.float32),
+            )
+
+    def document_chunk_counts(self) -> Dict[Optional[str], int]:
+        def count(collection) -> Dict[Optional[str], int]:
+            counts: Dict[Optional[str], int] = {}
+            for page in self._pages(collection, ["metadatas"]):
+                for metadata in page["metadatas"]:
+                    document_id = (metadata or {}).get("document_id")
+                    counts[document_id] = counts.get(document_id, 0) + 1
+            return counts
+        return self._call(count)
+
+    def rebuild(self, quantization: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Copy the live chunks into a new collection and swap it in under the same name.
+
+        Chroma keeps the HNSW entries of deleted chunks; the copy builds a
+        graph of the live chunks only. The old collection answers queries
+        until the swap and is deleted afterwards.
+
+        Raises:
+            ValueError: If a quantization is requested (Chroma does not support it)
+            RuntimeError: If the copy does not hold every chunk
+        """
+        if quantization:
+            raise ValueError("The Chroma backend does not support quantization")
+        client = self.db._client
+        collection = self._call(lambda current: current)
+        # Temporary names derive from the collection ID: they stay short and cannot clash with groups
+        temp_name = f"{REBUILD_COLLECTION_PREFIX}{collection.id}"
+        old_name = f"{OLD_COLLECTION_PREFIX}{collection.id}"
+        if temp_name in {existing.name for existing in client.list_collections()}:
+            # Left behind by an interrupted rebuild
+            client.delete_collection(temp_name)
+        hnsw = dict(collection.configuration.get("hnsw") or {})
+        rebuilt = client.create_collection(temp_name, configuration={"hnsw": hnsw}, metadata=collection.metadata)
+        for page in self._pages(collection, ["embeddings", "documents", "metadatas"]):
+            rebuilt.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+            )
+        chunks = rebuilt.count()
+        if chunks != collection.count():
+            client.delete_collection(temp_name)
+            raise RuntimeError(f"Rebuilt collection {self.name} holds {chunks} of {collection.count()} chunks")
+
+        collection.modify(name=old_name)
+        rebuilt.modify(name=self.name)
+        self.db._chroma_collection = rebuilt
+        client.delete_collection(old_name)
+        logger.info(f"Rebuilt collection {self.name} with {chunks} chunks")
+        return {"chunks": chunks}
+
+    def relevance_score_fn(self) -> Callable[[float], float]:
+        return self.db._select_relevance_score_fn()
+
+
+LOCAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    document_id TEXT,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COMPARISONS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def where_to_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Translate a Chroma "where" filter into an SQL condition on the chunks table.
+
+    Supports $and, $or, $eq, $ne, $gt, $gte, $lt, $lte, $in and $nin.
+
+    Args:
+        where: The filter, e.g. {"$and": [{"page": {"$gte": 2}}, {"file_name": "a.pdf"}]}
+
+    Returns:
+        Tuple of (SQL condition, parameters)
+
+    Raises:
+        ValueError: If the filter is malformed or uses an unsupported operator
+    """
+    if not isinstance(where, dict) or not where:
+        raise ValueError(f"Expected a non-empty filter dictionary, got {where!r}")
+    conditions, params = [], []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"{key} expects a non-empty list of filters")
+            parts = [where_to_sql(clause) for clause in value]
+            joiner = " AND " if key == "$and" else " OR "
+            conditions.append("(" + joiner.join(f"({sql})" for sql, _ in parts) + ")")
+            params.extend(param for _, part_params in parts for param in part_params)
+            continue
+        if key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator: {key}")
+        if '"' in key:
+            raise ValueError(f"Unsupported metadata key: {key}")
+        if key == "document_id":
+            field, field_params = "document_id", []
+        else:
+            field, field_params = "json_extract(metadata, ?)", [f'$."{key}"']
+        operators = value if isinstance(value, dict) else {"$eq": value}
+        if not operators:
+            raise ValueError(f"Empty condition for {key}")
+        for operator, operand in operators.items():
+            params.extend(field_params)
+            if operator in _COMPARISONS:
+                if isinstance(operand, (list, dict)) or operand is None:
+                    raise ValueError(f"{operator} expects a string, number or boolean for {key}")
+                conditions.append(f"{field} {_COMPARISONS[operator]} ?")
+                params.append(operand)
+            elif operator in ("$in", "$nin"):
+                if not isinstance(operand, list):
+                    raise ValueError(f"{operator} expects a list for {key}")
+                placeholders = ", ".join("?" * len(operand))
+                conditions.append(f"{field} {'IN' if operator == '$in' else 'NOT IN'} ({placeholders})")
+                params.extend(operand)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+    return " AND ".join(conditions), params
+
+
+class _Snapshot(NamedTuple):
+    """The vectors of a local index as of one generation."""
+    segment: str
+    vectors: np.ndarray
+    # What exact and HNSW search walk: the float32 vectors, or the int8 codes
+    searched: Any
+    valid: np.ndarray
+
+
+class LocalIndex(VectorIndex):
+    """In-process vector index on memory-mapped float32 vectors.
+
+    Layout of the index directory:
+
+    - ``vectors.f32``: row-major float32 vectors, appended as chunks are added
+    - ``chunks.db``: SQLite table mapping each row to its chunk ID, document,
+      text and metadata (deleted chunks lose their row; their vectors stay
+      until the index is rebuilt)
+    - ``vectors.i8``, ``scales.f32`` and ``norms.f32``: int8 codes, per-row
+      scales and squared norms, when
+      the index is quantized; searches then run over the codes and only read
+      the float32 vectors of the best candidates to re-score them
+    - ``hnsw.npz``: the HNSW graph over the rows, once searches can use it
+      (search ``hnsw``, or ``auto`` with more than exact_max_chunks rows)
+
+    Every write bumps a generation number in SQLite; readers (in any process)
+    remap the vectors when it changes. A rebuild writes a new set of files
+    named after a new segment (``vectors.<segment>.f32`` and so on), then
+    renumbers the rows and switches to the segment in one transaction; reads
+    that overlap the switch are retried.
+    """
+
+    def __init__(self, directory: str, embeddings, space: str = "l2", search: str = "auto",
+                 exact_max_chunks: int = 20000, ef_search: int = 64, quantization: str = "none",
+                 rescore_factor: int = 4):
+        """
+        Args:
+            directory: Directory of the index (created if missing)
+            embeddings: Embedding model used for added chunks
+            space: Distance function for a new index (l2, cosine or ip)
+            search: ``exact``, ``hnsw``, or ``auto`` (exact when a search covers at
+                most exact_max_chunks chunks, HNSW otherwise); filtered searches
+                with at most exact_max_chunks candidates are always exact
+            exact_max_chunks: Largest number of candidate chunks searched exactly
+            ef_search: HNSW candidate list size
+            quantization: ``none`` or ``int8`` for a new index
+            rescore_factor: With int8 quantization, k * rescore_factor candidates
+                are re-scored with the float32 vectors
+        """
+        if search not in LOCAL_SEARCH_MODES:
+            raise ValueError(f"Unknown local index search mode: {search}")
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.directory = directory
+        self.embeddings = embeddings
+        self.search = search
+        self.exact_max_chunks = exact_max_chunks
+        self.ef_search = ef_search
+        self.rescore_factor = max(rescore_factor, 1)
+        os.makedirs(directory, exist_ok=True)
+        self._db_path = os.path.join(directory, "chunks.db")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._snapshot = self._empty_snapshot()
+        self._graph: Optional[HNSWGraph] = None
+        self._graph_mtime: Optional[float] = None
+        self._graph_segment: Optional[str] = None
+
+        conn = self._connect()
+        conn.executescript(LOCAL_SCHEMA)
+        conn.executemany(
+            "INSERT OR IGNORE INTO info (key, value) VALUES (?, ?)",
+            [("space", space), ("quantization", quantization)]
+        )
+        info = self._info()
+        # An existing index keeps the layout it was created with (rebuild it to change)
+        self.space = info["space"]
+        self.quantization = info["quantization"]
+        if self.quantization != quantization:
+            logger.warning(
+                f"Index {directory} uses quantization '{self.quantization}', not '{quantization}'; rebuild it to change"
+            )
+
+    @staticmethod
+    def _empty_snapshot() -> _Snapshot:
+        vectors = np.empty((0, 0), dtype=np.float32)
+        return _Snapshot("", vectors, vectors, np.zeros(0, dtype=bool))
+
+    def _paths(self, segment: str) -> Dict[str, str]:
+        """Paths of the files of a segment (the first segment has no suffix)."""
+        suffix = f".{segment}" if segment else ""
+        return {
+            name: os.path.join(self.directory, f"{stem}{suffix}.{extension}")
+            for name, (stem, extension) in _SEGMENT_FILES.items()
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction, taking the write lock up front."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def _info(self, conn: Optional[sqlite3.Connection] = None) -> Dict[str, str]:
+        return dict((conn or self._connect()).execute("SELECT key, value FROM info").fetchall())
+
+    def _segment(self) -> str:
+        row = self._connect().execute("SELECT value FROM info WHERE key = 'segment'").fetchone()
+        return row[0] if row else ""
+
+    def _refresh(self) -> _Snapshot:
+        """Return the current snapshot of the vectors, remapping them after writes."""
+        conn = self._connect()
+        for attempt in range(_READ_ATTEMPTS):
+            conn.execute("BEGIN")
+            try:
+                info = self._info(conn)
+                if info.get("generation") == self._generation:
+                    break
+                valid = np.zeros(int(info.get("rows", 0)), dtype=bool)
+                valid[[row for (row,) in conn.execute("SELECT row FROM chunks")]] = True
+                vectors, searched = self._map_segment(
+                    info.get("segment", ""), len(valid), int(info.get("dimensions", 0)), info["quantization"]
+                )
+            except FileNotFoundError:
+                # A rebuild removed the files of the segment this transaction still sees
+                if attempt == _READ_ATTEMPTS - 1:
+                    raise
+                continue
+            finally:
+                conn.execute("COMMIT")
+            with self._lock:
+                self._snapshot = _Snapshot(info.get("segment", ""), vectors, searched, valid)
+                self._generation = info.get("generation")
+                self.quantization = info["quantization"]
+            break
+        with self._lock:
+            return self._snapshot
+
+    def _map_segment(self, segment: str, rows: int, dimensions: int, quantization: str) -> Tuple[np.ndarray, Any]:
+        """Map the float32 vectors of a segment, and the vectors searched (the int8 codes when quantized)."""
+        paths = self._paths(segment)
+        vectors = self._map(paths["vectors"], np.float32, (rows, dimensions))
+        if quantization != "int8":
+            return vectors, vectors
+        return vectors, QuantizedVectors(
+            self._map(paths["codes"], np.int8, (rows, dimensions)),
+            self._map(paths["scales"], np.float32, (rows,)),
+            self._map(paths["norms"], np.float32, (rows,)),
+        )
+
+    @staticmethod
+    def _map(path: str, dtype, shape: Tuple[int, ...]) -> np.ndarray:
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def _read(self, read: Callable[[_Snapshot], Any]) -> Any:
+        """
+        Run read(snapshot), again if a rebuild renumbered the rows meanwhile.
+
+        read() returns None to be retried with a newer snapshot.
+        """
+        for _ in range(_READ_ATTEMPTS):
+            snapshot = self._refresh()
+            result = read(snapshot)
+            if result is not None and self._segment() == snapshot.segment:
+                return result
+        raise RuntimeError(f"Index {self.directory} kept changing during a read; try again")
+
+    def add_documents(self, documents: List[Document]) -> List[str]:
+        if not documents:
+            return []
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        return self.add_vectors(
+            [doc.id or str(uuid.uuid4()) for doc in documents],
+            [doc.page_content for doc in documents],
+            [doc.metadata or {} for doc in documents],
+            vectors,
+        )
+
+    def add_vectors(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors) -> List[str]:
+        """
+        Store chunks with precomputed vectors.
+
+        Args:
+            ids: Chunk IDs
+            texts: Chunk texts
+            metadatas: Chunk metadata
+            vectors: Chunk vectors, one row per chunk
+
+        Returns:
+            The chunk IDs
+
+        Raises:
+            ValueError: If the vectors do not match the index or an ID already exists
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one vector per chunk")
+        with self._transaction() as conn:
+            info = self._info(conn)
+            dimensions = int(info.get("dimensions", vectors.shape[1]))
+            if vectors.shape[1] != dimensions:
+                raise ValueError(f"Expected {dimensions}-dimensional vectors, got {vectors.shape[1]}")
+            start = int(info.get("rows", 0))
+            paths = self._paths(info.get("segment", ""))
+            files = [(paths["vectors"], vectors, dimensions * 4)]
+            if info["quantization"] == "int8":
+                codes, scales = quantize_int8(vectors)
+                files += [
+                    (paths["codes"], codes, dimensions),
+                    (paths["scales"], scales, 4),
+                    (paths["norms"], squared_norms(codes, scales), 4),
+                ]
+            for path, data, row_bytes in files:
+                with open(path, "ab") as f:
+                    # Drop rows left behind by an interrupted write
+                    f.truncate(start * row_bytes)
+                    f.write(data.tobytes())
+            try:
+                conn.executemany(
+                    "INSERT INTO chunks (row, id, document_id, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (start + i, chunk_id, metadata.get("document_id"), text, json.dumps(metadata, ensure_ascii=False))
+                        for i, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))
+                    ]
+                )
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"Duplicate chunk ID: {str(e)}") from e
+            self._set_info(conn, dimensions=dimensions, rows=start + len(ids))
+        if self._uses_graph(start + len(ids)):
+            self._read(lambda snapshot: self._update_graph(snapshot, save=True))
+        return list(ids)
+
+    def _set_info(self, conn: sqlite3.Connection, **values) -> None:
+        values["generation"] = uuid.uuid4().hex
+        conn.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    def _update_graph(self, snapshot: _Snapshot, save: bool = False) -> Optional[Tuple[HNSWGraph, GraphView]]:
+        """
+        Bring the HNSW graph of a snapshot's segment up to date with its rows.
+
+        Returns the graph with a view of the snapshot's rows, which searches
+        must go through: other threads may insert rows while they run. Returns
+        None when the graph already holds rows added after the snapshot was
+        taken (or belongs to a segment replaced since).
+        """
+        path = self._paths(snapshot.segment)["graph"]
+        vectors = snapshot.searched
+        with self._lock:
+            if self._graph_segment != snapshot.segment:
+                self._graph, self._graph_mtime, self._graph_segment = None, None, snapshot.segment
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime is not None and mtime != self._graph_mtime:
+                # Written by another process (or not loaded yet)
+                try:
+                    self._graph, self._graph_mtime = HNSWGraph.load(path), mtime
+                except FileNotFoundError:
+                    return None
+            if self._graph is None:
+                self._graph = HNSWGraph(self.space)
+            graph = self._graph
+            if graph.size > len(vectors):
+                return None
+            added = len(vectors) - graph.size
+            for row in range(graph.size, len(vectors)):
+                graph.insert(vectors, row)
+            if save and added:
+                graph.save(path)
+                self._graph_mtime = os.path.getmtime(path)
+            view = graph.view()
+        if added > 1000:
+            logger.info(f"Added {added} vectors to the HNSW graph of {self.directory}")
+        return graph, view
+
+    def _uses_graph(self, rows: int) -> bool:
+        """Whether searches over an index of this many rows can go through the HNSW graph."""
+        # In auto mode the graph is left unbuilt until the index outgrows exact search
+        return self.search == "hnsw" or (self.search == "auto" and rows > self.exact_max_chunks)
+
+    def _uses_exact(self, candidates: int, filtered: bool) -> bool:
+        if self.search == "exact":
+            return True
+        # HNSW walks most of the graph when a filter leaves few candidates
+        return candidates <= self.exact_max_chunks and (filtered or self.search == "auto")
+
+    def query(self, vectors: List[List[float]], k: int,
+              where: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        condition = where_to_sql(where) if where else None
+        return self._read(lambda snapshot: self._search(snapshot, queries, k, condition))
+
+    def _search(self, snapshot: _Snapshot, queries: np.ndarray, k: int,
+                condition: Optional[Tuple[str, List[Any]]]) -> Optional[List[List[Tuple[Document, float]]]]:
+        """Search one snapshot; returns None if its HNSW graph has moved past it."""
+        matrix, searched, valid = snapshot.vectors, snapshot.searched, snapshot.valid
+        rows = None
+        if condition:
+            sql, params = condition
+            rows = np.array([
+                row for (row,) in self._connect().execute(f"SELECT row FROM chunks WHERE {sql}", params)
+                if row < len(valid)
+            ], dtype=np.int64)
+        elif not valid.all():
+            rows = np.flatnonzero(valid)
+        candidates = len(valid) if rows is None else len(rows)
+        if not candidates:
+            return [[] for _ in queries]
+
+        quantized = isinstance(searched, QuantizedVectors)
+        exact = self._uses_exact(candidates, bool(condition))
+        if exact and quantized:
+            codes, scales, norms = searched.codes, searched.scales, searched.norms
+            if rows is not None:
+                codes, scales, norms = codes[rows], scales[rows], norms[rows]
+            indices, _ = quantized_search(queries, codes, scales, norms, k * self.rescore_factor, self.space)
+            if rows is not None:
+                indices = rows[indices]
+            indices, distances = rescore(queries, indices, matrix, k, self.space)
+        elif exact:
+            indices, distances = exact_search(queries, matrix if rows is None else matrix[rows], k, self.space)
+            if rows is not None:
+                indices = rows[indices]
+        else:
+            updated = self._update_graph(snapshot)
+            if updated is None:
+                return None
+            graph, view = updated
+            allowed = None
+            if rows is not None:
+                allowed = np.zeros(len(valid), dtype=bool)
+                allowed[rows] = True
+            candidates_per_query = k * self.rescore_factor if quantized else k
+            found = [
+                graph.search(searched, query, candidates_per_query, self.ef_search, allowed, view) for query in queries
+            ]
+            indices = [row_indices for row_indices, _ in found]
+            distances = [row_distances for _, row_distances in found]
+            if quantized:
+                indices, distances = rescore(queries, indices, matrix, k, self.space)
+        return self._documents(indices, distances)
+
+    def _documents(self, indices, distances) -> List[List[Tuple[Document, float]]]:
+        """Load the chunks at the given rows."""
+        wanted = sorted({int(row) for row_indices in indices for row in row_indices})
+        chunks = {}
+        conn = self._connect()
+        for start in range(0, len(wanted), _SQL_BATCH):
+            batch = wanted[start:start + _SQL_BATCH]
+            for row, chunk_id, text, metadata in conn.execute(
+                f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({', '.join('?' * len(batch))})", batch
+            ):
+                chunks[row] = Document(id=chunk_id, page_content=text, metadata=json.loads(metadata))
+        # Chunks deleted since the vectors were mapped are left out
+        return [
+            [
+                (chunks[int(row)], float(distance))
+                for row, distance in zip(row_indices, row_distances) if int(row) in chunks
+            ]
+            for row_indices, row_distances in zip(indices, distances)
+        ]
+
+    def get_document(self, document_id: str) -> DocumentVectors:
+        def read(snapshot: _Snapshot) -> DocumentVectors:
+            matrix = snapshot.vectors
+            rows = [
+                row for row in self._connect().execute(
+                    "SELECT row, id, text, metadata FROM chunks WHERE document_id = ? ORDER BY row", (document_id,)
+                ) if row[0] < len(matrix)
+            ]
+            return DocumentVectors(
+                [chunk_id for _, chunk_id, _, _ in rows],
+                [text for _, _, text, _ in rows],
+                [json.loads(metadata) for _, _, _, metadata in rows],
+                np.array(matrix[[row for row, _, _, _ in rows]], dtype=np.float32).reshape(len(rows), matrix.shape[1]),
+            )
+        return self._read(read)
+
+    def iter_chunks(self, batch_size: int = 4096) -> Iterator[DocumentVectors]:
+        last_row = -1
+        while True:
+            def read(snapshot: _Snapshot) -> Tuple[int, DocumentVectors]:
+                rows = self._connect().execute(
+                    "SELECT row, id, text, metadata FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, batch_size)
+                ).fetchall()
+                matrix = snapshot.vectors
+                present = [row for row in rows if row[0] < len(matrix)]
+                return (rows[-1][0] if rows else last_row), DocumentVectors(
+                    [chunk_id for _, chunk_id, _, _ in present],
+                    [text for _, _, text, _ in present],
+                    [json.loads(metadata) for _, _, _, metadata in present],
+                    np.array(matrix[[row for row, _, _, _ in present]], dtype=np.float32).reshape(len(present), matrix.shape[1]),
+                )
+            next_row, batch = self._read(read)
+            if next_row == last_row:
+                return
+            last_row = next_row
+            if len(batch):
+                yield batch
+
+    def delete_document(self, document_id: str) -> None:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            if cursor.rowcount:
+                self._set_info(conn)
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def document_chunk_counts(self) -> Dict[Optional[str], int]:
+        return dict(self._connect().execute("SELECT document_id, COUNT(*) FROM chunks GROUP BY document_id"))
+
+    def rebuild(self, quantization: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rewrite the vectors without the rows of deleted chunks and rebuild the HNSW graph.
+
+        The files of the new segment are written while readers keep using
+        the current ones; the switch is one transaction, after which the old
+        files are removed.
+
+        Args:
+            quantization: ``none`` or ``int8`` to change the quantization
+                (defaults to the current one)
+
+        Returns:
+            Rows stored before the rebuild, chunks after it and the quantization
+
+        Raises:
+            ValueError: If the quantization is unknown
+            RuntimeError: If chunks were added or deleted during the rebuild
+        """
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            info = self._info(conn)
+            live = np.array([row for (row,) in conn.execute("SELECT row FROM chunks ORDER BY row")], dtype=np.int64)
+        finally:
+            conn.execute("COMMIT")
+        quantization = quantization or info["quantization"]
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        rows, dimensions = int(info.get("rows", 0)), int(info.get("dimensions", 0))
+        vectors, _ = self._map_segment(info.get("segment", ""), rows, dimensions, "none")
+        segment = uuid.uuid4().hex[:12]
+        paths = self._paths(segment)
+        graph = None
+        try:
+            self._write_segment(paths, vectors, live, quantization)
+            if self._uses_graph(len(live)):
+                _, searched = self._map_segment(segment, len(live), dimensions, quantization)
+                graph = HNSWGraph(self.space)
+                for row in range(len(live)):
+                    graph.insert(searched, row)
+                graph.save(paths["graph"])
+            with self._transaction() as conn:
+                if self._info(conn).get("generation") != info.get("generation"):
+                    raise RuntimeError(f"Index {self.directory} changed during the rebuild; try again")
+                # Shift the rows out of the way, then number them from 0 in their current order
+                conn.execute("UPDATE chunks SET row = -1 - row")
+                conn.executemany(
+                    "UPDATE chunks SET row = ? WHERE row = ?",
+                    [(new_row, -1 - old_row) for new_row, old_row in enumerate(live.tolist())]
+                )
+                self._set_info(conn, segment=segment, rows=len(live), quantization=quantization)
+        except BaseException:
+            self._remove_segment_files(keep=info.get("segment", ""))
+            raise
+        del vectors
+        # Drop this process's maps of the old files before removing them
+        self._refresh()
+        if graph is not None:
+            with self._lock:
+                self._graph, self._graph_segment = graph, segment
+                self._graph_mtime = os.path.getmtime(paths["graph"])
+        self._remove_segment_files(keep=segment)
+        logger.info(f"Rebuilt {self.directory}: {len(live)} chunks, {rows - len(live)} deleted rows dropped")
+        return {"rows_before": rows, "chunks": len(live), "quantization": quantization}
+
+    @staticmethod
+    def _write_segment(paths: Dict[str, str], vectors: np.ndarray, live: np.ndarray, quantization: str) -> None:
+        """Write the given rows of vectors to the files of a new segment."""
+        with ExitStack() as stack:
+            names = ["vectors", "codes", "scales", "norms"] if quantization == "int8" else ["vectors"]
+            files = {name: stack.enter_context(open(paths[name], "wb")) for name in names}
+            for start in range(0, len(live), _REBUILD_BLOCK_ROWS):
+                block = np.ascontiguousarray(vectors[live[start:start + _REBUILD_BLOCK_ROWS]], dtype=np.float32)
+                files["vectors"].write(block.tobytes())
+                if quantization == "int8":
+                    codes, scales = quantize_int8(block)
+                    files["codes"].write(codes.tobytes())
+                    files["scales"].write(scales.tobytes())
+                    files["norms"].write(squared_norms(codes, scales).tobytes())
+
+    def _remove_segment_files(self, keep: str) -> None:
+        """Remove the vector and graph files of every segment but one (best effort)."""
+        kept = {os.path.basename(path) for path in self._paths(keep).values()}
+        for name in os.listdir(self.directory):
+            if _SEGMENT_FILE.match(name) and name not in kept:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    # Windows keeps files open while another process maps them
+                    logger.warning(f"Could not remove {name} from {self.directory}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Describe the size of the index.
+
+        Returns:
+            Rows stored (including deleted chunks), live chunks, dimensions,
+            quantization, bytes of the vectors searched in memory
+            (``search_bytes``), bytes of the float32 vectors and bytes on disk
+        """
+        snapshot = self._refresh()
+        rows, dimensions = snapshot.vectors.shape
+        vector_bytes = rows * dimensions * 4
+        return {
+            "rows": rows,
+            "chunks": int(snapshot.valid.sum()),
+            "dimensions": dimensions,
+            "quantization": self.quantization,
+            # int8 codes plus a float32 scale and squared norm per row
+            "search_bytes": rows * (dimensions + 8) if self.quantization == "int8" else vector_bytes,
+            "vector_bytes": vector_bytes,
+            "disk_bytes": sum(
+                os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory)
+            ),
+        }
+
+    def relevance_score_fn(self) -> Callable[[float], float]:
+        # Same functions LangChain's Chroma store picks for each distance
+        from langchain_core.vectorstores import VectorStore
+        return {
+            "l2": VectorStore._euclidean_relevance_score_fn,
+            "cosine": VectorStore._cosine_relevance_score_fn,
+            "ip": VectorStore._max_inner_product_relevance_score_fn,
+        }[self.space]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._lock:
+            self._snapshot = self._empty_snapshot()
+            self._generation = None
+
+
+def open_vector_index(persist_directory: str, collection_name: str, embeddings,
+                      config: Optional[dict] = None) -> VectorIndex:
+    """
+    Open a collection with the configured vector backend.
+
+    Args:
+        persist_directory: Directory holding the application's vector data
+        collection_name: Name of the collection
+        embeddings: Embedding model of the collection
+        config: Application configuration (defaults to get_app_config())
+
+    Returns:
+        The vector index
+
+    Raises:
+        ValueError: If vector_backend, local_index_search or local_index_quantization
+            is not a known value
+    """
+    config = config or get_app_config()
+    backend = config.get("vector_backend", "chroma")
+    if backend == "local":
+        return LocalIndex(
+            os.path.join(persist_directory, LOCAL_INDEX_DIR, collection_name),
+            embeddings,
+            search=config.get("local_index_search", "auto"),
+            exact_max_chunks=config.get("exact_search_max_chunks", 20000),
+            ef_search=config.get("local_index_ef_search", 64),
+            quantization=config.get("local_index_quantization", "none"),
+            rescore_factor=config.get("local_index_rescore_factor", 4),
+        )
+    if backend != "chroma":
+        raise ValueError(f"Unknown vector_backend '{backend}', expected one of {VECTOR_BACKENDS}")
+
+    from langchain_chroma import Chroma
+
+    host = config.get("chroma_server_host")
+    if host:
+        import chromadb
+        logger.info(f"Connecting to Chroma server at {host}:{config['chroma_server_port']}")
+        client = chromadb.HttpClient(host=host, port=config["chroma_server_port"])
+        return ChromaIndex(Chroma(client=client, collection_name=collection_name, embedding_function=embeddings))
+    return ChromaIndex(Chroma(
+        persist_directory=persist_directory,
+        collection_name=collection_name,
+        embedding_function=embeddings
+    ))
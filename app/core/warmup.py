@@ -0,0 +1,155 @@
+"""
+Startup warm-up module.
+This module loads the heavy components (embedding model, vector store, LangChain
+modules) after the server has started, and tracks whether the app is ready.
+
+The server accepts connections as soon as the app is imported; liveness is
+reported immediately, readiness once the warm-up steps have finished.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.metrics import WARMUP_DURATION
+from app.utils.config import get_app_config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ("background", "blocking", "lazy")
+
+
+class WarmupStep:
+    """A named, blocking warm-up function and its outcome."""
+
+    def __init__(self, name: str, func: Callable[[], Any], required: bool = True):
+        """
+        Args:
+            name: Step name shown in the readiness report
+            func: Blocking function doing the work (run in the thread pool)
+            required: Whether the app is only ready once this step succeeded
+        """
+        self.name = name
+        self.func = func
+        self.required = required
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "seconds": self.seconds,
+            "error": self.error,
+        }
+
+
+# Registry of warm-up steps, run in registration order
+WARMUP_STEPS: List[WarmupStep] = []
+
+
+def warmup_step(name: str, required: bool = True):
+    """Register a blocking function as a warm-up step."""
+    def decorator(func: Callable[[], Any]):
+        WARMUP_STEPS.append(WarmupStep(name, func, required))
+        return func
+    return decorator
+
+
+@warmup_step("document_store")
+def _warm_document_store() -> None:
+    """Load the embedding model and open the vector store."""
+    from app.core.document_store import get_document_store
+    store = get_document_store()
+    # The first embedding call initializes the model weights
+    store.embeddings.embed_query("warm up")
+
+
+@warmup_step("conversation_store")
+def _warm_conversation_store() -> None:
+    """Open the state database (and import legacy conversations)."""
+    from app.core.memory_store import get_conversation_store
+    get_conversation_store()
+
+
+@warmup_step("qa_chain")
+def _warm_qa_chain() -> None:
+    """Import the LangChain chain, memory and LLM modules used by /api/ask."""
+    import langchain.chains  # noqa: F401
+    import langchain.memory  # noqa: F401
+    import app.core.llm  # noqa: F401
+
+
+@warmup_step("ollama_model", required=False)
+def _warm_ollama_model() -> None:
+    """Load the configured model in Ollama so the first question does not wait for it."""
+    if not get_app_config()["ollama_prewarm"]:
+        return
+    from app.core.keep_alive import prewarm_model
+    if not any(prewarm_model().values()):
+        raise RuntimeError("The model could not be loaded on any Ollama server")
+
+
+_state = {"started": False}
+
+
+async def run_warmup() -> bool:
+    """
+    Run all warm-up steps once, in the thread pool.
+
+    A failed step is logged and recorded; the remaining steps still run.
+
+    Returns:
+        True if every required step succeeded
+    """
+    _state["started"] = True
+    start = time.perf_counter()
+    for step in WARMUP_STEPS:
+        if step.status == "ready":
+            continue
+        step.status = "running"
+        step.error = None
+        step_start = time.perf_counter()
+        try:
+            await run_in_threadpool(step.func)
+            step.status = "ready"
+        except Exception as e:
+            step.status = "failed"
+            step.error = str(e)
+            logger.error(f"Warm-up step {step.name} failed: {str(e)}")
+        step.seconds = time.perf_counter() - step_start
+        WARMUP_DURATION.set(step.seconds, step=step.name)
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+    return is_ready()
+
+
+def get_warmup_mode() -> str:
+    """Return the configured warm-up mode (background, blocking or lazy)."""
+    mode = get_app_config().get("warmup_mode", "background")
+    if mode not in WARMUP_MODES:
+        logger.warning(f"Unknown warmup_mode '{mode}', using 'background'")
+        mode = "background"
+    return mode
+
+
+def is_ready() -> bool:
+    """
+    Whether the app can serve requests without cold-start delays.
+
+    In lazy mode components load on first use, so the app is always ready.
+    """
+    if get_warmup_mode() == "lazy" and not _state["started"]:
+        return True
+    return all(step.status == "ready" for step in WARMUP_STEPS if step.required)
+
+
+def readiness_report() -> Dict[str, Any]:
+    """Describe the warm-up state of every step."""
+    return {
+        "ready": is_ready(),
+        "mode": get_warmup_mode(),
+        "steps": {step.name: step.to_dict() for step in WARMUP_STEPS},
+    }
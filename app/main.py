@@ -1,15 +1,20 @@
 """
 Main module for the Document QA Agent application.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
+import asyncio
 import logging
 import os
 
-from app.api import document_routes, qa_routes, config_routes
+from app.api import document_routes, qa_routes, config_routes, search_routes, admin_routes
+from app.core.keep_alive import keep_warm_loop
+from app.core.metrics import render_metrics, CONTENT_TYPE_LATEST
+from app.core.warmup import get_warmup_mode, run_warmup
 from app.utils.config import setup_logging, get_app_config
 from app.utils.middleware import LoggingMiddleware, LanguageMiddleware
 
@@ -21,11 +26,36 @@ logger = logging.getLogger(__name__)
 # Load application configuration
 app_config = get_app_config()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up heavy components according to the configured warmup_mode.
+
+    In background mode (the default) the server accepts connections at once
+    and reports readiness on /api/health/ready when warm-up has finished;
+    blocking mode finishes warm-up before serving; lazy mode skips it.
+    When ollama_keep_warm_interval is set, the Ollama model is also pinged
+    periodically so it stays loaded.
+    """
+    mode = get_warmup_mode()
+    tasks = []
+    if mode == "blocking":
+        await run_warmup()
+    elif mode == "background":
+        tasks.append(asyncio.create_task(run_warmup()))
+    interval = get_app_config()["ollama_keep_warm_interval"]
+    if interval > 0:
+        tasks.append(asyncio.create_task(keep_warm_loop(interval)))
+    yield
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Document QA Agent",
     description="An agent that can answer questions based on uploaded documents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow cross-origin requests (for web UI)
@@ -54,6 +84,8 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 app.include_router(document_routes.router, prefix="/api")
 app.include_router(qa_routes.router, prefix="/api")
 app.include_router(config_routes.router, prefix="/api")
+app.include_router(search_routes.router, prefix="/api")
+app.include_router(admin_routes.router, prefix="/api")
 
 @app.get("/", response_class=HTMLResponse)
 async def read_index():
@@ -74,6 +106,11 @@ async def api_root():
     """API root endpoint to check if API is running."""
     return {"message": "Document QA API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose application metrics in the Prometheus text format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     # Start the server with uvicorn when script is run directly
     logger.info("Starting Document QA API server")
@@ -3,8 +3,9 @@ Utility functions for logging and configuration.
 """
 import logging
 import os
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 from app.utils.env import load_env_file, get_settings
+from app.utils.request_context import RequestIdFilter
 
 # Load environment variables from settings.json file
 load_env_file()
@@ -28,10 +29,12 @@ def setup_logging(log_level: str = "INFO", log_file: str = "app.log") -> None:
     import sys
     console_handler = logging.StreamHandler(sys.stdout)
     
-    # Set formatters
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    # Set formatters (request_id is the correlation ID of the request being handled)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s')
+    request_id_filter = RequestIdFilter()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+        handler.addFilter(request_id_filter)
     
     # Configure root logger
     root_logger = logging.getLogger()
@@ -59,19 +62,105 @@ def get_app_config() -> Dict[str, Any]:
     if settings:
         return {
             "ollama_base_url": settings.get("ollama_base_url", "http://192.168.21.237:11434/"),
+            "ollama_base_urls": settings.get("ollama_base_urls", []),
             "ollama_model": settings.get("ollama_model", "deepseek-r1:8b"),
             "temperature": float(settings.get("temperature", 0.1)),
             "chroma_persist_dir": settings.get("chroma_persist_dir", "./chroma_db"),
             "max_context": int(settings.get("max_context", 120)),
-            "default_language": settings.get("default_language", "auto")
+            "default_language": settings.get("default_language", "auto"),
+            "chunk_strategy": settings.get("chunk_strategy", "recursive"),
+            "chunk_size": int(settings.get("chunk_size", 200)),
+            "chunk_overlap": int(settings.get("chunk_overlap", 20)),
+            "chunk_length_unit": settings.get("chunk_length_unit", "tokens"),
+            "chunk_tokenizer": settings.get("chunk_tokenizer", "approximate"),
+            "chunking_profiles": settings.get("chunking_profiles", {}),
+            "chroma_server_host": settings.get("chroma_server_host", ""),
+            "chroma_server_port": int(settings.get("chroma_server_port", 8001)),
+            "workers": settings.get("workers", 1),
+            "llm_max_in_flight": int(settings.get("llm_max_in_flight", 2)),
+            "llm_queue_size": int(settings.get("llm_queue_size", 32)),
+            "llm_queue_timeout": float(settings.get("llm_queue_timeout", 60)),
+            "ollama_circuit_failures": int(settings.get("ollama_circuit_failures", 3)),
+            "ollama_circuit_cooldown": float(settings.get("ollama_circuit_cooldown", 30)),
+            "warmup_mode": settings.get("warmup_mode", "background"),
+            "ollama_keep_alive": settings.get("ollama_keep_alive", "30m"),
+            "ollama_prewarm": bool(settings.get("ollama_prewarm", True)),
+            "ollama_keep_warm_interval": float(settings.get("ollama_keep_warm_interval", 0)),
+            "condense_mode": settings.get("condense_mode", "auto"),
+            "condense_model": settings.get("condense_model", ""),
+            "condense_cache_size": int(settings.get("condense_cache_size", 256)),
+            "context_order": settings.get("context_order", "stable"),
+            "batch_max_questions": int(settings.get("batch_max_questions", 500)),
+            "exact_search_max_chunks": int(settings.get("exact_search_max_chunks", 20000)),
+            "vector_cache_max_chunks": int(settings.get("vector_cache_max_chunks", 100000)),
+            "vector_backend": settings.get("vector_backend", "chroma"),
+            "local_index_search": settings.get("local_index_search", "auto"),
+            "local_index_ef_search": int(settings.get("local_index_ef_search", 64)),
+            "local_index_quantization": settings.get("local_index_quantization", "none"),
+            "local_index_rescore_factor": int(settings.get("local_index_rescore_factor", 4)),
+            "admin_token": settings.get("admin_token", ""),
+            "snapshot_dir": settings.get("snapshot_dir", "./snapshots"),
+            "boilerplate_filter": settings.get("boilerplate_filter", "off"),
+            "boilerplate_min_documents": int(settings.get("boilerplate_min_documents", 5)),
+            "boilerplate_page_ratio": float(settings.get("boilerplate_page_ratio", 0.5)),
+            "extractors": settings.get("extractors", {}),
+            "extract_workers": int(settings.get("extract_workers", 0)),
+            "extract_parallel_min_pages": int(settings.get("extract_parallel_min_pages", 16))
         }
     else:
         # Fallback to environment variables
         return {
             "ollama_base_url": os.environ.get("OLLAMA_BASE_URL", "http://192.168.21.237:11434/"),
+            "ollama_base_urls": [url.strip() for url in os.environ.get("OLLAMA_BASE_URLS", "").split(",") if url.strip()],
             "ollama_model": os.environ.get("OLLAMA_MODEL", "deepseek-r1:8b"),
             "temperature": float(os.environ.get("TEMPERATURE", "0.1")),
             "chroma_persist_dir": os.environ.get("CHROMA_PERSIST_DIR", "./chroma_db"),
             "max_context": int(os.environ.get("MAX_CONTEXT", "120")),
-            "default_language": os.environ.get("DEFAULT_LANGUAGE", "auto")
+            "default_language": os.environ.get("DEFAULT_LANGUAGE", "auto"),
+            "chunk_strategy": os.environ.get("CHUNK_STRATEGY", "recursive"),
+            "chunk_size": int(os.environ.get("CHUNK_SIZE", "200")),
+            "chunk_overlap": int(os.environ.get("CHUNK_OVERLAP", "20")),
+            "chunk_length_unit": os.environ.get("CHUNK_LENGTH_UNIT", "tokens"),
+            "chunk_tokenizer": os.environ.get("CHUNK_TOKENIZER", "approximate"),
+            "chunking_profiles": {},
+            "chroma_server_host": os.environ.get("CHROMA_SERVER_HOST", ""),
+            "chroma_server_port": int(os.environ.get("CHROMA_SERVER_PORT", "8001")),
+            "workers": os.environ.get("WORKERS", "1"),
+            "llm_max_in_flight": int(os.environ.get("LLM_MAX_IN_FLIGHT", "2")),
+            "llm_queue_size": int(os.environ.get("LLM_QUEUE_SIZE", "32")),
+            "llm_queue_timeout": float(os.environ.get("LLM_QUEUE_TIMEOUT", "60")),
+            "ollama_circuit_failures": int(os.environ.get("OLLAMA_CIRCUIT_FAILURES", "3")),
+            "ollama_circuit_cooldown": float(os.environ.get("OLLAMA_CIRCUIT_COOLDOWN", "30")),
+            "warmup_mode": os.environ.get("WARMUP_MODE", "background"),
+            "ollama_keep_alive": os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),
+            "ollama_prewarm": os.environ.get("OLLAMA_PREWARM", "true").lower() in ("1", "true", "yes"),
+            "ollama_keep_warm_interval": float(os.environ.get("OLLAMA_KEEP_WARM_INTERVAL", "0")),
+            "condense_mode": os.environ.get("CONDENSE_MODE", "auto"),
+            "condense_model": os.environ.get("CONDENSE_MODEL", ""),
+            "condense_cache_size": int(os.environ.get("CONDENSE_CACHE_SIZE", "256")),
+            "context_order": os.environ.get("CONTEXT_ORDER", "stable"),
+            "batch_max_questions": int(os.environ.get("BATCH_MAX_QUESTIONS", "500")),
+            "exact_search_max_chunks": int(os.environ.get("EXACT_SEARCH_MAX_CHUNKS", "20000")),
+            "vector_cache_max_chunks": int(os.environ.get("VECTOR_CACHE_MAX_CHUNKS", "100000")),
+            "vector_backend": os.environ.get("VECTOR_BACKEND", "chroma"),
+            "local_index_search": os.environ.get("LOCAL_INDEX_SEARCH", "auto"),
+            "local_index_ef_search": int(os.environ.get("LOCAL_INDEX_EF_SEARCH", "64")),
+            "local_index_quantization": os.environ.get("LOCAL_INDEX_QUANTIZATION", "none"),
+            "local_index_rescore_factor": int(os.environ.get("LOCAL_INDEX_RESCORE_FACTOR", "4")),
+            "admin_token": os.environ.get("ADMIN_TOKEN", ""),
+            "snapshot_dir": os.environ.get("SNAPSHOT_DIR", "./snapshots"),
+            "boilerplate_filter": os.environ.get("BOILERPLATE_FILTER", "off"),
+            "boilerplate_min_documents": int(os.environ.get("BOILERPLATE_MIN_DOCUMENTS", "5")),
+            "boilerplate_page_ratio": float(os.environ.get("BOILERPLATE_PAGE_RATIO", "0.5")),
+            "extractors": dict(
+                entry.strip().split("=", 1) for entry in os.environ.get("EXTRACTORS", "").split(",") if "=" in entry
+            ),
+            "extract_workers": int(os.environ.get("EXTRACT_WORKERS", "0")),
+            "extract_parallel_min_pages": int(os.environ.get("EXTRACT_PARALLEL_MIN_PAGES", "16"))
         }
+
+def get_ollama_base_urls(config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Return the configured Ollama base URLs (ollama_base_urls, or ollama_base_url alone)."""
+    config = config or get_app_config()
+    urls = [url for url in config.get("ollama_base_urls") or [] if url]
+    return urls or [config["ollama_base_url"]]
@@ -0,0 +1,49 @@
+"""
+Inter-process file locking utility.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+import os
+import threading
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class InterProcessLock:
+    """
+    Exclusive lock shared by all processes (and threads) using the same lock file.
+
+    Used to serialize writers to on-disk stores that are not safe for concurrent
+    writes from several server workers.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the lock file (created if missing)
+        """
+        self.path = path
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        """Hold the lock for the duration of the block."""
+        with self._thread_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a+b") as lock_file:
+                if os.name == "nt":
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if os.name == "nt":
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    else:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
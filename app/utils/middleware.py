@@ -6,11 +6,17 @@ import logging
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.core.metrics import HTTP_REQUESTS_IN_FLIGHT, HTTP_REQUEST_DURATION
+from app.utils.request_context import REQUEST_ID_HEADER, new_request_id, set_request_id, reset_request_id
+
 logger = logging.getLogger(__name__)
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     """
-    Middleware for logging requests and responses.
+    Middleware for logging requests and responses and recording HTTP metrics.
+
+    Each request gets a correlation ID (taken from the X-Request-ID header or
+    generated) that is attached to every log record and returned in the response.
     """
     
     async def dispatch(self, request: Request, call_next):
@@ -24,7 +30,9 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         Returns:
             The response from the next middleware or endpoint
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
+        request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+        token = set_request_id(request_id)
         
         # Get request details
         method = request.method
@@ -34,12 +42,16 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # Log request
         logger.info(f"Request: {method} {url} from {client}")
         
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        status_code = 500
         try:
             # Process request
             response = await call_next(request)
+            status_code = response.status_code
+            response.headers[REQUEST_ID_HEADER] = request_id
             
             # Calculate processing time
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
             
             # Log response
             logger.info(f"Response: {method} {url} - {response.status_code} ({process_time:.4f}s)")
@@ -52,6 +64,26 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             
             # Re-raise for FastAPI exception handlers
             raise
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                method=method,
+                route=_route_template(request),
+                status=str(status_code)
+            )
+            reset_request_id(token)
+
+def _route_template(request: Request) -> str:
+    """
+    Get the route path template for a request (e.g. /api/documents/{document_id}).
+
+    Using the template instead of the raw path keeps metric label cardinality bounded.
+    """
+    route = request.scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    return "unmatched"
 
 class LanguageMiddleware(BaseHTTPMiddleware):
     """
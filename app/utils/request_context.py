@@ -0,0 +1,49 @@
+"""
+Request context utilities.
+This module keeps a per-request correlation ID and makes it available to every log record.
+"""
+from contextvars import ContextVar
+from typing import Optional
+from uuid import uuid4
+import logging
+
+# Header used to receive and return the correlation ID
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Correlation ID of the request being handled ("-" outside of a request)
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """
+    Return the incoming correlation ID if it is usable, otherwise generate a new one.
+
+    Args:
+        incoming: Correlation ID received from the client, if any
+
+    Returns:
+        The correlation ID to use for the request
+    """
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid4().hex
+
+def set_request_id(request_id: str):
+    """Set the correlation ID for the current context and return a reset token."""
+    return _request_id.set(request_id)
+
+def reset_request_id(token) -> None:
+    """Restore the correlation ID that was active before set_request_id."""
+    _request_id.reset(token)
+
+def get_request_id() -> str:
+    """Get the correlation ID of the current request."""
+    return _request_id.get()
+
+class RequestIdFilter(logging.Filter):
+    """
+    Logging filter that adds the current correlation ID to log records as ``request_id``.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id()
+        return True
@@ -0,0 +1,147 @@
+"""
+End-to-end /api/ask latency benchmark.
+
+Drives the FastAPI app in-process through httpx and reports p50/p95 latency
+and throughput at increasing concurrency levels, then sends the same number of
+questions as one /api/ask/batch request. By default generations go
+through the real OllamaLLM HTTP client to a local fake Ollama server; with
+--stub-llm they are produced in-process instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import StubLLM, load_app, make_pages, summarize, write_results
+from benchmarks.fake_ollama import FakeOllamaServer
+
+CONCURRENCY_LEVELS = (1, 4, 16)
+QUICK_CONCURRENCY_LEVELS = (1, 4)
+REQUESTS_PER_LEVEL = 48
+QUICK_REQUESTS_PER_LEVEL = 8
+
+
+async def _drive(client: httpx.AsyncClient, concurrency: int, total: int, document_ids) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    rejected = 0
+
+    async def one(i: int):
+        nonlocal errors, rejected
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/ask", data={
+                "question": f"What is the reference code for item {i}?",
+                "document_ids": document_ids,
+            })
+            latencies.append(time.perf_counter() - start)
+            if response.status_code in (429, 503):
+                rejected += 1
+            elif response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rejected": rejected,
+        "requests_per_sec": total / wall,
+        "latency": summarize(latencies),
+    }
+
+
+async def _drive_batch(client: httpx.AsyncClient, total: int, document_ids) -> dict:
+    """Send the same questions as one /api/ask/batch request and time the answers."""
+    questions = [f"What is the reference code for item {i}?" for i in range(total)]
+    answers = 0
+    errors = 0
+    start = time.perf_counter()
+    async with client.stream("POST", "/api/ask/batch", json={
+        "questions": questions, "document_ids": document_ids
+    }) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            answers += 1
+            if "error" in json.loads(line):
+                errors += 1
+    wall = time.perf_counter() - start
+    return {
+        "requests": total,
+        "answers": answers,
+        "errors": errors,
+        "requests_per_sec": total / wall,
+        "total_seconds": wall,
+    }
+
+
+async def _run(quick: bool, workdir: str, llm=None, settings=None) -> dict:
+    main_module = load_app(workdir, llm=llm, settings=settings)
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        document_text = "\n\n".join(make_pages(20, seed=1)).encode("utf-8")
+        response = await client.post("/api/upload", files={"file": ("bench.txt", document_text)})
+        response.raise_for_status()
+        document_ids = [response.json()["document_id"]]
+
+        total = QUICK_REQUESTS_PER_LEVEL if quick else REQUESTS_PER_LEVEL
+        levels = []
+        for concurrency in (QUICK_CONCURRENCY_LEVELS if quick else CONCURRENCY_LEVELS):
+            levels.append(await _drive(client, concurrency, total, document_ids))
+        batch = await _drive_batch(client, total, document_ids)
+    return {"levels": levels, "batch": batch}
+
+
+def run(quick: bool = False, first_token_delay: float = 0.05, token_delay: float = 0.005,
+        stub_llm: bool = False, parallel: int = 0, max_in_flight: int = 2) -> dict:
+    """Run the /api/ask benchmark and return its results."""
+    cwd = os.getcwd()
+    settings = {"llm_max_in_flight": max_in_flight}
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if stub_llm:
+                llm = StubLLM(first_token_delay=first_token_delay, token_delay=token_delay)
+                results = asyncio.run(_run(quick, temp_dir, llm=llm, settings=settings))
+            else:
+                tokens_per_second = 1.0 / token_delay if token_delay > 0 else 0
+                with FakeOllamaServer(models=["stub"], tokens_per_second=tokens_per_second,
+                                      first_token_delay=first_token_delay, parallel=parallel) as server:
+                    results = asyncio.run(_run(quick, temp_dir, settings=dict(settings, ollama_base_url=server.url)))
+                    results["server"] = dict(server.stats)
+    finally:
+        os.chdir(cwd)
+    results["llm"] = {
+        "backend": "stub" if stub_llm else "fake_ollama",
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+        "parallel": parallel,
+        "max_in_flight": max_in_flight,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run fewer requests and concurrency levels")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="LLM delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="LLM delay between tokens (s)")
+    parser.add_argument("--parallel", type=int, default=0, help="Fake server generation slots (0 = unlimited)")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="LLM scheduler slots (llm_max_in_flight)")
+    parser.add_argument("--stub-llm", action="store_true", help="Generate in-process instead of via the fake Ollama server")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    results = run(args.quick, args.first_token_delay, args.token_delay, args.stub_llm, args.parallel, args.max_in_flight)
+    print(write_results("ask", results, args.output))
+
+
+if __name__ == "__main__":
+    main()
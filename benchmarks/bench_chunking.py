@@ -0,0 +1,94 @@
+"""
+Chunking settings benchmark.
+
+Compares chunking profiles by index size, ingestion time and retrieval
+quality. Quality is measured by querying with sentences taken from the corpus
+and checking whether a top-k chunk contains the whole sentence (recall@k and
+MRR), which rewards both good retrieval and chunks that keep sentences intact.
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from langchain_core.documents import Document
+
+from benchmarks.common import HashingEmbeddings, make_pages, stopwatch, write_results
+
+PROFILES = {
+    "chars-1000-200": {"strategy": "recursive", "chunk_size": 1000, "chunk_overlap": 200, "length_unit": "characters"},
+    "tokens-200-20": {"strategy": "recursive", "chunk_size": 200, "chunk_overlap": 20, "length_unit": "tokens"},
+    "tokens-200-0": {"strategy": "recursive", "chunk_size": 200, "chunk_overlap": 0, "length_unit": "tokens"},
+    "tokens-128-16": {"strategy": "recursive", "chunk_size": 128, "chunk_overlap": 16, "length_unit": "tokens"},
+    "fixed-tokens-200-20": {"strategy": "fixed", "chunk_size": 200, "chunk_overlap": 20, "length_unit": "tokens"},
+}
+PAGES = 200
+QUICK_PAGES = 40
+QUERIES = 100
+TOP_K = 4
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run(quick: bool = False) -> dict:
+    """Run the chunking benchmark and return its results."""
+    from app.core.chunking import split_documents
+    from app.core.document_store import DocumentStore
+
+    pages = make_pages(QUICK_PAGES if quick else PAGES, seed=7, arabic_ratio=0.3)
+    corpus_chars = sum(len(page) for page in pages)
+    rng = random.Random(7)
+    sentences = []
+    for page in pages:
+        sentences.extend(s.strip() + "." for s in page.split(".") if len(s.split()) >= 8)
+    queries = rng.sample(sentences, min(QUERIES, len(sentences)))
+
+    results = []
+    for name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+            documents = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(pages)]
+            with stopwatch() as elapsed:
+                chunks = split_documents(documents, profile=profile)
+                store.db.add_documents(chunks)
+            stored_chars = sum(len(chunk.page_content) for chunk in chunks)
+
+            hits = 0
+            reciprocal_ranks = 0.0
+            retriever = store.db.as_retriever(search_kwargs={"k": TOP_K})
+            for query in queries:
+                for rank, doc in enumerate(retriever.invoke(query), start=1):
+                    if query in doc.page_content:
+                        hits += 1
+                        reciprocal_ranks += 1.0 / rank
+                        break
+            results.append({
+                "profile": name,
+                "settings": profile,
+                "chunks": len(chunks),
+                "stored_chars": stored_chars,
+                "duplication_ratio": stored_chars / corpus_chars - 1,
+                "index_bytes": _directory_size(temp_dir),
+                "ingest_seconds": elapsed["seconds"],
+                f"recall_at_{TOP_K}": hits / len(queries),
+                "mrr": reciprocal_ranks / len(queries),
+            })
+    return {"corpus": {"pages": len(pages), "chars": corpus_chars, "queries": len(queries)}, "profiles": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Use a smaller corpus")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("chunking", run(args.quick), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Text extraction benchmark.
+
+Measures the throughput (pages/sec and MB/sec) of every registered extractor
+on synthetic files: PDFs of increasing size for the PDF extractors, and the
+same text as TXT, Markdown, HTML and DOCX for the others. The parallel PDF
+extractor is timed cold (its worker processes are started by the first
+document) and warm. Extractors whose optional dependency is missing are
+reported as unavailable.
+"""
+import argparse
+import html
+import os
+import tempfile
+
+from benchmarks.common import make_pages, stopwatch, write_docx, write_pdf, write_results
+
+PDF_SIZES = (10, 100, 400)
+QUICK_PDF_SIZES = (10, 50)
+TEXT_PAGES = 200
+QUICK_TEXT_PAGES = 40
+REPEATS = 3
+
+
+def _write_file(directory: str, file_type: str, pages) -> str:
+    path = os.path.join(directory, f"bench.{file_type}")
+    if file_type == "pdf":
+        return write_pdf(path, pages)
+    if file_type == "docx":
+        return write_docx(path, pages)
+    if file_type == "html":
+        text = "".join(f"<h2>Page {i}</h2><p>{html.escape(page)}</p>" for i, page in enumerate(pages))
+        text = f"<html><head><title>Benchmark</title><style>p {{}}</style></head><body>{text}</body></html>"
+    elif file_type == "md":
+        text = "".join(f"## Page {i}\n\n{page}\n\n" for i, page in enumerate(pages))
+    else:
+        text = "\n\n".join(pages)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def _measure(path: str, file_type: str, extractor: str, config: dict, pages: int) -> dict:
+    from app.core.extractors import extract_document
+
+    try:
+        with stopwatch() as cold:
+            documents = extract_document(path, file_type, config, extractor)
+    except (ValueError, ImportError) as e:
+        return {"extractor": extractor, "file_type": file_type, "pages": pages, "unavailable": str(e)}
+    timings = []
+    for _ in range(REPEATS):
+        with stopwatch() as elapsed:
+            extract_document(path, file_type, config, extractor)
+        timings.append(elapsed["seconds"])
+    seconds = min(timings)
+    megabytes = os.path.getsize(path) / 1e6
+    return {
+        "extractor": extractor,
+        "file_type": file_type,
+        "pages": pages,
+        "megabytes": round(megabytes, 3),
+        "characters": sum(len(document.page_content) for document in documents),
+        "cold_seconds": cold["seconds"],
+        "seconds": seconds,
+        "pages_per_sec": pages / seconds,
+        "mb_per_sec": megabytes / seconds,
+    }
+
+
+def run(quick: bool = False, workers: int = 0) -> dict:
+    """Run the extraction benchmark and return its results."""
+    from app.core.extractors import DEFAULT_EXTRACTORS, EXTRACTOR_FILE_TYPES
+
+    # Always take the parallel path, so its overhead on small files shows
+    config = {"extract_workers": workers, "extract_parallel_min_pages": 0}
+    pdf_extractors = [name for name, file_types in EXTRACTOR_FILE_TYPES.items() if "pdf" in file_types]
+    results = {"workers": workers or os.cpu_count(), "pdf": [], "other": []}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Latin text only: the PDFs use a standard font without Arabic glyphs
+        for pages_count in (QUICK_PDF_SIZES if quick else PDF_SIZES):
+            path = _write_file(temp_dir, "pdf", make_pages(pages_count, seed=pages_count, arabic_ratio=0))
+            for extractor in pdf_extractors:
+                results["pdf"].append(_measure(path, "pdf", extractor, config, pages_count))
+
+        pages_count = QUICK_TEXT_PAGES if quick else TEXT_PAGES
+        pages = make_pages(pages_count, seed=1)
+        for file_type in ("txt", "md", "html", "docx"):
+            path = _write_file(temp_dir, file_type, pages)
+            results["other"].append(_measure(path, file_type, DEFAULT_EXTRACTORS[file_type], config, pages_count))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of sizes")
+    parser.add_argument("--workers", type=int, default=0, help="Processes of the parallel PDF extractor (0 = CPUs)")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("extraction", run(args.quick, args.workers), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Ingestion throughput benchmark.
+
+Measures pages/sec and chunks/sec of DocumentStore indexing (split, embed,
+store) for documents of increasing size.
+"""
+import argparse
+import tempfile
+import uuid
+
+from langchain_core.documents import Document
+
+from benchmarks.common import HashingEmbeddings, make_pages, stopwatch, write_results
+
+DOCUMENT_SIZES = (1, 10, 50, 200)
+QUICK_DOCUMENT_SIZES = (1, 10)
+
+
+def run(quick: bool = False) -> dict:
+    """Run the ingestion benchmark and return its results."""
+    from app.core.document_store import DocumentStore
+
+    results = []
+    for pages_count in (QUICK_DOCUMENT_SIZES if quick else DOCUMENT_SIZES):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+            pages = [Document(page_content=text, metadata={"page": i})
+                     for i, text in enumerate(make_pages(pages_count, seed=pages_count))]
+            with stopwatch() as elapsed:
+                chunks = store._index_documents(str(uuid.uuid4()), "bench.pdf", "pdf", pages)
+            seconds = elapsed["seconds"]
+            results.append({
+                "pages": pages_count,
+                "chunks": chunks,
+                "seconds": seconds,
+                "pages_per_sec": pages_count / seconds,
+                "chunks_per_sec": chunks / seconds,
+            })
+    return {"documents": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of sizes")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("ingestion", run(args.quick), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Conversation persistence benchmark.
+
+Measures the cost of saving a new turn and loading a conversation against the
+number of conversations already stored.
+"""
+import argparse
+import os
+import tempfile
+
+from langchain.schema.messages import AIMessage, HumanMessage
+
+from benchmarks.common import stopwatch, summarize, write_results
+
+CONVERSATION_COUNTS = (10, 100, 1000, 5000)
+QUICK_CONVERSATION_COUNTS = (10, 100)
+TURNS_PER_CONVERSATION = 5
+SAMPLES = 50
+
+
+def run(quick: bool = False) -> dict:
+    """Run the persistence benchmark and return its results."""
+    import app.core.memory_store as memory_store
+    from app.core.state_store import StateStore
+
+    original_store = memory_store._state_store
+    results = []
+    try:
+        for count in (QUICK_CONVERSATION_COUNTS if quick else CONVERSATION_COUNTS):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                store = StateStore(os.path.join(temp_dir, "app_state.db"))
+                memory_store.set_conversation_store(store)
+                turn = [("human", "Question about the report?"), ("ai", "Answer " + "lorem ipsum " * 40)]
+                for i in range(count):
+                    store.append_messages(f"conv-{i}", turn * TURNS_PER_CONVERSATION)
+
+                save_latencies = []
+                load_latencies = []
+                for i in range(SAMPLES):
+                    conversation_id = f"conv-{i % count}"
+                    with stopwatch() as load_time:
+                        memory, _ = memory_store.get_or_create_memory(conversation_id)
+                    load_latencies.append(load_time["seconds"])
+                    with stopwatch() as save_time:
+                        memory_store.save_messages(conversation_id, [
+                            HumanMessage(content="Follow-up question?"),
+                            AIMessage(content="Follow-up answer."),
+                        ])
+                    save_latencies.append(save_time["seconds"])
+                results.append({
+                    "conversations": count,
+                    "messages": count * TURNS_PER_CONVERSATION * 2,
+                    "db_bytes": os.path.getsize(store.path),
+                    "save_turn": summarize(save_latencies),
+                    "load_conversation": summarize(load_latencies),
+                })
+                store.close()
+    finally:
+        memory_store.set_conversation_store(original_store)
+    return {"persistence": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of conversation counts")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("memory_store", run(args.quick), args.output))
+
+
+if __name__ == "__main__":
+    main()
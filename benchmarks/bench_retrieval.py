@@ -0,0 +1,79 @@
+"""
+Retrieval latency benchmark.
+
+Measures retriever latency (query embedding + vector search) against corpus
+size, for unfiltered queries and queries scoped to a few documents. Scoped
+queries are measured both with the exact search used for small scopes and
+with Chroma's filtered HNSW search, together with the recall of the latter.
+"""
+import argparse
+import random
+import tempfile
+import uuid
+
+from langchain_core.documents import Document
+
+from benchmarks.common import HashingEmbeddings, make_pages, stopwatch, summarize, write_results
+
+CORPUS_SIZES = (100, 1000, 5000)
+QUICK_CORPUS_SIZES = (100, 500)
+PAGES_PER_DOCUMENT = 10
+QUERIES = 50
+
+
+def run(quick: bool = False) -> dict:
+    """Run the retrieval benchmark and return its results."""
+    from app.core.document_store import DocumentStore
+
+    rng = random.Random(0)
+    results = []
+    for corpus_pages in (QUICK_CORPUS_SIZES if quick else CORPUS_SIZES):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+            pages = make_pages(corpus_pages, seed=corpus_pages)
+            document_ids = []
+            for start in range(0, corpus_pages, PAGES_PER_DOCUMENT):
+                document_id = str(uuid.uuid4())
+                document_ids.append(document_id)
+                store._index_documents(document_id, f"doc{start}.pdf", "pdf", [
+                    Document(page_content=text, metadata={"page": i})
+                    for i, text in enumerate(pages[start:start + PAGES_PER_DOCUMENT])
+                ])
+            queries = [" ".join(rng.choice(pages).split()[:12]) for _ in range(QUERIES)]
+
+            entry = {"pages": corpus_pages, "chunks": store.index.count()}
+            found = {}
+            for scope, ids, exact_max_chunks in (
+                ("all", None, 0),
+                ("filtered_exact", document_ids[:3], corpus_pages),
+                ("filtered_hnsw", document_ids[:3], 0),
+            ):
+                store.exact_search_max_chunks = exact_max_chunks
+                retriever = store.get_retriever(ids)
+                latencies = []
+                found[scope] = []
+                for query in queries:
+                    with stopwatch() as elapsed:
+                        documents = retriever.invoke(query)
+                    latencies.append(elapsed["seconds"])
+                    found[scope].append({doc.id for doc in documents})
+                entry[scope] = summarize(latencies)
+            # Share of the exact top-k that the filtered HNSW search also returns
+            entry["filtered_hnsw_recall"] = sum(
+                len(exact & approximate) / max(len(exact), 1)
+                for exact, approximate in zip(found["filtered_exact"], found["filtered_hnsw"])
+            ) / len(queries)
+            results.append(entry)
+    return {"corpora": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of corpus sizes")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("retrieval", run(args.quick), args.output))
+
+
+if __name__ == "__main__":
+    main()
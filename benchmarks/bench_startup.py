@@ -0,0 +1,144 @@
+"""
+Startup benchmark.
+
+Measures how long importing ``app.main`` takes, with a per-module profile from
+``python -X importtime``, and how long the startup warm-up steps take. Every
+measurement runs in a fresh interpreter so modules imported by earlier runs
+do not hide the cost.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks.common import PROJECT_ROOT, write_results
+
+RUNS = 5
+QUICK_RUNS = 2
+TOP_MODULES = 15
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+_WARMUP_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from benchmarks.common import load_app
+load_app(sys.argv[1], real_embeddings=sys.argv[2] == "1")
+imported = time.perf_counter()
+from app.core.warmup import run_warmup, readiness_report
+ready = asyncio.run(run_warmup())
+done = time.perf_counter()
+report = readiness_report()
+print(json.dumps({
+    "load_app_seconds": imported - start,
+    "warmup_seconds": done - imported,
+    "ready": ready,
+    "steps": {name: step["seconds"] for name, step in report["steps"].items()},
+    "errors": {name: step["error"] for name, step in report["steps"].items() if step["error"]},
+}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _write_settings(workdir: str) -> None:
+    with open(os.path.join(workdir, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"chroma_persist_dir": os.path.join(workdir, "chroma_db")}, f)
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, float, float]]:
+    """Parse ``-X importtime`` output into (module, depth, self seconds, cumulative seconds)."""
+    modules = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, len(indent) // 2, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return modules
+
+
+def profile_imports(workdir: str) -> Dict[str, object]:
+    """Import app.main once with -X importtime and summarize where the time goes."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir, env=_env(), capture_output=True, text=True, check=True
+    )
+    modules = parse_importtime(completed.stderr)
+    by_package: Dict[str, float] = defaultdict(float)
+    for name, _, self_seconds, _ in modules:
+        by_package[name.split(".")[0]] += self_seconds
+    total = next(cumulative for name, _, _, cumulative in modules if name == "app.main")
+    return {
+        "total_seconds": total,
+        "app_modules": {name: cumulative for name, _, _, cumulative in modules if name.startswith("app.")},
+        "top_packages": dict(sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]),
+        "top_modules_self": dict(sorted(
+            ((name, self_seconds) for name, _, self_seconds, _ in modules),
+            key=lambda item: item[1], reverse=True
+        )[:TOP_MODULES]),
+        "heavy_modules_loaded": sorted(
+            package for package in ("torch", "transformers", "sentence_transformers", "chromadb", "langchain_community")
+            if package in by_package
+        ),
+    }
+
+
+def measure_warmup(workdir: str, real_embeddings: bool = False) -> Dict[str, object]:
+    """Import the app and run the warm-up steps in a fresh interpreter."""
+    completed = subprocess.run(
+        [sys.executable, "-c", _WARMUP_SCRIPT, workdir, "1" if real_embeddings else "0"],
+        cwd=PROJECT_ROOT, env=_env(), capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(quick: bool = False, real_embeddings: bool = False) -> dict:
+    """Run the startup benchmark and return its results."""
+    runs = QUICK_RUNS if quick else RUNS
+    profiles = []
+    warmups = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            _write_settings(workdir)
+            profiles.append(profile_imports(workdir))
+        with tempfile.TemporaryDirectory() as workdir:
+            warmups.append(measure_warmup(workdir, real_embeddings))
+
+    # Report the median run in full, plus the spread of the totals
+    profiles.sort(key=lambda profile: profile["total_seconds"])
+    warmups.sort(key=lambda warmup: warmup["warmup_seconds"])
+    return {
+        "runs": runs,
+        "embeddings": "huggingface" if real_embeddings else "hashing",
+        "import_seconds": {
+            "median": statistics.median(p["total_seconds"] for p in profiles),
+            "min": profiles[0]["total_seconds"],
+            "max": profiles[-1]["total_seconds"],
+        },
+        "import_profile": profiles[len(profiles) // 2],
+        "warmup": warmups[len(warmups) // 2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run fewer repetitions")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Warm up the real HuggingFace embedding model (needs it downloaded)")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("startup", run(args.quick, args.real_embeddings), args.output))
+
+
+if __name__ == "__main__":
+    main()
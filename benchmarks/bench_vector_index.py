@@ -0,0 +1,143 @@
+"""
+Vector index backend benchmark.
+
+Compares the Chroma backend with the local engine (exact and HNSW search,
+over float32 or int8-quantized vectors) on the same synthetic vectors: build
+time, open time, query latency with and without a document filter, recall@10
+against exact search, bytes of vectors searched in memory and disk size.
+Query vectors are precomputed, so latencies are those of the index alone.
+Chroma reuses its client within a process, so its open time understates a
+cold start.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import HashingEmbeddings, stopwatch, summarize, write_results
+
+CORPUS_SIZES = (5000, 20000)
+QUICK_CORPUS_SIZES = (1000, 3000)
+DIMENSIONS = 384
+CHUNKS_PER_DOCUMENT = 50
+QUERIES = 50
+TOP_K = 10
+# Backend name -> vector_index configuration
+BACKENDS = {
+    "chroma": {"vector_backend": "chroma"},
+    "local_exact": {"vector_backend": "local", "local_index_search": "exact"},
+    "local_hnsw": {"vector_backend": "local", "local_index_search": "hnsw"},
+    "local_exact_int8": {"vector_backend": "local", "local_index_search": "exact", "local_index_quantization": "int8"},
+    "local_hnsw_int8": {"vector_backend": "local", "local_index_search": "hnsw", "local_index_quantization": "int8"},
+}
+
+
+def make_vectors(count: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around a few hundred topics, like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(count // 20, 1), DIMENSIONS))
+    vectors = topics[rng.integers(len(topics), size=count)] + 0.6 * rng.normal(size=(count, DIMENSIONS))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _add(index, ids, texts, metadatas, vectors) -> None:
+    if hasattr(index, "add_vectors"):
+        index.add_vectors(ids, texts, metadatas, vectors)
+        return
+    collection = index.db._collection
+    batch = 5000
+    for start in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[start:start + batch],
+            embeddings=vectors[start:start + batch],
+            documents=texts[start:start + batch],
+            metadatas=metadatas[start:start + batch],
+        )
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def _measure(index, queries: np.ndarray, where=None):
+    latencies, found = [], []
+    for query in queries:
+        with stopwatch() as elapsed:
+            hits = index.query([query.tolist()], TOP_K, where)[0]
+        latencies.append(elapsed["seconds"])
+        found.append({doc.id for doc, _ in hits})
+    return summarize(latencies), found
+
+
+def _recall(found, expected) -> float:
+    return sum(len(hit & truth) / max(len(truth), 1) for hit, truth in zip(found, expected)) / len(expected)
+
+
+def run(quick: bool = False) -> dict:
+    """Run the vector index benchmark and return its results."""
+    from app.core.index_router import exact_search
+    from app.core.vector_index import open_vector_index
+
+    embeddings = HashingEmbeddings(DIMENSIONS)
+    results = []
+    for count in (QUICK_CORPUS_SIZES if quick else CORPUS_SIZES):
+        vectors = make_vectors(count, seed=count)
+        queries = make_vectors(QUERIES, seed=count + 1)
+        ids = [f"chunk-{i}" for i in range(count)]
+        texts = [f"Chunk {i}" for i in range(count)]
+        metadatas = [{"document_id": f"doc-{i // CHUNKS_PER_DOCUMENT}", "page": i % CHUNKS_PER_DOCUMENT} for i in range(count)]
+        scope = [f"doc-{i}" for i in range(3)]
+        where = {"document_id": {"$in": scope}}
+
+        # Ground truth from brute force over all vectors and over the filtered rows
+        expected_rows, _ = exact_search(queries, vectors, TOP_K)
+        expected = [{ids[row] for row in rows} for rows in expected_rows]
+        scoped_rows = np.array([i for i, metadata in enumerate(metadatas) if metadata["document_id"] in scope])
+        expected_rows, _ = exact_search(queries, vectors[scoped_rows], TOP_K)
+        expected_filtered = [{ids[scoped_rows[row]] for row in rows} for rows in expected_rows]
+
+        entry = {"chunks": count, "dimensions": DIMENSIONS, "backends": {}}
+        for name, config in BACKENDS.items():
+            config = dict(config, chroma_server_host="")
+            with tempfile.TemporaryDirectory() as temp_dir:
+                index = open_vector_index(temp_dir, "bench", embeddings, config)
+                with stopwatch() as build:
+                    _add(index, ids, texts, metadatas, vectors)
+                index.close()
+                with stopwatch() as opened:
+                    index = open_vector_index(temp_dir, "bench", embeddings, config)
+                    index.query([queries[0].tolist()], TOP_K)
+                query_latency, found = _measure(index, queries)
+                filtered_latency, found_filtered = _measure(index, queries, where)
+                entry["backends"][name] = {
+                    "build_seconds": build["seconds"],
+                    "open_seconds": opened["seconds"],
+                    "query": query_latency,
+                    "filtered_query": filtered_latency,
+                    "recall_at_10": _recall(found, expected),
+                    "filtered_recall_at_10": _recall(found_filtered, expected_filtered),
+                    "disk_bytes": _directory_size(temp_dir),
+                }
+                if hasattr(index, "stats"):
+                    stats = index.stats()
+                    entry["backends"][name]["search_bytes"] = stats["search_bytes"]
+                    entry["backends"][name]["memory_saved"] = 1 - stats["search_bytes"] / stats["vector_bytes"]
+                index.close()
+        results.append(entry)
+    return {"corpora": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of corpus sizes")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+    print(write_results("vector_index", run(args.quick), args.output))
+
+
+if __name__ == "__main__":
+    main()
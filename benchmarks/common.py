@@ -0,0 +1,307 @@
+"""
+Shared helpers for the offline benchmark suite.
+
+The benchmarks never touch the network: embeddings come from a deterministic
+hashing model and generations from a stub LLM that mimics Ollama's token
+accounting, so results are comparable between runs and machines.
+"""
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+# Words used to build the synthetic corpus (English and Arabic)
+ENGLISH_WORDS = (
+    "invoice contract payment delivery warranty service customer support policy refund "
+    "account balance report quarter revenue margin employee training safety compliance "
+    "audit schedule shipment inventory supplier quality review approval budget project "
+    "network server database backup security access password update release version"
+).split()
+ARABIC_WORDS = (
+    "فاتورة عقد دفع تسليم ضمان خدمة عميل دعم سياسة استرداد حساب رصيد تقرير ربع إيرادات "
+    "هامش موظف تدريب سلامة امتثال تدقيق جدول شحنة مخزون مورد جودة مراجعة موافقة ميزانية مشروع"
+).split()
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings using the hashing trick.
+
+    Texts that share words get similar vectors, which keeps retrieval
+    quality measurable without downloading an embedding model.
+    """
+
+    def __init__(self, size: int = 384):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.size] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubLLM(LLM):
+    """Stand-in for OllamaLLM that streams a fixed answer.
+
+    Token callbacks and Ollama-style ``generation_info`` (prompt_eval_count,
+    eval_count, eval_duration) are emitted so the metrics and tracing
+    paths behave as they do against a real server.
+    """
+
+    response: str = "The answer can be found in the provided documents."
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        return self.response
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            start = time.perf_counter()
+            time.sleep(self.first_token_delay)
+            tokens = self.response.split(" ")
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.token_delay)
+                if run_manager:
+                    run_manager.on_llm_new_token(token if i == 0 else " " + token)
+            generations.append([Generation(
+                text=self.response,
+                generation_info={
+                    "prompt_eval_count": len(_TOKEN_PATTERN.findall(prompt)),
+                    "eval_count": len(tokens),
+                    "eval_duration": int((time.perf_counter() - start) * 1e9),
+                },
+            )])
+        return LLMResult(generations=generations)
+
+
+def make_pages(count: int, words_per_page: int = 300, seed: int = 0, arabic_ratio: float = 0.2) -> List[str]:
+    """Generate deterministic synthetic document pages.
+
+    Each page is made of short sentences; a fraction of the pages is Arabic.
+    """
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        words = ARABIC_WORDS if rng.random() < arabic_ratio else ENGLISH_WORDS
+        sentences = []
+        written = 0
+        while written < words_per_page:
+            length = rng.randint(6, 18)
+            sentences.append(" ".join(rng.choice(words) for _ in range(length)) + ".")
+            written += length
+        # Unique marker so each page can be targeted by a query
+        sentences.append(f"page{seed}x{i} reference code {rng.randint(10000, 99999)}.")
+        pages.append(" ".join(sentences))
+    return pages
+
+
+def write_pdf(path: str, pages: Sequence[str], chars_per_line: int = 90) -> str:
+    """Write a simple text PDF (Helvetica, Latin-1 text only) with one string per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for text in pages:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if line and len(line) + len(word) >= chars_per_line:
+                lines.append(line)
+                line = ""
+            line = f"{line} {word}" if line else word
+        lines.append(line)
+        escaped = [l.encode("latin-1", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+                   for l in lines]
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td " + b" ".join(b"(" + l + b") Tj T*" for l in escaped) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+    return path
+
+
+def write_docx(path: str, paragraphs: Sequence[str]) -> str:
+    """Write a minimal Word document with one paragraph per string."""
+    from xml.sax.saxutils import escape
+
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>' for text in paragraphs)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        archive.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="word/document.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'
+        ))
+        archive.writestr("word/document.xml", (
+            f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>'
+        ))
+    return path
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the pct-th percentile (0-100) using linear interpolation."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: Sequence[float]) -> Dict[str, float]:
+    """Summarize latencies in seconds as count, mean, p50, p95 and max."""
+    return {
+        "count": len(latencies),
+        "mean": sum(latencies) / len(latencies) if latencies else float("nan"),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies) if latencies else float("nan"),
+    }
+
+
+@contextmanager
+def stopwatch() -> Iterator[Dict[str, float]]:
+    """Measure the wall time of a block; the result is available as ["seconds"]."""
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def environment_info() -> Dict[str, Any]:
+    """Describe the machine and code revision the benchmark ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[str] = None) -> str:
+    """Write benchmark results to a JSON file and return its path."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    payload = {"benchmark": name, "environment": environment_info(), "results": results}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def load_app(workdir: str, llm: Optional[LLM] = None, settings: Optional[Dict[str, Any]] = None,
+             real_embeddings: bool = False):
+    """Import the FastAPI app in an isolated working directory with offline models.
+
+    The app reads settings.json from the working directory at import time, so
+    this must run before anything imports ``app.main``. Embeddings are
+    replaced by HashingEmbeddings unless ``real_embeddings`` is set; when ``llm`` is given, ``get_llm`` returns
+    it instead of an OllamaLLM (otherwise point ``ollama_base_url`` at a
+    FakeOllamaServer through ``settings``).
+
+    Returns:
+        The ``app.main`` module
+    """
+    os.makedirs(workdir, exist_ok=True)
+    config = {
+        "ollama_base_url": "http://127.0.0.1:11434/",
+        "ollama_model": "stub",
+        "temperature": 0.1,
+        "chroma_persist_dir": os.path.join(workdir, "chroma_db"),
+        "max_context": 4,
+        "default_language": "auto",
+    }
+    config.update(settings or {})
+    with open(os.path.join(workdir, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    os.chdir(workdir)
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    if not real_embeddings:
+        import app.core.document_store as document_store
+        document_store.get_embeddings = lambda *args, **kwargs: HashingEmbeddings()
+
+    import app.core.memory_store as memory_store
+    from app.core.state_store import get_state_store
+    memory_store.set_conversation_store(get_state_store(config["chroma_persist_dir"]))
+
+    import app.main as main_module
+    # Per-request INFO logging would dominate the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    if llm is not None:
+        import app.core.llm as llm_module
+        llm_module.get_llm = lambda *args, **kwargs: llm
+    return main_module
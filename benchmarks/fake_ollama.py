@@ -0,0 +1,326 @@
+"""
+Fake Ollama server for offline load and latency testing.
+
+Implements the parts of the Ollama HTTP API the app uses (``/api/generate``,
+``/api/chat``, ``/api/tags``, plus ``/api/ps`` and ``/api/version``) with
+deterministic output, a configurable token rate, first-token delay, cold
+model load time and number of parallel generation slots.
+
+Usage:
+    python -m benchmarks.fake_ollama --port 11435 --tokens-per-second 20 --first-token-delay 0.5
+
+or from Python (e.g. in tests):
+
+    with FakeOllamaServer(tokens_per_second=100) as server:
+        llm = get_llm(base_url=server.url)
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+DEFAULT_MODELS = ("deepseek-r1:8b", "llama3.2:3b")
+DEFAULT_RESPONSE = (
+    "Based on the provided documents, the answer is described in the relevant section. "
+    "Please refer to the cited sources for further details."
+)
+
+
+class FakeOllamaSettings:
+    """Behaviour of the fake server."""
+
+    def __init__(
+        self,
+        models=DEFAULT_MODELS,
+        response: str = DEFAULT_RESPONSE,
+        tokens_per_second: float = 50.0,
+        first_token_delay: float = 0.1,
+        load_delay: float = 0.0,
+        parallel: int = 0,
+    ):
+        """
+        Args:
+            models: Names of the models reported by /api/tags
+            response: Text returned by every generation (split on spaces into tokens)
+            tokens_per_second: Generation speed; 0 means as fast as possible
+            first_token_delay: Prompt evaluation time before the first token (seconds)
+            load_delay: Extra delay the first time a model is used or after it expired (seconds)
+            parallel: Number of generations served at once (0 = unlimited), like OLLAMA_NUM_PARALLEL
+        """
+        self.models = list(models)
+        self.response = response
+        self.tokens_per_second = tokens_per_second
+        self.first_token_delay = first_token_delay
+        self.load_delay = load_delay
+        self.parallel = parallel
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_keep_alive(value: Any) -> Optional[float]:
+    """Convert an Ollama keep_alive value to seconds (None = never expire)."""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    text = str(value).strip()
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in ("ms", "s", "m", "h"):
+        if text.endswith(suffix):
+            seconds = float(text[:-len(suffix)]) * units[suffix]
+            return None if seconds < 0 else seconds
+    seconds = float(text)
+    return None if seconds < 0 else seconds
+
+
+def create_app(settings: Optional[FakeOllamaSettings] = None) -> FastAPI:
+    """Create the fake Ollama FastAPI application."""
+    settings = settings or FakeOllamaSettings()
+    app = FastAPI(title="Fake Ollama")
+    app.state.settings = settings
+    app.state.loaded: Dict[str, Optional[float]] = {}
+    app.state.stats = {"generate": 0, "chat": 0, "loads": 0, "in_flight": 0, "max_in_flight": 0}
+    slots = asyncio.Semaphore(settings.parallel) if settings.parallel > 0 else None
+
+    def check_model(model: str) -> None:
+        if model not in settings.models:
+            raise HTTPException(status_code=404, detail=f"model '{model}' not found")
+
+    async def ensure_loaded(model: str, keep_alive: Any) -> int:
+        """Simulate loading the model; returns the load duration in nanoseconds."""
+        expires = app.state.loaded.get(model, 0.0)
+        start = time.perf_counter()
+        if model not in app.state.loaded or (expires is not None and expires < time.time()):
+            app.state.stats["loads"] += 1
+            await asyncio.sleep(settings.load_delay)
+        ttl = _parse_keep_alive(keep_alive)
+        if ttl == 0:
+            app.state.loaded.pop(model, None)
+        else:
+            app.state.loaded[model] = None if ttl is None else time.time() + ttl
+        return int((time.perf_counter() - start) * 1e9)
+
+    async def generate_tokens(body: Dict[str, Any], prompt_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        """Yield (token, is_last) events with timing, then a final stats event."""
+        if slots is not None:
+            await slots.acquire()
+        stats = app.state.stats
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            start = time.perf_counter()
+            load_ns = await ensure_loaded(body["model"], body.get("keep_alive"))
+            await asyncio.sleep(settings.first_token_delay)
+            prompt_done = time.perf_counter()
+            tokens = settings.response.split(" ")
+            num_predict = (body.get("options") or {}).get("num_predict")
+            if num_predict and num_predict > 0:
+                tokens = tokens[:num_predict]
+            for i, token in enumerate(tokens):
+                if i and settings.tokens_per_second > 0:
+                    await asyncio.sleep(1.0 / settings.tokens_per_second)
+                yield {"token": token if i == 0 else " " + token}
+            end = time.perf_counter()
+            yield {
+                "final": True,
+                "total_duration": int((end - start) * 1e9),
+                "load_duration": load_ns,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((prompt_done - start) * 1e9) - load_ns,
+                "eval_count": len(tokens),
+                "eval_duration": int((end - prompt_done) * 1e9),
+            }
+        finally:
+            stats["in_flight"] -= 1
+            if slots is not None:
+                slots.release()
+
+    async def respond(body: Dict[str, Any], prompt_tokens: int, make_chunk, make_final):
+        stream = body.get("stream", True)
+        events = generate_tokens(body, prompt_tokens)
+        if stream:
+            async def ndjson():
+                async for event in events:
+                    payload = make_final(event) if event.get("final") else make_chunk(event["token"])
+                    yield json.dumps(payload) + "\n"
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+        text = ""
+        final: Dict[str, Any] = {}
+        async for event in events:
+            if event.get("final"):
+                final = make_final(event)
+            else:
+                text += event["token"]
+        return JSONResponse(_with_text(final, text))
+
+    def _with_text(payload: Dict[str, Any], text: str) -> Dict[str, Any]:
+        if "message" in payload:
+            payload["message"]["content"] = text
+        else:
+            payload["response"] = text
+        return payload
+
+    @app.get("/", response_class=PlainTextResponse)
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [
+            {
+                "name": name,
+                "model": name,
+                "modified_at": _now(),
+                "size": 0,
+                "digest": f"fake-{i}",
+                "details": {"format": "gguf", "family": "fake", "parameter_size": "0B", "quantization_level": "Q4_0"},
+            }
+            for i, name in enumerate(settings.models)
+        ]}
+
+    @app.get("/api/ps")
+    async def ps():
+        now = time.time()
+        return {"models": [
+            {"name": name, "model": name, "expires_at": None if expires is None else datetime.fromtimestamp(expires, timezone.utc).isoformat()}
+            for name, expires in app.state.loaded.items()
+            if expires is None or expires > now
+        ]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        check_model(body.get("model", ""))
+        app.state.stats["generate"] += 1
+        prompt = body.get("prompt") or ""
+        if not prompt:
+            # An empty prompt only loads (or, with keep_alive=0, unloads) the model
+            await ensure_loaded(body["model"], body.get("keep_alive"))
+            reason = "unload" if _parse_keep_alive(body.get("keep_alive")) == 0 else "load"
+            return JSONResponse({"model": body["model"], "created_at": _now(), "response": "", "done": True, "done_reason": reason})
+        prompt_tokens = len(prompt.split()) + len(body.get("context") or [])
+
+        def make_chunk(token: str) -> Dict[str, Any]:
+            return {"model": body["model"], "created_at": _now(), "response": token, "done": False}
+
+        def make_final(event: Dict[str, Any]) -> Dict[str, Any]:
+            stats = {k: v for k, v in event.items() if k != "final"}
+            context = list(body.get("context") or []) + list(range(prompt_tokens + stats["eval_count"]))
+            return {"model": body["model"], "created_at": _now(), "response": "", "done": True,
+                    "done_reason": "stop", "context": context, **stats}
+
+        return await respond(body, prompt_tokens, make_chunk, make_final)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        check_model(body.get("model", ""))
+        app.state.stats["chat"] += 1
+        messages: List[Dict[str, Any]] = body.get("messages") or []
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+
+        def make_chunk(token: str) -> Dict[str, Any]:
+            return {"model": body["model"], "created_at": _now(),
+                    "message": {"role": "assistant", "content": token}, "done": False}
+
+        def make_final(event: Dict[str, Any]) -> Dict[str, Any]:
+            stats = {k: v for k, v in event.items() if k != "final"}
+            return {"model": body["model"], "created_at": _now(),
+                    "message": {"role": "assistant", "content": ""}, "done": True,
+                    "done_reason": "stop", **stats}
+
+        return await respond(body, prompt_tokens, make_chunk, make_final)
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeOllamaServer:
+    """Run the fake Ollama server in a background thread.
+
+    Use as a context manager; ``url`` is the base URL to pass as
+    ``ollama_base_url``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = None, **settings):
+        self.host = host
+        self.port = port or _free_port()
+        self.app = create_app(FakeOllamaSettings(**settings))
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Request counters: generate, chat, loads, in_flight, max_in_flight."""
+        return self.app.state.stats
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake Ollama server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server for offline testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma-separated model names")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    parser.add_argument("--load-delay", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=0, help="Concurrent generations (0 = unlimited)")
+    parser.add_argument("--response", default=DEFAULT_RESPONSE, help="Text returned by every generation")
+    args = parser.parse_args()
+
+    settings = FakeOllamaSettings(
+        models=args.models.split(","),
+        response=args.response,
+        tokens_per_second=args.tokens_per_second,
+        first_token_delay=args.first_token_delay,
+        load_delay=args.load_delay,
+        parallel=args.parallel,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
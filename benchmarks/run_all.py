@@ -0,0 +1,53 @@
+"""
+Run the whole benchmark suite and write one JSON report.
+
+Usage:
+    python -m benchmarks.run_all [--quick] [--output results.json] [--only ingestion,ask]
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import (
+    bench_ask, bench_chunking, bench_extraction, bench_ingestion, bench_memory_store, bench_retrieval,
+    bench_startup, bench_vector_index,
+)
+from benchmarks.common import write_results
+
+BENCHMARKS = {
+    # Imports the FastAPI app from a temporary working directory, so it runs
+    # first while the app's settings have not been read yet
+    "ask": bench_ask.run,
+    "ingestion": bench_ingestion.run,
+    "retrieval": bench_retrieval.run,
+    "vector_index": bench_vector_index.run,
+    "memory_store": bench_memory_store.run,
+    "chunking": bench_chunking.run,
+    "extraction": bench_extraction.run,
+    # Runs in fresh interpreters, so its position does not matter
+    "startup": bench_startup.run,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Run reduced sizes (useful in CI)")
+    parser.add_argument("--only", help="Comma-separated list of benchmarks to run")
+    parser.add_argument("--output", help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    output = os.path.abspath(args.output) if args.output else None
+    results = {}
+    for name in selected:
+        print(f"Running {name} benchmark...", file=sys.stderr)
+        results[name] = BENCHMARKS[name](quick=args.quick)
+    print(write_results("suite", results, output))
+
+
+if __name__ == "__main__":
+    main()
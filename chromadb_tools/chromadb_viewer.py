@@ -1,9 +1,11 @@
 import streamlit as st
 import chromadb
 import os
+import sqlite3
+import numpy as np
 import pandas as pd
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 # Set page config
 st.set_page_config(
@@ -19,7 +21,11 @@ This tool allows you to visualize and explore the contents of your ChromaDB vect
 """)
 
 # Path to ChromaDB
-chroma_path = "../chroma_db"
+chroma_path = os.environ.get("CHROMA_PERSIST_DIR", "../chroma_db")
+
+# Counts and pages are cached for this many seconds (use "Refresh" to reload them sooner)
+CACHE_TTL = 60
+PAGE_SIZES = [25, 50, 100, 250, 500]
 
 @st.cache_resource
 def get_client():
@@ -31,97 +37,183 @@ def get_client():
         st.error(f"Error connecting to ChromaDB: {str(e)}")
         return None
 
-def display_collections(client):
-    """Display all collections in the database."""
+def _where(document_id: str) -> Optional[Dict[str, Any]]:
+    return {"document_id": document_id} if document_id else None
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def get_collection_counts() -> Dict[str, int]:
+    """Number of chunks in each collection."""
+    client = get_client()
+    return {collection.name: client.get_collection(collection.name).count() for collection in client.list_collections()}
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def count_matching(collection_name: str, document_id: str) -> int:
+    """Number of chunks of a collection matching the document filter."""
+    collection = get_client().get_collection(collection_name)
+    if not document_id:
+        return collection.count()
+    # IDs only: no documents, metadata or embeddings are read
+    return len(collection.get(where=_where(document_id), include=[])["ids"])
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_page(collection_name: str, offset: int, limit: int, document_id: str,
+               with_embeddings: bool) -> Dict[str, Any]:
+    """One page of a collection, read server-side with offset and limit."""
+    include = ["documents", "metadatas"] + (["embeddings"] if with_embeddings else [])
+    result = get_client().get_collection(collection_name).get(
+        where=_where(document_id), offset=offset, limit=limit, include=include
+    )
+    return {
+        "ids": result["ids"],
+        "documents": result["documents"],
+        "metadatas": result["metadatas"],
+        # Returned as a NumPy array, which st.cache_data can hash and copy
+        "embeddings": np.asarray(result["embeddings"], dtype=np.float32) if with_embeddings else None,
+    }
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def document_chunk_counts(collection_name: str) -> pd.Series:
+    """Number of chunks per document_id in a collection, largest first."""
+    collection = get_client().get_collection(collection_name)
     try:
-        collections = client.list_collections()
-        if not collections:
-            st.warning("No collections found in the database.")
-            return None
-        
-        collection_names = [collection.name for collection in collections]
-        selected_collection_name = st.selectbox("Select a collection", collection_names)
-        
-        if selected_collection_name:
-            return client.get_collection(selected_collection_name)
-        
-        return None
-    except Exception as e:
-        st.error(f"Error listing collections: {str(e)}")
+        # One GROUP BY over Chroma's metadata tables, instead of reading every record
+        connection = sqlite3.connect(f"file:{os.path.join(chroma_path, 'chroma.sqlite3')}?mode=ro", uri=True)
+        try:
+            rows = connection.execute(
+                """
+                SELECT metadata.string_value, COUNT(*)
+                FROM embeddings
+                JOIN segments ON segments.id = embeddings.segment_id
+                LEFT JOIN embedding_metadata AS metadata
+                    ON metadata.id = embeddings.id AND metadata.key = 'document_id'
+                WHERE segments.collection = ?
+                GROUP BY metadata.string_value
+                """,
+                (str(collection.id),)
+            ).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        # Other Chroma versions may store metadata differently: read the metadata page by page
+        counts: Dict[Optional[str], int] = {}
+        batch = get_client().get_max_batch_size()
+        offset = 0
+        while True:
+            page = collection.get(offset=offset, limit=batch, include=["metadatas"])
+            if not page["ids"]:
+                break
+            for metadata in page["metadatas"]:
+                document_id = (metadata or {}).get("document_id")
+                counts[document_id] = counts.get(document_id, 0) + 1
+            offset += len(page["ids"])
+        rows = list(counts.items())
+    counts = pd.Series({(document_id or "(none)"): count for document_id, count in rows}, dtype="int64")
+    return counts.sort_values(ascending=False)
+
+def display_collections(collection_counts: Dict[str, int]) -> Optional[str]:
+    """Let the user select a collection."""
+    if not collection_counts:
+        st.warning("No collections found in the database.")
         return None
+    return st.selectbox(
+        "Select a collection",
+        list(collection_counts),
+        format_func=lambda name: f"{name} ({collection_counts[name]:,} chunks)"
+    )
 
-def display_collection_details(collection):
-    """Display detailed information about a collection."""
+def display_collection_details(collection_name: str):
+    """Display one page of a collection, optionally filtered by document."""
     try:
-        # Get collection metadata
-        count = collection.count()
-        st.subheader(f"Collection: {collection.name}")
-        st.write(f"Total documents: {count}")
-        
-        # Get collection data (limited to 100 to prevent UI overload)
-        limit = min(100, count)
-        if limit == 0:
-            st.warning("Collection is empty.")
+        st.subheader(f"Collection: {collection_name}")
+        filter_col, size_col, page_col = st.columns([3, 1, 1])
+        with filter_col:
+            document_id = st.text_input("Filter by document_id", key=f"filter-{collection_name}").strip()
+        with size_col:
+            page_size = st.selectbox("Page size", PAGE_SIZES, index=PAGE_SIZES.index(100))
+        count = count_matching(collection_name, document_id)
+        pages = max(1, -(-count // page_size))
+        with page_col:
+            # Keyed on the filter and page size, so changing them goes back to the first page
+            page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1,
+                                   key=f"page-{collection_name}-{document_id}-{page_size}")
+        st.write(f"Matching chunks: {count:,}")
+        if count == 0:
+            st.warning("No chunks match." if document_id else "Collection is empty.")
             return
-        
-        result = collection.get(limit=limit)
-        
+
+        offset = (int(page) - 1) * page_size
+        with_embeddings = st.checkbox("Load embeddings for this page")
+        result = fetch_page(collection_name, offset, page_size, document_id, with_embeddings)
+        st.caption(f"Showing chunks {offset + 1:,}-{offset + len(result['ids']):,}")
+
         # Create tabs for different views
         tab1, tab2, tab3 = st.tabs(["Documents", "Metadata", "Embeddings"])
-        
+
         with tab1:
-            if "documents" in result and result["documents"]:
-                documents_df = pd.DataFrame({
-                    "ID": result["ids"],
-                    "Content": result["documents"]
-                })
-                st.dataframe(documents_df, use_container_width=True)
-            else:
-                st.warning("No document content found in this collection.")
-        
+            documents_df = pd.DataFrame({
+                "ID": result["ids"],
+                "document_id": [(metadata or {}).get("document_id") for metadata in result["metadatas"]],
+                "Content": result["documents"]
+            })
+            st.dataframe(documents_df, use_container_width=True)
+
         with tab2:
-            if "metadatas" in result and result["metadatas"]:
-                # Convert metadata dictionaries to strings for display
-                metadata_strings = []
-                for metadata in result["metadatas"]:
-                    if metadata:
-                        metadata_strings.append(json.dumps(metadata, indent=2))
-                    else:
-                        metadata_strings.append("No metadata")
-                
-                metadata_df = pd.DataFrame({
-                    "ID": result["ids"],
-                    "Metadata": metadata_strings
-                })
-                st.dataframe(metadata_df, use_container_width=True)
-            else:
-                st.warning("No metadata found in this collection.")
-        
+            # Convert metadata dictionaries to strings for display
+            metadata_df = pd.DataFrame({
+                "ID": result["ids"],
+                "Metadata": [json.dumps(metadata, indent=2) if metadata else "No metadata"
+                             for metadata in result["metadatas"]]
+            })
+            st.dataframe(metadata_df, use_container_width=True)
+
         with tab3:
-            if "embeddings" in result and result["embeddings"]:
-                # Just show dimensions of embeddings
-                embed_dim = len(result["embeddings"][0])
-                st.write(f"Embedding dimensions: {embed_dim}")
-                
-                # Create a simplified view of embeddings (first few values)
-                embeddings_preview = []
-                for i, embedding in enumerate(result["embeddings"]):
-                    if i >= 10:  # Limit to first 10 embeddings
-                        break
-                    preview = str(embedding[:5]) + "... [truncated]"
-                    embeddings_preview.append(preview)
-                
+            embeddings = result["embeddings"]
+            if embeddings is None:
+                st.info("Tick \"Load embeddings for this page\" to read them.")
+            elif len(embeddings):
+                st.write(f"Embedding dimensions: {embeddings.shape[1]}")
                 embed_df = pd.DataFrame({
-                    "ID": result["ids"][:len(embeddings_preview)],
-                    "Embedding (preview)": embeddings_preview
+                    "ID": result["ids"],
+                    "Norm": np.linalg.norm(embeddings, axis=1),
+                    "Embedding (preview)": [str(np.round(embedding[:5], 4).tolist()) + "... [truncated]"
+                                            for embedding in embeddings]
                 })
                 st.dataframe(embed_df, use_container_width=True)
             else:
                 st.warning("No embeddings found in this collection.")
-    
+
     except Exception as e:
         st.error(f"Error displaying collection details: {str(e)}")
 
+def display_chunk_histogram(collection_name: str):
+    """Show how the chunks of a collection are spread over its documents."""
+    st.subheader("Chunks per document")
+    if not st.checkbox("Compute chunks per document", key=f"histogram-{collection_name}"):
+        return
+    try:
+        counts = document_chunk_counts(collection_name)
+        if counts.empty:
+            st.warning("Collection is empty.")
+            return
+        stats = st.columns(4)
+        stats[0].metric("Documents", f"{len(counts):,}")
+        stats[1].metric("Median chunks", f"{counts.median():,.0f}")
+        stats[2].metric("Mean chunks", f"{counts.mean():,.1f}")
+        stats[3].metric("Max chunks", f"{counts.max():,}")
+
+        # Distribution of chunk counts, in up to 30 buckets
+        frequencies, edges = np.histogram(counts.to_numpy(), bins=min(30, max(1, counts.nunique())))
+        distribution = pd.DataFrame({
+            "Chunks": [f"{int(low):,}-{int(high):,}" for low, high in zip(edges[:-1], edges[1:])],
+            "Documents": frequencies
+        }).set_index("Chunks")
+        st.bar_chart(distribution)
+
+        st.write("Largest documents")
+        st.dataframe(counts.head(50).rename_axis("document_id").reset_index(name="Chunks"), use_container_width=True)
+    except Exception as e:
+        st.error(f"Error counting chunks per document: {str(e)}")
+
 def search_collection(collection):
     """Allow users to search the collection."""
     if not collection:
@@ -173,31 +265,36 @@ def main():
     client = get_client()
     if not client:
         return
-    
+
     # Side by side layout
     col1, col2 = st.columns([1, 3])
-    
+
     with col1:
         st.subheader("Database Information")
-        # Display basic database info
+        # Display basic database info (counts are cached, not recomputed on every rerun)
         try:
-            collections = client.list_collections()
-            st.write(f"Total collections: {len(collections)}")
+            if st.button("Refresh"):
+                st.cache_data.clear()
+            collection_counts = get_collection_counts()
+            st.write(f"Total collections: {len(collection_counts)}")
             st.write("Collections:")
-            for collection in collections:
-                st.write(f"- {collection.name} ({collection.count()} documents)")
+            for name, count in collection_counts.items():
+                st.write(f"- {name} ({count:,} chunks)")
         except Exception as e:
             st.error(f"Error getting database info: {str(e)}")
-    
+            return
+
     with col2:
         # Display collections and allow user to select one
-        collection = display_collections(client)
-        if collection:
+        collection_name = display_collections(collection_counts)
+        if collection_name:
             # Display collection details
-            display_collection_details(collection)
-            
+            display_collection_details(collection_name)
+
+            display_chunk_histogram(collection_name)
+
             # Add search functionality
-            search_collection(collection)
+            search_collection(client.get_collection(collection_name))
 
 if __name__ == "__main__":
     main()
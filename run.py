@@ -1,14 +1,69 @@
 """
 Entry point for the Document QA Agent application.
+
+Usage:
+    python run.py                      # single worker
+    python run.py --workers 4          # four worker processes behind one port
+    python run.py --workers auto       # one worker per CPU core
 """
-import uvicorn
-import sys
+import argparse
+import logging
 import os
+import sys
+
+import uvicorn
+
+from app.utils.config import get_app_config, setup_logging
+
+logger = logging.getLogger(__name__)
+
+def resolve_workers(value) -> int:
+    """Convert a workers setting ("auto" or a number) to a worker count."""
+    if str(value).lower() == "auto":
+        return os.cpu_count() or 1
+    workers = int(value)
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    return workers
+
+def check_workers(workers: int, config) -> None:
+    """
+    Refuse several workers when they cannot share one vector index.
+
+    An embedded Chroma instance does not see vectors added by other
+    processes until it is reopened, so unscoped searches in the other workers
+    would miss newly uploaded documents. The local backend re-reads its index
+    when another process changes it, and a Chroma server is shared by design.
+
+    Raises:
+        ValueError: If workers > 1 with embedded Chroma
+    """
+    if workers > 1 and config["vector_backend"] == "chroma" and not config["chroma_server_host"]:
+        raise ValueError(
+            f"{workers} workers need a shared vector index: set chroma_server_host to use a Chroma server, "
+            "or vector_backend to \"local\""
+        )
 
 if __name__ == "__main__":
     # Set console encoding to UTF-8 for proper display of Arabic text
     # if sys.platform == 'win32':
         # Set Windows console to UTF-8 mode
         # os.system('chcp 65001')
-        
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False)
+
+    app_config = get_app_config()
+    parser = argparse.ArgumentParser(description="Run the Document QA Agent server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", default=app_config["workers"],
+                        help='Number of worker processes, or "auto" for one per CPU core')
+    args = parser.parse_args()
+
+    setup_logging()
+    workers = resolve_workers(args.workers)
+    try:
+        check_workers(workers, app_config)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers, reload=False)
@@ -25,7 +25,7 @@ setup(
         "langchain-core>=0.1.10",
         "langchain-chroma>=0.0.1",
         "langchain-huggingface>=0.0.1",
-        "langchain-ollama>=0.0.1",
+        "langchain-ollama>=0.2.0,<0.4",
         "fastapi>=0.100.0",
         "uvicorn>=0.23.0",
         "python-multipart>=0.0.6",
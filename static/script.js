@@ -255,7 +255,7 @@ askButton.addEventListener('click', async () => {
         const responseDirection = result.direction || 'ltr';
         
         // Add bot response to chat with correct direction
-        addMessage(result.answer, 'bot', result.sources, responseDirection);
+        addMessage(result.answer, 'bot', result.sources, responseDirection, result.reasoning);
         
     } catch (error) {
         // Remove loading message
@@ -289,7 +289,7 @@ function applyTextDirection(element, text) {
 }
 
 // Add a message to the chat
-function addMessage(text, sender, sources = [], direction = null) {
+function addMessage(text, sender, sources = [], direction = null, reasoning = null) {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${sender}-message`;
     
@@ -306,9 +306,9 @@ function addMessage(text, sender, sources = [], direction = null) {
     const thinkRegex = /<think>([\s\S]*?)<\/think>/g;
     let hasThinkContent = thinkRegex.test(text);
     let displayText = text;
-    let thinkContent = '';
+    let thinkContent = reasoning ? reasoning.trim() : '';
     
-    if (hasThinkContent) {
+    if (hasThinkContent && !thinkContent) {
         // Reset regex state after the test above
         thinkRegex.lastIndex = 0;
         
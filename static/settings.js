@@ -26,15 +26,24 @@ document.addEventListener('DOMContentLoaded', function() {
         temperatureValue.textContent = this.value;
     });
     
+    // Fetch available models once and share the result between the form and system info
+    let modelsRequest = null;
+    function fetchModels(refresh = false) {
+        if (!modelsRequest || refresh) {
+            modelsRequest = fetch('/api/models')
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Failed to load models');
+                    }
+                    return response.json();
+                });
+        }
+        return modelsRequest;
+    }
+    
     // Load available models and populate select  
     function loadModels() {
-        return fetch('/api/models')
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Failed to load models');
-                }
-                return response.json();
-            })
+        return fetchModels()
             .then(data => {
                 const select = document.getElementById('ollama_model');
                 select.innerHTML = ''; // Clear existing options
@@ -70,19 +79,16 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Load current settings
     function loadSettings() {
-        // First load available models
-        return loadModels()
-            .then(() => {
-                // Then fetch current config
-                return fetch('/api/config');
-            })
+        // Load available models and current config in parallel
+        const configRequest = fetch('/api/config')
             .then(response => {
                 if (!response.ok) {
                     throw new Error('Failed to load settings');
                 }
                 return response.json();
-            })
-            .then(data => {
+            });
+        return Promise.all([configRequest, loadModels()])
+            .then(([data]) => {
                 // Fill form with current settings
                 document.getElementById('ollama_base_url').value = data.ollama_base_url || defaultSettings.ollama_base_url;
                 document.getElementById('ollama_model').value = data.ollama_model || defaultSettings.ollama_model;
@@ -126,8 +132,8 @@ document.addEventListener('DOMContentLoaded', function() {
         })
         .then(data => {
             showStatusMessage('Settings saved successfully', 'success');
-            // Reload system info
-            loadSystemInfo();
+            // Reload system info (the Ollama URL may have changed)
+            loadSystemInfo(true);
         })
         .catch(error => {
             console.error('Error saving settings:', error);
@@ -161,7 +167,19 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Load system information
-    function loadSystemInfo() {
+    function loadSystemInfo(refreshModels = false) {
+        // Show available models independently so a slow Ollama does not delay the rest
+        fetchModels(refreshModels)
+            .then(data => {
+                if (data.models) {
+                    availableModels.textContent = data.models.join(', ');
+                }
+            })
+            .catch(error => {
+                console.error('Error loading models:', error);
+                availableModels.textContent = 'N/A';
+            });
+        
         // Check server status
         fetch('/api/health')
             .then(response => {
@@ -188,16 +206,6 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (data.document_count !== undefined) {
                     dbSize.textContent = `${data.document_count} documents, ${formatBytes(data.storage_size || 0)}`;
                 }
-                
-            // Get available models
-                return fetch('/api/models');
-            })
-            .then(response => response.json())
-            .then(data => {
-                // Update available models list
-                if (data.models) {
-                    availableModels.textContent = data.models.join(', ');
-                }
             })
             .catch(error => {
                 console.error('Error loading system info:', error);
@@ -206,7 +214,6 @@ document.addEventListener('DOMContentLoaded', function() {
                     serverStatus.classList.add('offline');
                     connectedModel.textContent = 'N/A';
                     dbSize.textContent = 'N/A';
-                    availableModels.textContent = 'N/A';
                 }
             });
     }
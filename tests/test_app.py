@@ -19,5 +19,41 @@ def test_index_html():
     response = client.get("/")
     assert response.status_code == 200
     assert "Document QA Agent" in response.text
+
+def test_search_pages_only_results_above_min_score(monkeypatch):
+    """Test that min_score is applied before paging, so has_more never announces an empty page."""
+    from langchain_core.documents import Document
+
+    class Store:
+        def search_many(self, queries, document_ids, k, filters):
+            # The last hit is demoted boilerplate: scores do not fall with rank
+            distances = [0.1, 0.2, 0.9, 0.3, 0.95, 0.15][:k]
+            return [[(Document(id=f"c{i}", page_content="text"), d) for i, d in enumerate(distances)]]
+
+        def relevance_score_fn(self):
+            return lambda distance: 1 - distance
+
+    async def get_store():
+        return Store()
+
+    monkeypatch.setattr("app.api.search_routes.get_document_store_async", get_store)
+    first = client.post("/api/search", json={"query": "q", "top_k": 2, "min_score": 0.5}).json()["results"][0]
+    assert [match["id"] for match in first["results"]] == ["c0", "c1"] and first["has_more"]
+    second = client.post("/api/search", json={"query": "q", "top_k": 2, "offset": 2, "min_score": 0.5}).json()
+    second = second["results"][0]
+    assert [(match["id"], match["rank"]) for match in second["results"]] == [("c3", 3), ("c5", 4)]
+    assert not second["has_more"]
+    unfiltered = client.post("/api/search", json={"query": "q", "top_k": 2, "offset": 2}).json()["results"][0]
+    assert [match["id"] for match in unfiltered["results"]] == ["c2", "c3"] and unfiltered["has_more"]
+
+def test_several_workers_need_a_shared_index():
+    """Test that run.py refuses several workers over embedded Chroma."""
+    from run import check_workers
+    config = {"vector_backend": "chroma", "chroma_server_host": ""}
+    check_workers(1, config)
+    with pytest.raises(ValueError):
+        check_workers(2, config)
+    check_workers(2, dict(config, chroma_server_host="chroma.internal"))
+    check_workers(2, dict(config, vector_backend="local"))
     
 # Add more tests as needed
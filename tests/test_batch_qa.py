@@ -0,0 +1,57 @@
+"""
+Tests for the batch question answering stream.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from app.api import qa_routes
+from app.core.scheduler import LLMScheduler, set_scheduler
+
+
+class _RecordingLLM:
+    """Returns canned answers and records how many calls ran at once."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, config=None):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        if "Question: broken" in prompt:
+            raise RuntimeError("generation failed")
+        return "<think>reading</think>Answer to " + prompt.rsplit("Question: ", 1)[1].split("\n")[0]
+
+
+def test_stream_batch_answers_every_question_within_the_llm_limit(monkeypatch):
+    """Test that all questions are answered as NDJSON lines, with failures reported per question."""
+    monkeypatch.setattr(qa_routes, "get_app_config", lambda: {"llm_max_in_flight": 2})
+    set_scheduler(LLMScheduler(max_in_flight=2, max_queue=2, queue_timeout=5))
+    llm = _RecordingLLM()
+    questions = [f"q{i}" for i in range(9)] + ["broken"]
+    documents = [[Document(page_content="Context.", metadata={"file_name": "a.txt"})]] * len(questions)
+
+    async def collect():
+        return [json.loads(line) async for line in qa_routes._stream_batch(llm, questions, documents)]
+
+    try:
+        lines = asyncio.run(collect())
+    finally:
+        set_scheduler(None)
+
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == list(range(len(questions)))
+    assert by_index[3]["answer"].endswith("Answer to q3")
+    assert by_index[3]["reasoning"] == "reading"
+    assert by_index[3]["sources"][0]["metadata"]["file_name"] == "a.txt"
+    assert by_index[9]["error"] == "generation failed"
+    assert llm.max_running <= 2
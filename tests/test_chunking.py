@@ -0,0 +1,66 @@
+"""
+Tests for the chunking module.
+"""
+import pytest
+from langchain_core.documents import Document
+from app.core.chunking import (
+    approximate_token_count,
+    get_chunking_profile,
+    split_documents,
+    CHUNKING_STRATEGIES,
+)
+
+CONFIG = {"chunk_size": 40, "chunk_overlap": 0, "chunk_length_unit": "tokens"}
+
+
+def test_arabic_counts_more_tokens_per_character():
+    """Test that Arabic text is estimated at more tokens per character than English."""
+    english = "The delivery schedule was approved by the review committee."
+    arabic = "تمت الموافقة على جدول التسليم من قبل لجنة المراجعة."
+    assert approximate_token_count(arabic) / len(arabic) > approximate_token_count(english) / len(english)
+
+
+def test_chunks_respect_token_size():
+    """Test that chunks stay within the configured token budget."""
+    text = " ".join(f"Sentence number {i} talks about invoices and payments." for i in range(50))
+    profile = get_chunking_profile("txt", CONFIG)
+    chunks = split_documents([Document(page_content=text)], profile=profile)
+    assert len(chunks) > 1
+    assert all(approximate_token_count(c.page_content) <= 40 for c in chunks)
+    assert all("start_index" in c.metadata for c in chunks)
+
+
+def test_arabic_sentences_are_kept_whole():
+    """Test that Arabic sentences ending with the Arabic question mark are not cut."""
+    sentences = ["كيف يمكنني رفع المستندات الخاصة بي؟", "اختر المستندات التي ترغب في البحث فيها."] * 10
+    profile = get_chunking_profile("txt", CONFIG)
+    chunks = split_documents([Document(page_content=" ".join(sentences))], profile=profile)
+    for chunk in chunks:
+        assert chunk.page_content.strip().endswith(("؟", "."))
+
+
+def test_profile_override_for_file_type():
+    """Test that per-type profiles override the global chunk settings."""
+    config = dict(CONFIG, chunking_profiles={"pdf": {"chunk_size": 120, "strategy": "fixed"}})
+    assert get_chunking_profile("pdf", config)["chunk_size"] == 120
+    assert get_chunking_profile("pdf", config)["strategy"] in CHUNKING_STRATEGIES
+    assert get_chunking_profile("txt", config)["chunk_size"] == 40
+
+
+def test_overlap_must_be_smaller_than_size():
+    """Test that invalid overlap settings are rejected."""
+    with pytest.raises(ValueError):
+        get_chunking_profile("txt", {"chunk_size": 10, "chunk_overlap": 10})
+
+
+@pytest.mark.parametrize("strategy", ["recursive", "fixed"])
+def test_start_index_points_at_the_chunk(strategy):
+    """Test that start_index is the character offset of each chunk, with token-sized overlap."""
+    text = " ".join(f"Sentence number {i} talks about invoices and payments." for i in range(300))
+    profile = get_chunking_profile("pdf", {"chunk_size": 200, "chunk_overlap": 20, "chunk_strategy": strategy})
+    chunks = split_documents([Document(page_content=text, metadata={"page": 0})], profile=profile)
+    assert len(chunks) > 10
+    starts = [c.metadata["start_index"] for c in chunks]
+    assert starts == sorted(starts) and all(c.metadata["page"] == 0 for c in chunks)
+    for chunk, start in zip(chunks, starts):
+        assert text[start:start + len(chunk.page_content)] == chunk.page_content
@@ -0,0 +1,36 @@
+"""
+Tests for the follow-up question condensing policy.
+"""
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.core import condense
+from app.core.condense import RewriteCache, condense_question, is_self_contained
+
+HISTORY = [HumanMessage(content="What is the notice period?"), AIMessage(content="Thirty days.")]
+
+
+def test_is_self_contained_detects_references_to_the_conversation():
+    """Test that questions referring back to earlier turns are rewritten."""
+    assert is_self_contained("What is the refund policy for damaged items?")
+    assert not is_self_contained("Why?")
+    assert not is_self_contained("What about the second contract?")
+    assert not is_self_contained("Does it apply to part-time employees?")
+    assert is_self_contained("ما هي سياسة الاسترجاع للمنتجات التالفة؟")
+    assert not is_self_contained("هل يمكن تمديد هذه الفترة لاحقا؟")
+
+
+def test_condense_question_skips_and_caches_rewrites(monkeypatch):
+    """Test that first turns and standalone questions skip the LLM and rewrites are cached."""
+    monkeypatch.setattr(condense, "get_app_config", lambda: {"ollama_model": "m", "condense_mode": "auto"})
+    monkeypatch.setattr(condense, "_rewrite_cache", RewriteCache())
+    llm = FakeListLLM(responses=["<think>The user means the notice period.</think>Can the notice period be extended?"])
+
+    assert condense_question("Can it be extended?", [], llm) == ("Can it be extended?", "first_turn")
+    question = "What is the refund policy for damaged items?"
+    assert condense_question(question, HISTORY, llm) == (question, "self_contained")
+
+    rewritten = ("Can the notice period be extended?", "rewritten")
+    assert condense_question("Can it be extended?", HISTORY, llm) == rewritten
+    # FakeListLLM has no responses left: a second LLM call would fail
+    assert condense_question("Can it be extended?", HISTORY, llm) == ("Can the notice period be extended?", "cached")
@@ -0,0 +1,101 @@
+"""
+Tests for the export and import of pre-embedded corpora.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+import app.core.document_store as document_store_module
+from app.core.corpus import export_corpus, import_corpus
+from app.core.maintenance import check_index
+from benchmarks.common import HashingEmbeddings
+
+
+class QueryOnlyEmbeddings(HashingEmbeddings):
+    """Embeddings that fail when asked to embed chunks."""
+
+    # Same model as the exported stores
+    model_name = "HashingEmbeddings"
+
+    def embed_documents(self, texts):
+        raise AssertionError("Chunks must not be embedded again")
+
+
+def _hits(store, query="refund policy 5", document_ids=None):
+    """Best chunk and all distances (chunks at equal distances may come in any order)."""
+    hits = store.search_many([query], document_ids, k=4)[0]
+    return (hits[0][0].id, hits[0][0].page_content), [round(distance, 4) for _, distance in hits]
+
+
+@pytest.mark.parametrize("source_backend,target_backend", [("local", "chroma"), ("chroma", "local")])
+def test_import_reproduces_the_exported_store_without_embedding(monkeypatch, source_backend, target_backend):
+    """Test that an imported corpus answers searches like its source, across backends."""
+    monkeypatch.setitem(document_store_module.app_config, "exact_search_max_chunks", 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setitem(document_store_module.app_config, "vector_backend", source_backend)
+        source = document_store_module.DocumentStore(
+            persist_directory=os.path.join(temp_dir, "source"), embeddings=HashingEmbeddings()
+        )
+        for i in range(8):
+            source._index_documents(
+                f"doc-{i}", f"{i}.txt", "txt",
+                [Document(page_content=f"Section {i} of the refund policy {i}. " * 30)],
+                group="contracts" if i % 2 else None,
+            )
+        source.delete_document("doc-3")
+
+        export_dir = os.path.join(temp_dir, "export")
+        exported = export_corpus(source, export_dir)
+        assert exported["documents"] == 7 and exported["chunks"] == sum(
+            metadata["chunk_count"] for metadata in source.list_documents().values()
+        )
+        with pytest.raises(FileExistsError):
+            export_corpus(source, export_dir)
+
+        monkeypatch.setitem(document_store_module.app_config, "vector_backend", target_backend)
+        target = document_store_module.DocumentStore(
+            persist_directory=os.path.join(temp_dir, "target"), embeddings=QueryOnlyEmbeddings()
+        )
+        imported = import_corpus(target, export_dir)
+        assert imported["documents"] == 7 and imported["chunks"] == exported["chunks"]
+        assert target.list_documents() == source.list_documents()
+        assert check_index(target)["consistent"]
+        assert _hits(target) == _hits(source)
+        assert _hits(target, document_ids=["doc-5"]) == _hits(source, document_ids=["doc-5"])
+
+        # Documents already in the store are skipped
+        again = import_corpus(target, export_dir)
+        assert again["documents"] == 0 and len(again["skipped_documents"]) == 7
+        assert check_index(target)["consistent"]
+
+
+def test_partial_float16_export_and_model_check(monkeypatch):
+    """Test exporting some documents as float16, and refusing vectors of another model."""
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", "local")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = document_store_module.DocumentStore(
+            persist_directory=os.path.join(temp_dir, "source"), embeddings=HashingEmbeddings()
+        )
+        for i in range(3):
+            source._index_documents(f"doc-{i}", f"{i}.txt", "txt", [Document(page_content=f"Clause {i}. " * 50)])
+        with pytest.raises(ValueError):
+            export_corpus(source, os.path.join(temp_dir, "unknown"), ["doc-9"])
+
+        export_dir = os.path.join(temp_dir, "export")
+        exported = export_corpus(source, export_dir, ["doc-1"], vector_dtype="float16")
+        vectors = np.load(os.path.join(export_dir, "vectors.npy"))
+        assert vectors.dtype == np.float16 and vectors.shape == (exported["chunks"], 384)
+
+        target = document_store_module.DocumentStore(
+            persist_directory=os.path.join(temp_dir, "target"), embeddings=QueryOnlyEmbeddings()
+        )
+        target.embeddings.model_name = "another-model"
+        with pytest.raises(ValueError):
+            import_corpus(target, export_dir)
+        assert import_corpus(target, export_dir, force=True)["documents"] == 1
+        assert list(target.list_documents()) == ["doc-1"]
+        # float16 vectors give slightly different distances, but the same best chunk
+        assert _hits(target, "Clause 1")[0] == _hits(source, "Clause 1", ["doc-1"])[0]
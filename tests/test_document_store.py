@@ -18,3 +18,72 @@ def test_document_store_initialization(document_store):
     assert document_store.db is not None
     
 # Add more tests for document_store methods
+
+def test_search_many_matches_single_searches():
+    """Test that batched retrieval returns the same chunks as one search per query."""
+    from langchain_core.documents import Document
+    from benchmarks.common import HashingEmbeddings
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        pages = [Document(page_content=text) for text in (
+            "The warranty covers parts for two years.",
+            "Invoices are paid within thirty days.",
+            "Support is available on weekdays.",
+        )]
+        store._index_documents("doc-1", "terms.txt", "txt", pages)
+        store._index_documents("doc-2", "other.txt", "txt", [Document(page_content="The warranty is void.")])
+
+        queries = ["warranty parts", "invoices paid"]
+        batched = store.search_many(queries, document_ids=["doc-1"], k=2)
+        assert len(batched) == 2
+        for query, hits in zip(queries, batched):
+            single = store.db.similarity_search_with_score(query, k=2, filter={"document_id": {"$in": ["doc-1"]}})
+            assert hits[0][0].page_content == single[0][0].page_content
+            assert [round(distance, 4) for _, distance in hits] == [round(distance, 4) for _, distance in single]
+            assert all(doc.metadata["document_id"] == "doc-1" for doc, _ in hits)
+        assert "warranty" in batched[0][0][0].page_content
+
+def test_search_many_applies_metadata_filters():
+    """Test that metadata filters combine with document IDs and invalid filters raise ValueError."""
+    from langchain_core.documents import Document
+    from benchmarks.common import HashingEmbeddings
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        store._index_documents("doc-1", "a.txt", "txt", [Document(page_content="Refunds take a week.")])
+        store._index_documents("doc-2", "b.txt", "txt", [Document(page_content="Refunds take a month.")])
+
+        hits = store.search_many(["refunds"], filters={"file_name": "b.txt"}, k=5)[0]
+        assert [doc.metadata["document_id"] for doc, _ in hits] == ["doc-2"]
+        assert hits[0][0].id
+        assert store.search_many(["refunds"], document_ids=["doc-1"], filters={"file_name": "b.txt"}) == [[]]
+        with pytest.raises(ValueError):
+            store.search_many(["refunds"], filters={"$bogus": 1})
+
+
+def test_search_routes_small_scopes_to_exact_search_and_groups_to_their_collection():
+    """Test that exact search agrees with Chroma and that grouped documents are found in their collection."""
+    from langchain_core.documents import Document
+    from benchmarks.common import HashingEmbeddings
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        texts = [f"Section {i} covers topic {i % 7} and clause {i % 5}." for i in range(60)]
+        store._index_documents("doc-1", "a.txt", "txt", [Document(page_content=text) for text in texts])
+        store._index_documents("doc-2", "b.txt", "txt", [Document(page_content="Grouped refund terms.")], group="tenant-a")
+        assert store.state.get_document("doc-2")["collection"] == "group-tenant-a"
+
+        query = "topic 3 clause 2"
+        store.exact_search_max_chunks = 0
+        approximate = store.search_many([query], ["doc-1"], k=5)[0]
+        store.exact_search_max_chunks = 1000
+        exact = store.search_many([query], ["doc-1"], k=5)[0]
+        assert [round(distance, 4) for _, distance in exact] == [round(distance, 4) for _, distance in approximate]
+        assert store.vector_cache.get("doc-1") is not None
+
+        # Unscoped searches cover every collection
+        hits = store.search_many(["grouped refund terms"], k=1)[0]
+        assert hits[0][0].metadata["document_id"] == "doc-2"
+        assert store.delete_document("doc-2")
+        assert store.search_many(["grouped refund terms"], ["doc-2"], k=1) == [[]]
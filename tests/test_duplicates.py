@@ -0,0 +1,126 @@
+"""
+Tests for duplicate chunk analysis and the ingestion-time boilerplate filter.
+"""
+import tempfile
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+import app.core.document_store as document_store_module
+from app.core.boilerplate import fingerprint, strip_repeated_lines
+from app.core.duplicates import _exact_edges, _lsh_edges, connected_components, find_duplicates
+from benchmarks.common import HashingEmbeddings
+
+DISCLAIMER = ("This document is confidential and intended solely for the addressee. "
+              "Any review, retransmission or other use by other persons is prohibited.")
+
+
+NAMES = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+
+def _pages(i):
+    # Names rather than numbers tell the documents apart (fingerprints ignore digits)
+    return [
+        Document(page_content=f"ACME Corp annual report\nWarranty claim {NAMES[i]} was approved after review.\nPage 1 of 3"),
+        Document(page_content=f"ACME Corp annual report\nRefunds for order {NAMES[i]} take ten days.\nPage 2 of 3"),
+        Document(page_content=f"ACME Corp annual report\n{DISCLAIMER}\nPage 3 of 3"),
+    ]
+
+
+def _store(monkeypatch, temp_dir, mode, min_documents=3):
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", "local")
+    monkeypatch.setitem(document_store_module.app_config, "boilerplate_filter", mode)
+    monkeypatch.setitem(document_store_module.app_config, "boilerplate_min_documents", min_documents)
+    monkeypatch.setitem(document_store_module.app_config, "chunk_size", 40)
+    return document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+
+
+def _texts(store, document_id):
+    meta = store.state.get_document(document_id)
+    return store._get_collection(meta["collection"]).get_document(document_id).texts
+
+
+def test_strip_repeated_lines_removes_headers_and_footers():
+    """Test that lines repeated on most pages are removed, including numbered footers."""
+    pages, removed = strip_repeated_lines(_pages(1))
+    assert removed == 6
+    assert "ACME" not in pages[0].page_content and "Page" not in pages[0].page_content
+    assert pages[0].page_content == "Warranty claim bravo was approved after review."
+    assert strip_repeated_lines(_pages(1)[:2])[1] == 0
+
+
+def test_drop_mode_skips_boilerplate_seen_in_other_documents(monkeypatch):
+    """Test that a chunk repeated across documents stops being embedded once it is common."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(monkeypatch, temp_dir, "drop")
+        for i in range(4):
+            store._index_documents(f"doc-{i}", f"{i}.pdf", "pdf", _pages(i))
+        assert all("ACME" not in text for text in _texts(store, "doc-0"))
+        # The first documents keep the disclaimer; from the third on it is boilerplate
+        assert any("confidential" in text for text in _texts(store, "doc-1"))
+        assert not any("confidential" in text for text in _texts(store, "doc-2"))
+        assert store.state.get_document("doc-3")["boilerplate_chunks"] > 0
+        assert store.state.get_document("doc-3")["chunk_count"] == len(_texts(store, "doc-3"))
+
+        # Deleted documents no longer count
+        for i in range(4):
+            store.delete_document(f"doc-{i}")
+        store._index_documents("doc-4", "4.pdf", "pdf", _pages(4))
+        assert any("confidential" in text for text in _texts(store, "doc-4"))
+
+
+def test_demote_mode_ranks_boilerplate_last(monkeypatch):
+    """Test that demoted boilerplate is kept but only fills the results when nothing else does."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(monkeypatch, temp_dir, "demote", min_documents=2)
+        for i in range(3):
+            store._index_documents(f"doc-{i}", f"{i}.pdf", "pdf", _pages(i))
+        hits = store.search_many(["confidential addressee prohibited"], ["doc-2"], k=3)[0]
+        assert len(hits) == 3
+        assert not hits[0][0].metadata.get("boilerplate")
+        assert hits[-1][0].metadata.get("boilerplate") and "confidential" in hits[-1][0].page_content
+        # Without boilerplate in scope the results are the usual ones
+        assert not store.search_many(["confidential"], ["doc-0"], k=3)[0][0][0].metadata.get("boilerplate")
+
+
+def test_exact_and_lsh_find_the_same_near_duplicate_clusters():
+    """Test both comparison methods on vectors with planted near-duplicate groups."""
+    rng = np.random.default_rng(1)
+    bases = rng.standard_normal((20, 64)).astype(np.float32)
+    groups = np.repeat(np.arange(20), 5)
+    vectors = bases[groups] + 0.05 * rng.standard_normal((100, 64)).astype(np.float32)
+    vectors = np.concatenate([vectors, rng.standard_normal((300, 64)).astype(np.float32)])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    for edges in (_exact_edges, _lsh_edges):
+        labels = connected_components(len(vectors), *edges(vectors, 0.95))
+        assert len(np.unique(labels[:100])) == 20
+        assert all(len(np.unique(labels[:100][groups == group])) == 1 for group in range(20))
+        assert len(np.unique(labels[100:])) == 300
+
+
+def test_duplicate_report_and_registration(monkeypatch):
+    """Test the duplicate report, and that registered boilerplate is filtered in new documents."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Filtering on, but with a document threshold never reached: only headers and footers are removed
+        store = _store(monkeypatch, temp_dir, "drop", min_documents=100)
+        for i in range(4):
+            store._index_documents(f"doc-{i}", f"{i}.pdf", "pdf", _pages(i))
+        with pytest.raises(ValueError):
+            find_duplicates(store, method="minhash")
+
+        report = find_duplicates(store, min_documents=3, register=True)
+        collection = report["collections"]["langchain"]
+        assert collection["method"] == "exact" and collection["boilerplate_clusters"] >= 1
+        top = collection["top_clusters"][0]
+        assert top["documents"] == 4 and top["chunks"] >= 4
+        assert report["registered_fingerprints"] >= 1
+        lsh_report = find_duplicates(store, min_documents=3, method="lsh", register=True)
+        assert lsh_report["collections"]["langchain"]["top_clusters"][0] == top
+        assert lsh_report["registered_fingerprints"] == 0
+
+        # The registered texts are boilerplate from now on
+        store._index_documents("doc-new", "new.pdf", "pdf", _pages(9))
+        assert store.state.get_document("doc-new")["boilerplate_chunks"] > 0
+        assert fingerprint("Page 1 of 3") == fingerprint("page 2 of 30")
@@ -0,0 +1,89 @@
+"""
+Tests for the text extractor registry.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+import app.core.document_store as document_store_module
+from app.core.extractors import (
+    DEFAULT_EXTRACTORS,
+    EXTRACTOR_FILE_TYPES,
+    EXTRACTORS,
+    extract_document,
+    get_extractor_name,
+    register_extractor,
+    supported_file_types,
+)
+from benchmarks.common import HashingEmbeddings, make_pages, write_docx, write_pdf
+
+
+def test_parallel_pdf_extraction_matches_pypdf():
+    """Test that extracting the pages of a PDF in worker processes gives the same pages in order."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pages = make_pages(12, words_per_page=80, arabic_ratio=0)
+        path = write_pdf(os.path.join(temp_dir, "report.pdf"), pages)
+        expected = extract_document(path, "pdf", {}, "pypdf")
+        config = {"extract_workers": 2, "extract_parallel_min_pages": 4}
+        for extracted in (extract_document(path, "pdf", config, "pypdf-parallel"),
+                          extract_document(path, "pdf", {"extract_parallel_min_pages": 100}, "pypdf-parallel")):
+            assert [page.page_content for page in extracted] == [page.page_content for page in expected]
+            assert [page.metadata["page"] for page in extracted] == list(range(12))
+        assert " ".join(expected[3].page_content.split()) == pages[3]
+
+
+def test_html_markdown_and_docx_extraction():
+    """Test the standard-library extractors."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        html_path = os.path.join(temp_dir, "page.html")
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write("<html><head><title>Refund  policy</title><style>p {color: red}</style></head>"
+                    "<body><h1>Refunds</h1><p>Refunds take <b>ten</b> days &amp; need a receipt.</p>"
+                    "<script>var hidden = 1;</script><ul><li>One</li><li>Two</li></ul></body></html>")
+        [page] = extract_document(html_path, "html", {})
+        assert page.page_content == "Refunds\nRefunds take ten days & need a receipt.\nOne\nTwo"
+        assert page.metadata["title"] == "Refund policy"
+
+        markdown_path = os.path.join(temp_dir, "notes.md")
+        with open(markdown_path, "w", encoding="utf-8") as f:
+            f.write("# Notes\n\nسياسة الاسترداد")
+        assert extract_document(markdown_path, "md", {})[0].page_content == "# Notes\n\nسياسة الاسترداد"
+
+        docx_path = write_docx(os.path.join(temp_dir, "contract.docx"), ["Clause <1>", "", "Payment & delivery"])
+        assert extract_document(docx_path, "docx", {})[0].page_content == "Clause <1>\n\nPayment & delivery"
+
+
+def test_extractor_selection(monkeypatch):
+    """Test the per-type extractor setting and its errors, and registering a new file type."""
+    assert get_extractor_name("PDF", {}) == "pypdf"
+    assert get_extractor_name("pdf", {"extractors": {"pdf": "pypdf-parallel"}}) == "pypdf-parallel"
+    with pytest.raises(ValueError):
+        get_extractor_name("exe", {})
+    with pytest.raises(ValueError):
+        get_extractor_name("pdf", {"extractors": {"pdf": "tesseract"}})
+    with pytest.raises(ValueError):
+        get_extractor_name("pdf", {"extractors": {"pdf": "html"}})
+
+    monkeypatch.setattr("app.core.extractors.DEFAULT_EXTRACTORS", dict(DEFAULT_EXTRACTORS))
+    monkeypatch.setattr("app.core.extractors.EXTRACTORS", dict(EXTRACTORS))
+    monkeypatch.setattr("app.core.extractors.EXTRACTOR_FILE_TYPES", dict(EXTRACTOR_FILE_TYPES))
+    assert "csv" not in supported_file_types()
+    register_extractor("csv", ("csv",))(lambda file_path, config: [])
+    assert "csv" in supported_file_types() and get_extractor_name("csv", {}) == "csv"
+
+
+def test_upload_of_a_docx_document(monkeypatch):
+    """Test that a DOCX upload goes through the registry into the index."""
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", "local")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        with open(write_docx(os.path.join(temp_dir, "contract.docx"), ["Warranty lasts two years."]), "rb") as f:
+            content = f.read()
+
+        document_id = asyncio.run(store.add_document(content, "contract.docx", "docx"))
+        assert store.state.get_document(document_id)["file_type"] == "docx"
+        assert "Warranty" in store.search_many(["warranty"], [document_id], k=1)[0][0][0].page_content
+        with pytest.raises(ValueError):
+            asyncio.run(store.add_document(b"MZ", "tool.exe", "exe"))
@@ -0,0 +1,41 @@
+"""
+Tests for the fake Ollama server used by benchmarks and load tests.
+"""
+import time
+import pytest
+from langchain_ollama import OllamaLLM
+from benchmarks.fake_ollama import FakeOllamaServer
+from app.core.ollama_models import get_ollama_models
+
+
+@pytest.fixture(scope="module")
+def server():
+    """Run a fast fake Ollama server for the tests in this module."""
+    with FakeOllamaServer(models=["test-model"], response="hello from fake ollama",
+                          tokens_per_second=0, first_token_delay=0) as running:
+        yield running
+
+
+def test_tags_lists_models(server):
+    """Test that the model list endpoint works with the app's client."""
+    assert get_ollama_models(server.url) == ["test-model"]
+
+
+def test_generate_streams_through_ollama_client(server):
+    """Test that OllamaLLM can generate against the fake server."""
+    llm = OllamaLLM(model="test-model", base_url=server.url)
+    result = llm.generate(["What is in the document?"])
+    generation = result.generations[0][0]
+    assert generation.text == "hello from fake ollama"
+    assert generation.generation_info["eval_count"] == 4
+    assert generation.generation_info["prompt_eval_count"] == 5
+
+
+def test_first_token_delay_is_applied():
+    """Test that the configured first-token delay is honoured."""
+    with FakeOllamaServer(models=["test-model"], response="ok",
+                          tokens_per_second=0, first_token_delay=0.3) as slow:
+        llm = OllamaLLM(model="test-model", base_url=slow.url)
+        start = time.perf_counter()
+        llm.invoke("hi")
+        assert time.perf_counter() - start >= 0.3
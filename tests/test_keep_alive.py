@@ -0,0 +1,25 @@
+"""
+Tests for Ollama model prewarming and keep-alive.
+"""
+from benchmarks.fake_ollama import FakeOllamaServer
+from app.core.keep_alive import get_keep_alive, prewarm_model
+
+
+def test_get_keep_alive_parses_numbers():
+    """Test that numeric keep_alive settings are sent as seconds and durations are passed through."""
+    assert get_keep_alive({"ollama_keep_alive": "-1"}) == -1
+    assert get_keep_alive({"ollama_keep_alive": "600"}) == 600
+    assert get_keep_alive({"ollama_keep_alive": "1h"}) == "1h"
+
+
+def test_prewarm_loads_model_once_and_reports_failures():
+    """Test that prewarming loads the model and that unreachable servers are reported."""
+    with FakeOllamaServer(models=["warm-model"], load_delay=0.2) as server:
+        results = prewarm_model("warm-model", [server.url, "http://127.0.0.1:1/"], timeout=5)
+        assert results == {server.url: True, "http://127.0.0.1:1/": False}
+        assert server.stats["loads"] == 1
+        assert "warm-model" in server.app.state.loaded
+
+        # A second ping only refreshes the keep-alive timer
+        prewarm_model("warm-model", [server.url], timeout=5)
+        assert server.stats["loads"] == 1
@@ -0,0 +1,157 @@
+"""
+Tests for index maintenance (consistency check, compaction and rebuilds).
+"""
+import tempfile
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+
+import app.core.document_store as document_store_module
+from app.api import admin_routes
+from app.core.maintenance import MaintenanceInProgressError, _running, check_index, compact_index
+from app.core.vector_index import LocalIndex
+from benchmarks.common import HashingEmbeddings
+
+
+def _fill(store, count=12):
+    for i in range(count):
+        store._index_documents(
+            f"doc-{i}", f"{i}.txt", "txt",
+            [Document(page_content=f"Document {i} explains refunds after {i} days. " * 30)],
+            group="g" if i % 3 == 0 else None,
+        )
+    for i in range(0, count, 2):
+        assert store.delete_document(f"doc-{i}")
+    # Chunks whose document has no metadata, and metadata whose chunks are gone
+    store._get_collection("langchain").add_documents([Document(page_content="stray", metadata={"document_id": "ghost"})])
+    store.state.put_document("lost", {"file_name": "lost.txt", "chunk_count": 2, "collection": "langchain"})
+
+
+def _ranking(hits):
+    """Best chunk and all distances (chunks at equal distances may come in any order)."""
+    return hits[0][0].id, [round(distance, 4) for _, distance in hits]
+
+
+def _hits(store, query="refunds after 7 days"):
+    return _ranking(store.search_many([query], k=3)[0])
+
+
+@pytest.mark.parametrize("backend", ["local", "chroma"])
+def test_compaction_cleans_up_and_keeps_search_results(monkeypatch, backend):
+    """Test that compaction fixes what the check reports, shrinks the store and keeps results."""
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", backend)
+    monkeypatch.setitem(document_store_module.app_config, "local_index_search", "hnsw")
+    monkeypatch.setitem(document_store_module.app_config, "exact_search_max_chunks", 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        # Another worker's store, still holding the collections being rebuilt
+        other = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        _fill(store)
+        expected = _hits(other)
+
+        report = check_index(store)
+        assert not report["consistent"]
+        assert report["missing_documents"] == ["lost"]
+        assert report["orphaned_documents"] == [{"document_id": "ghost", "collection": "langchain", "chunks": 1}]
+        assert set(report["collections"]) == {"langchain", "group-g"}
+
+        assert compact_index(store, dry_run=True)["rebuilt"] == {}
+        assert not check_index(store)["consistent"]
+
+        result = compact_index(store, remove_missing=True)
+        assert result["removed_orphaned_chunks"] == 1 and result["removed_documents"] == ["lost"]
+        assert set(result["rebuilt"]) == {"langchain", "group-g"}
+        assert result["size_after"]["total_bytes"] < result["size_before"]["total_bytes"]
+        assert check_index(store)["consistent"]
+        assert _hits(store) == expected
+        assert _hits(other) == expected
+
+
+def test_rebuild_changes_quantization_under_concurrent_searches():
+    """Test that searches keep returning correct chunks while the rows are renumbered."""
+    embeddings = HashingEmbeddings()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = LocalIndex(temp_dir, embeddings, search="hnsw")
+        index.add_documents([
+            Document(page_content=f"Clause {i} covers topic {i % 9}.", metadata={"document_id": f"doc-{i % 6}"})
+            for i in range(300)
+        ])
+        for document_id in ("doc-0", "doc-2", "doc-4"):
+            index.delete_document(document_id)
+        # A second instance stands for another worker process
+        reader = LocalIndex(temp_dir, embeddings, search="exact")
+        query = embeddings.embed_query("topic 4")
+        expected = _ranking(reader.query([query], 5)[0])
+
+        errors, stop = [], threading.Event()
+
+        def search():
+            while not stop.is_set():
+                hits = reader.query([query], 5, where={"document_id": {"$in": ["doc-1", "doc-3", "doc-5"]}})[0]
+                if _ranking(hits) != expected:
+                    errors.append(hits)
+
+        thread = threading.Thread(target=search)
+        thread.start()
+        try:
+            assert index.rebuild(quantization="int8") == {"rows_before": 300, "chunks": 150, "quantization": "int8"}
+        finally:
+            stop.set()
+            thread.join()
+        assert not errors
+        assert reader.quantization == "int8" and reader.stats()["rows"] == 150
+        assert _ranking(index.query([query], 5)[0]) == expected
+
+
+def test_chroma_readers_find_the_rebuilt_collection_before_it_is_renamed(monkeypatch):
+    """Test that another worker keeps searching while no collection has the live name."""
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", "chroma")
+    monkeypatch.setitem(document_store_module.app_config, "exact_search_max_chunks", 0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        other = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        _fill(store)
+        expected = _hits(other)
+
+        # The swap of a rebuild, stopped while the copy still has its temporary name
+        index = store._get_collection("langchain")
+        client, collection = index.db._client, index.db._collection
+        rebuilt = client.create_collection(f"rebuild-{collection.id}")
+        for page in index._pages(collection, ["embeddings", "documents", "metadatas"]):
+            rebuilt.add(ids=page["ids"], embeddings=page["embeddings"], documents=page["documents"],
+                        metadatas=page["metadatas"])
+        collection.modify(name=f"old-{collection.id}")
+        client.delete_collection(f"old-{collection.id}")
+        assert _hits(other) == expected
+
+        rebuilt.modify(name="langchain")
+        assert _hits(other) == expected
+
+
+def test_admin_routes_require_the_token_and_reject_concurrent_runs(monkeypatch):
+    """Test the admin token check and the 409 returned while maintenance is running."""
+    from app.main import app
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+
+        async def get_store():
+            return store
+
+        monkeypatch.setattr(admin_routes, "get_document_store_async", get_store)
+        monkeypatch.setattr(admin_routes, "get_app_config", lambda: {"admin_token": "secret"})
+        client = TestClient(app)
+        assert client.get("/api/admin/index/check").status_code == 401
+        response = client.get("/api/admin/index/check", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200 and response.json()["consistent"]
+        response = client.post("/api/admin/index/compact", json={"quantization": "int8"},
+                               headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 400
+
+        with _running:
+            with pytest.raises(MaintenanceInProgressError):
+                compact_index(store)
+            response = client.post("/api/admin/index/compact", json={}, headers={"X-Admin-Token": "secret"})
+            assert response.status_code == 409
@@ -0,0 +1,48 @@
+"""
+Tests for the metrics module.
+"""
+import pytest
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_counter_render():
+    """Test that counters render with labels in the text format."""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("test_total", "A test counter.", ["cache", "result"]))
+    counter.inc(cache="memory", result="hit")
+    counter.inc(2, cache="memory", result="miss")
+
+    output = registry.render()
+    assert "# TYPE test_total counter" in output
+    assert 'test_total{cache="memory",result="hit"} 1' in output
+    assert 'test_total{cache="memory",result="miss"} 2' in output
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets, sum and count are rendered correctly."""
+    histogram = Histogram("test_seconds", "A test histogram.", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="retrieval")
+    histogram.observe(0.5, stage="retrieval")
+    histogram.observe(5, stage="retrieval")
+
+    output = histogram.render()
+    assert 'test_seconds_bucket{stage="retrieval",le="0.1"} 1' in output
+    assert 'test_seconds_bucket{stage="retrieval",le="1"} 2' in output
+    assert 'test_seconds_bucket{stage="retrieval",le="+Inf"} 3' in output
+    assert 'test_seconds_count{stage="retrieval"} 3' in output
+    assert histogram.get_sum(stage="retrieval") == pytest.approx(5.55)
+
+
+def test_gauge_track_inprogress():
+    """Test that a gauge tracks in-progress work."""
+    gauge = Gauge("test_in_flight", "A test gauge.")
+    with gauge.track_inprogress():
+        assert gauge.get() == 1
+    assert gauge.get() == 0
+
+
+def test_metric_rejects_wrong_labels():
+    """Test that unknown label sets are rejected."""
+    counter = Counter("test_labels_total", "A test counter.", ["stage"])
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
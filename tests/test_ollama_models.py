@@ -0,0 +1,42 @@
+"""
+Tests for the cached Ollama model listing.
+"""
+import asyncio
+import pytest
+from benchmarks.fake_ollama import FakeOllamaServer
+from app.core.ollama_models import ModelListCache
+
+
+def test_model_list_cache_serves_stale_entries_while_refreshing():
+    """Test that a stale list is returned at once and refreshed in the background."""
+    async def scenario():
+        with FakeOllamaServer(models=["model-a"]) as server:
+            cache = ModelListCache(ttl=0)
+            first, second = await asyncio.gather(cache.get(server.url), cache.get(server.url))
+            assert first == second == ["model-a"]
+
+            server.app.state.settings.models = ["model-b"]
+            # The stale entry is served immediately; the refresh picks up the change
+            assert await cache.get(server.url) == ["model-a"]
+            await asyncio.sleep(0.2)
+            assert cache._entries[server.url][1] == ["model-b"]
+
+    asyncio.run(scenario())
+
+
+def test_model_list_cache_keeps_last_list_when_ollama_is_down():
+    """Test that a failed refresh keeps the cached list and an empty cache raises quickly."""
+    async def scenario():
+        server = FakeOllamaServer(models=["model-a"]).start()
+        url = server.url
+        cache = ModelListCache(ttl=0, timeout=0.5)
+        assert await cache.get(url) == ["model-a"]
+        server.stop()
+
+        assert await cache.get(url) == ["model-a"]
+        await asyncio.sleep(0.2)
+        assert await cache.get(url) == ["model-a"]
+        with pytest.raises(RuntimeError):
+            await ModelListCache(timeout=0.5).get(url)
+
+    asyncio.run(scenario())
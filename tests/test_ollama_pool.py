@@ -0,0 +1,94 @@
+"""
+Tests for routing LLM calls over several Ollama backends.
+"""
+import socket
+import pytest
+from benchmarks.fake_ollama import FakeOllamaServer
+from app.core.llm import PooledOllamaLLM
+from app.core.ollama_pool import OllamaPool, OllamaUnavailableError
+
+
+def _dead_url() -> str:
+    """Return the URL of a local port nothing listens on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+@pytest.fixture(scope="module")
+def servers():
+    """Two fast fake Ollama servers with different models."""
+    with FakeOllamaServer(models=["shared", "only-a"], response="from a", tokens_per_second=0, first_token_delay=0) as a, \
+         FakeOllamaServer(models=["shared"], response="from b", tokens_per_second=0, first_token_delay=0) as b:
+        yield a, b
+
+
+def test_pool_prefers_least_outstanding_backend(servers):
+    """Test that requests go to the backend with the fewest outstanding calls."""
+    a, b = servers
+    pool = OllamaPool([a.url, b.url])
+    first = pool.choose("shared")
+    second = pool.choose("shared")
+    assert {first.url, second.url} == {a.url, b.url}
+    pool.release(first, success=True)
+    pool.release(second, success=True)
+
+
+def test_pool_routes_by_model(servers):
+    """Test that a model only present on one backend is routed there."""
+    a, b = servers
+    llm = PooledOllamaLLM(pool=OllamaPool([b.url, a.url]), model="only-a")
+    calls_to_b = b.stats["generate"]
+    for _ in range(3):
+        assert llm.invoke("hello") == "from a"
+    assert b.stats["generate"] == calls_to_b
+
+
+def test_pool_fails_over_and_opens_circuit(servers):
+    """Test that a dead backend is skipped and taken out of rotation."""
+    a, _ = servers
+    dead = _dead_url()
+    pool = OllamaPool([dead, a.url], failure_threshold=2, cooldown=60)
+    dead_backend = pool.backends[0]
+    # Pretend the dead backend advertised the model so generations are sent to it
+    dead_backend.models = {"shared:latest"}
+    dead_backend.models_checked_at = float("inf")
+    llm = PooledOllamaLLM(pool=pool, model="shared")
+    answers = {llm.invoke("hello") for _ in range(4)}
+    assert answers == {"from a"}
+    assert dead_backend.circuit_open
+    assert dead_backend.outstanding == 0
+
+
+def test_pool_raises_when_no_backend_is_available():
+    """Test that an open circuit on every backend is reported as unavailable."""
+    pool = OllamaPool([_dead_url()], failure_threshold=1, cooldown=60)
+    backend = pool.choose()
+    pool.release(backend, success=False)
+    with pytest.raises(OllamaUnavailableError):
+        pool.choose()
+
+
+def test_failed_model_lists_are_not_requested_on_every_call(servers, monkeypatch):
+    """Test that a backend whose /api/tags fails with a server error is asked again only after the TTL."""
+    import httpx
+    import app.core.ollama_pool as ollama_pool_module
+
+    a, _ = servers
+    broken = "http://broken.invalid/"
+    requested = []
+    real_get = httpx.get
+
+    def get(url, **kwargs):
+        if url.startswith(broken):
+            requested.append(url)
+            return httpx.Response(500, request=httpx.Request("GET", url))
+        return real_get(url, **kwargs)
+
+    monkeypatch.setattr(ollama_pool_module.httpx, "get", get)
+    pool = OllamaPool([broken, a.url], tags_ttl=60)
+    for _ in range(5):
+        pool.release(pool.choose("shared"), success=True)
+    assert len(requested) == 1
+    assert pool.backends[0].models is None and not pool.backends[0].circuit_open
@@ -0,0 +1,49 @@
+"""
+Tests for prompt assembly and prefix reuse tracking.
+"""
+import random
+
+from langchain_core.documents import Document
+
+from app.core.chunking import get_chunking_profile, split_documents
+from app.core.prompting import QA_PROMPT, PrefixReuseTracker, stable_order
+
+
+def _chunk(file_name, start, text):
+    return Document(page_content=text, metadata={"file_name": file_name, "start_index": start})
+
+
+def test_stable_order_gives_the_same_prompt_for_the_same_chunks():
+    """Test that chunks retrieved in a different relevance order produce an identical prompt."""
+    chunks = [_chunk("b.txt", 0, "B1"), _chunk("a.txt", 300, "A2"), _chunk("a.txt", 0, "A1")]
+    first = stable_order(chunks)
+    second = stable_order(list(reversed(chunks)))
+    assert [doc.page_content for doc in first] == ["A1", "A2", "B1"]
+    assert first == second
+
+
+def test_stable_order_restores_the_order_of_split_pages():
+    """Test that shuffled chunks from the splitter are put back in reading order."""
+    pages = [
+        Document(page_content=" ".join(f"Page {page} sentence {i} covers the payment terms." for i in range(60)),
+                 metadata={"file_name": "contract.pdf", "page": page})
+        for page in range(3)
+    ]
+    chunks = split_documents(pages, profile=get_chunking_profile("pdf", {"chunk_size": 200, "chunk_overlap": 20}))
+    shuffled = list(chunks)
+    random.Random(0).shuffle(shuffled)
+    assert [doc.page_content for doc in stable_order(shuffled)] == [doc.page_content for doc in chunks]
+
+
+def test_prefix_reuse_tracker_reports_shared_prefix_per_key():
+    """Test that reuse is measured against the previous prompt of the same key only."""
+    tracker = PrefixReuseTracker(max_keys=2)
+    context = "\n\n".join(["Clause 1", "Clause 2"])
+    first = QA_PROMPT.format(context=context, question="Who signs?")
+    second = QA_PROMPT.format(context=context, question="When does it end?")
+
+    assert tracker.observe("conversation-1", first) is None
+    ratio = tracker.observe("conversation-1", second)
+    assert 0.5 < ratio < 1
+    assert second[:int(ratio * len(second))] in first
+    assert tracker.observe("conversation-2", second) is None
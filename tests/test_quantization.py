@@ -0,0 +1,44 @@
+"""
+Tests for quantization module.
+"""
+import numpy as np
+
+from app.core.hnsw import distances as distances_to
+from app.core.index_router import exact_search
+from app.core.quantization import dequantize_int8, quantize_int8, quantized_search, rescore, squared_norms
+
+
+def test_int8_codes_approximate_the_vectors():
+    """Test that int8 codes with per-row scales reconstruct vectors closely."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(100, 64)).astype(np.float32) * rng.uniform(0.01, 10, size=(100, 1))
+    vectors[0] = 0
+    codes, scales = quantize_int8(vectors)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    error = np.abs(dequantize_int8(codes, scales) - vectors).max(axis=1)
+    assert (error <= scales / 2 + 1e-6).all()
+    assert not dequantize_int8(codes[0], scales[0]).any()
+
+
+def test_quantized_search_with_rescoring_matches_exact_search(monkeypatch):
+    """Test that re-scored int8 search returns exact distances and nearly all exact neighbours."""
+    import app.core.quantization as quantization
+
+    # Several blocks, to cover merging candidates across blocks
+    monkeypatch.setattr(quantization, "SEARCH_BLOCK_ROWS", 700)
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(3000, 48)).astype(np.float32)
+    queries = rng.normal(size=(20, 48)).astype(np.float32)
+    codes, scales = quantize_int8(vectors)
+
+    for space in ("l2", "cosine", "ip"):
+        expected_rows, expected_distances = exact_search(queries, vectors, 10, space)
+        candidates, _ = quantized_search(queries, codes, scales, squared_norms(codes, scales), 40, space)
+        rows, distances = rescore(queries, candidates, vectors, 10, space)
+        recall = np.mean([len(set(found) & set(truth)) / 10 for found, truth in zip(rows, expected_rows)])
+        assert recall >= 0.95
+        # Re-scored distances are the exact ones
+        for query, found, found_distances in zip(queries, rows, distances):
+            assert np.allclose(found_distances, distances_to(query, vectors[found], space), atol=1e-4)
+            assert list(found_distances) == sorted(found_distances)
+        assert np.allclose(distances[0][0], expected_distances[0][0], atol=1e-4)
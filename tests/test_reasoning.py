@@ -0,0 +1,18 @@
+"""
+Tests for separating reasoning from model answers.
+"""
+from app.core.reasoning import split_reasoning, strip_reasoning
+
+
+def test_split_reasoning_separates_think_blocks():
+    """Test that <think> blocks are returned as reasoning and removed from the answer."""
+    assert split_reasoning("<think>\nLet me check.\n</think>\n\nThe answer is 42.") == ("Let me check.", "The answer is 42.")
+    assert split_reasoning("The answer is 42.") == (None, "The answer is 42.")
+    assert split_reasoning("<think></think>Done") == (None, "Done")
+
+
+def test_split_reasoning_handles_partial_tags():
+    """Test responses whose opening tag was in the prompt or that stop mid-reasoning."""
+    assert split_reasoning("Checking the text.</think>It is Tuesday.") == ("Checking the text.", "It is Tuesday.")
+    assert split_reasoning("<think>Still thinking") == ("Still thinking", "")
+    assert strip_reasoning("<think>a</think>Part one. <think>b</think>Part two.") == "Part one. Part two."
@@ -0,0 +1,75 @@
+"""
+Tests for the LLM scheduler.
+"""
+import asyncio
+import pytest
+from app.core.scheduler import LLMScheduler, QueueFullError, QueueTimeoutError, PRIORITY_BATCH
+
+
+async def _hold(scheduler, order, name, conversation, release, priority=0):
+    async with scheduler.slot(conversation, priority):
+        order.append(name)
+        await release.wait()
+
+
+def test_scheduler_limits_in_flight_and_rejects_when_full():
+    """Test that only max_in_flight requests run and extra ones beyond the queue are rejected."""
+    async def scenario():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+        first = asyncio.create_task(_hold(scheduler, order, "a", "c1", release))
+        second = asyncio.create_task(_hold(scheduler, order, "b", "c2", release))
+        await asyncio.sleep(0.01)
+        assert scheduler.in_flight == 1
+        assert scheduler.queued == 1
+        with pytest.raises(QueueFullError):
+            async with scheduler.slot("c3"):
+                pass
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["a", "b"]
+        assert scheduler.in_flight == 0 and scheduler.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_times_out_waiting_requests():
+    """Test that a request waiting longer than the queue timeout is rejected and leaves no trace."""
+    async def scenario():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, [], "a", "c1", release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueTimeoutError):
+            async with scheduler.slot("c2"):
+                pass
+        assert scheduler.queued == 0
+        release.set()
+        await holder
+        assert scheduler.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_interleaves_conversations_and_honours_priority():
+    """Test that a busy conversation does not starve others and batch work goes last."""
+    async def scenario():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=10, queue_timeout=5)
+        gate = asyncio.Event()
+        order = []
+        tasks = [asyncio.create_task(_hold(scheduler, order, "busy-0", "busy", gate))]
+        await asyncio.sleep(0.01)
+        for name, conversation, priority in [
+            ("batch", "batch", PRIORITY_BATCH),
+            ("busy-1", "busy", 0),
+            ("busy-2", "busy", 0),
+            ("other", "other", 0),
+        ]:
+            tasks.append(asyncio.create_task(_hold(scheduler, order, name, conversation, gate, priority)))
+            await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["busy-0", "other", "busy-1", "busy-2", "batch"]
+
+    asyncio.run(scenario())
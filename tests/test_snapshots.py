@@ -0,0 +1,90 @@
+"""
+Tests for incremental snapshots and restores.
+"""
+import os
+import tempfile
+
+import pytest
+from langchain_core.documents import Document
+
+import app.core.document_store as document_store_module
+import app.core.snapshots as snapshots_module
+from app.core.snapshots import SnapshotStore, snapshot_document_store
+from benchmarks.common import HashingEmbeddings
+
+
+def _add(store, start, stop):
+    for i in range(start, stop):
+        store._index_documents(f"doc-{i}", f"{i}.txt", "txt",
+                               [Document(page_content=f"Document {i} explains warranty claim {i}. " * 40)])
+
+
+def _search(store):
+    return [(doc.id, round(distance, 4)) for doc, distance in store.search_many(["warranty claim 3"], k=3)[0]]
+
+
+@pytest.mark.parametrize("backend", ["local", "chroma"])
+def test_snapshots_are_incremental_and_restore_the_full_state(monkeypatch, backend):
+    """Test that a restored snapshot serves the same searches, metadata and conversations."""
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", backend)
+    monkeypatch.setattr(snapshots_module, "BLOCK_SIZE", 4096)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(
+            persist_directory=os.path.join(temp_dir, "db"), embeddings=HashingEmbeddings()
+        )
+        snapshots = SnapshotStore(os.path.join(temp_dir, "snapshots"))
+        _add(store, 0, 6)
+        store.state.append_messages("conversation-1", [("human", "hi"), ("ai", "hello")])
+        first = snapshot_document_store(store, snapshots, "first")
+        # Identical blocks (e.g. zero-filled pages) are stored once
+        assert 0 < first["stored_bytes"] <= first["bytes"]
+
+        _add(store, 6, 8)
+        second = snapshot_document_store(store, snapshots)
+        # Only the blocks that changed are stored again
+        assert 0 < second["stored_bytes"] < second["bytes"] / 2
+        assert [snapshot["name"] for snapshot in snapshots.list()] == ["first", second["name"]]
+        with pytest.raises(ValueError):
+            snapshot_document_store(store, snapshots, "first")
+
+        restored_dir = os.path.join(temp_dir, "replica")
+        result = snapshots.restore("latest", restored_dir)
+        assert result["name"] == second["name"] and result["previous"] is None
+        replica = document_store_module.DocumentStore(persist_directory=restored_dir, embeddings=HashingEmbeddings())
+        assert _search(replica) == _search(store)
+        assert set(replica.list_documents()) == set(store.list_documents())
+        assert replica.state.get_messages("conversation-1") == [("human", "hi"), ("ai", "hello")]
+
+        # Going back in time needs force, and keeps the replaced contents aside
+        other_dir = os.path.join(temp_dir, "older")
+        snapshots.restore("latest", other_dir)
+        with pytest.raises(FileExistsError):
+            snapshots.restore("first", other_dir)
+        assert snapshots.restore("first", other_dir, force=True)["previous"] == f"{other_dir}.before-restore"
+        older = document_store_module.DocumentStore(persist_directory=other_dir, embeddings=HashingEmbeddings())
+        assert len(older.list_documents()) == 6
+
+        pruned = snapshots.prune(keep=1)
+        assert pruned["deleted"] == ["first"] and pruned["blocks"] > 0
+        snapshots.restore("latest", os.path.join(temp_dir, "after-prune"))
+
+
+def test_restore_rejects_corrupt_blocks():
+    """Test that a damaged block fails the restore without touching the target."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "source")
+        os.makedirs(source)
+        with open(os.path.join(source, "vectors.f32"), "wb") as f:
+            f.write(os.urandom(10000))
+        snapshots = SnapshotStore(os.path.join(temp_dir, "snapshots"))
+        manifest = snapshots.load(snapshots.create(source, "one")["name"])
+        digest = manifest["files"]["vectors.f32"]["blocks"][0]
+        with open(snapshots._object_path(digest), "r+b") as f:
+            f.write(b"x")
+
+        target = os.path.join(temp_dir, "target")
+        with pytest.raises(ValueError):
+            snapshots.restore("one", target)
+        assert not os.path.exists(target)
+        # The staging directory was cleaned up too
+        assert set(os.listdir(temp_dir)) == {"source", "snapshots"}
@@ -0,0 +1,75 @@
+"""
+Tests for the shared SQLite state store.
+"""
+import json
+import multiprocessing
+import os
+import pytest
+from app.core.state_store import StateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a state store in a temporary directory."""
+    state = StateStore(str(tmp_path / "app_state.db"))
+    yield state
+    state.close()
+
+
+def _append_turns(path, worker, turns):
+    state = StateStore(path)
+    for i in range(turns):
+        state.append_messages("shared", [("human", f"q{worker}-{i}"), ("ai", f"a{worker}-{i}")])
+    state.close()
+
+
+def test_conversation_round_trip(store):
+    """Test that messages are returned in the order they were appended."""
+    assert store.create_conversation("c1")
+    assert not store.create_conversation("c1")
+    store.append_messages("c1", [("human", "hello"), ("ai", "مرحبا")])
+    store.append_messages("c1", [("human", "again")])
+    assert store.get_messages("c1") == [("human", "hello"), ("ai", "مرحبا"), ("human", "again")]
+    assert store.list_conversation_ids() == ["c1"]
+
+
+def test_document_metadata(store):
+    """Test storing, listing and deleting document metadata."""
+    store.put_document("d1", {"file_name": "a.pdf", "chunk_count": 3})
+    assert store.list_documents() == {"d1": {"file_name": "a.pdf", "chunk_count": 3}}
+    assert store.delete_document("d1")
+    assert not store.delete_document("d1")
+    assert store.get_document("d1") is None
+
+
+def test_concurrent_writers_from_several_processes(tmp_path):
+    """Test that appends from several worker processes are neither lost nor interleaved within a turn."""
+    path = str(tmp_path / "app_state.db")
+    StateStore(path).close()
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_append_turns, args=(path, w, 20)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    messages = StateStore(path).get_messages("shared")
+    assert len(messages) == 4 * 20 * 2
+    for question, answer in zip(messages[::2], messages[1::2]):
+        assert question[0] == "human" and answer[0] == "ai"
+        assert question[1][1:] == answer[1][1:]
+
+
+def test_import_legacy_files(store, tmp_path):
+    """Test that the JSON files of earlier versions are imported and set aside."""
+    conversations = tmp_path / "conversation_store.json"
+    conversations.write_text(json.dumps({"old": [{"type": "human", "content": "hi"}]}))
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text(json.dumps({"doc": {"file_name": "a.txt"}}))
+
+    assert store.import_legacy_conversations(str(conversations)) == 1
+    assert store.import_legacy_conversations(str(conversations)) == 0
+    assert store.import_legacy_documents(str(metadata)) == 1
+    assert store.get_messages("old") == [("human", "hi")]
+    assert os.path.exists(str(metadata) + ".migrated")
@@ -0,0 +1,38 @@
+"""
+Tests for request tracing and correlation IDs.
+"""
+import logging
+from app.core.tracing import RequestTrace
+from app.utils.request_context import RequestIdFilter, new_request_id, set_request_id, reset_request_id
+
+
+def test_request_id_filter_uses_current_request_id():
+    """Test that log records carry the correlation ID of the current request."""
+    token = set_request_id("req-1")
+    try:
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+        RequestIdFilter().filter(record)
+        assert record.request_id == "req-1"
+    finally:
+        reset_request_id(token)
+
+
+def test_new_request_id_rejects_unusable_header():
+    """Test that oversized or non-printable incoming IDs are replaced."""
+    assert new_request_id("abc") == "abc"
+    assert new_request_id("x" * 500) != "x" * 500
+    assert new_request_id("bad\nid") != "bad\nid"
+
+
+def test_request_trace_accumulates_stages():
+    """Test that repeated stages are accumulated in the breakdown."""
+    trace = RequestTrace(request_id="req-2")
+    trace.add("llm_total", 0.5)
+    trace.add("llm_total", 0.25)
+    with trace.stage("memory_load"):
+        pass
+
+    result = trace.to_dict()
+    assert result["request_id"] == "req-2"
+    assert result["timings"]["llm_total"] == 0.75
+    assert "memory_load" in result["timings"]
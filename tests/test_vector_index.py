@@ -0,0 +1,188 @@
+"""
+Tests for the vector_index and hnsw modules.
+"""
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.core.hnsw import HNSWGraph
+from app.core.index_router import exact_search
+from app.core.vector_index import LocalIndex, where_to_sql
+from benchmarks.common import HashingEmbeddings
+
+
+def _chunks(count):
+    return [
+        Document(page_content=f"Section {i} covers topic {i % 7} and clause {i % 5}.",
+                 metadata={"document_id": f"doc-{i % 3}", "page": i % 4})
+        for i in range(count)
+    ]
+
+
+def test_hnsw_graph_finds_nearest_neighbours_and_survives_reload(tmp_path):
+    """Test HNSW recall against exact search, with and without a row filter."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 32)).astype(np.float32)
+    queries = rng.normal(size=(20, 32)).astype(np.float32)
+    graph = HNSWGraph("l2")
+    for row in range(len(vectors)):
+        graph.insert(vectors, row)
+
+    expected, _ = exact_search(queries, vectors, 10)
+    recall = np.mean([
+        len(set(graph.search(vectors, query, 10)[0]) & set(rows)) / 10 for query, rows in zip(queries, expected)
+    ])
+    assert recall >= 0.9
+
+    allowed = np.zeros(len(vectors), dtype=bool)
+    allowed[::4] = True
+    rows, distances = graph.search(vectors, queries[0], 5, allowed=allowed)
+    assert allowed[rows].all()
+    assert list(distances) == sorted(distances)
+
+    graph.save(str(tmp_path / "hnsw.npz"))
+    reloaded = HNSWGraph.load(str(tmp_path / "hnsw.npz"))
+    assert (reloaded.search(vectors, queries[1], 10)[0] == graph.search(vectors, queries[1], 10)[0]).all()
+
+
+def test_hnsw_searches_while_rows_are_added():
+    """Test that searches through a view skip rows inserted after it, on the graph and the local index."""
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    graph = HNSWGraph("l2")
+    for row in range(200):
+        graph.insert(vectors, row)
+    view = graph.view()
+    for row in range(200, 400):
+        graph.insert(vectors, row)
+    rows, _ = graph.search(vectors[:200], vectors[300], 10, view=view)
+    assert len(rows) == 10 and (rows < 200).all()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = LocalIndex(temp_dir, HashingEmbeddings(size=16), search="hnsw")
+        index.add_vectors([f"c{i}" for i in range(100)], ["text"] * 100, [{}] * 100, vectors[:100])
+        errors = []
+        done = threading.Event()
+
+        def search():
+            while not done.is_set():
+                try:
+                    assert len(index.query(vectors[rng.integers(0, 100, size=2)].tolist(), 5)[0]) == 5
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        threads = [threading.Thread(target=search) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        try:
+            for start in range(100, 400, 25):
+                index.add_vectors([f"c{i}" for i in range(start, start + 25)], ["text"] * 25, [{}] * 25,
+                                  vectors[start:start + 25])
+        finally:
+            done.set()
+            for thread in threads:
+                thread.join()
+        assert not errors, errors[0]
+        assert index.count() == 400
+
+
+def test_where_to_sql_translates_chroma_filters():
+    """Test the translation of Chroma filters and the rejection of unsupported ones."""
+    sql, params = where_to_sql({"$or": [{"document_id": {"$in": ["a", "b"]}}, {"page": {"$gte": 2}}]})
+    assert sql == "((document_id IN (?, ?)) OR (json_extract(metadata, ?) >= ?))"
+    assert params == ["a", "b", '$."page"', 2]
+    for where in ({"$bogus": 1}, {"page": {"$like": "x"}}, {"$and": []}, {"page": {"$in": 3}}):
+        with pytest.raises(ValueError):
+            where_to_sql(where)
+
+
+def _graph_files(directory):
+    return [name for name in os.listdir(directory) if name.startswith("hnsw")]
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_auto_search_builds_the_graph_past_exact_max_chunks(quantization):
+    """Test that auto mode leaves the HNSW graph unbuilt while every search is exact."""
+    embeddings = HashingEmbeddings()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = LocalIndex(temp_dir, embeddings, search="auto", exact_max_chunks=50, quantization=quantization)
+        chunks = _chunks(80)
+        index.add_documents(chunks[:45])
+        query = embeddings.embed_query("topic 3 clause 2")
+        assert index.query([query], 3)[0]
+        assert not _graph_files(temp_dir) and index._graph is None
+
+        index.add_documents(chunks[45:])
+        assert len(_graph_files(temp_dir)) == 1 and index._graph.size == 80
+        expected_rows, _ = exact_search(
+            np.array([query]), np.array(embeddings.embed_documents([c.page_content for c in chunks])), 1
+        )
+        assert index.query([query], 1)[0][0][0].page_content == chunks[expected_rows[0][0]].page_content
+
+        index.delete_document("doc-0")
+        index.delete_document("doc-1")
+        index.rebuild()
+        assert not _graph_files(temp_dir)
+        index.close()
+
+
+@pytest.mark.parametrize("search,quantization", [("exact", "none"), ("hnsw", "none"), ("exact", "int8"), ("hnsw", "int8")])
+def test_local_index_searches_filters_and_deletes(search, quantization):
+    """Test that the local index agrees with brute force, applies filters and persists."""
+    embeddings = HashingEmbeddings()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = LocalIndex(temp_dir, embeddings, search=search, quantization=quantization)
+        chunks = _chunks(90)
+        ids = index.add_documents(chunks)
+        assert index.count() == 90
+
+        query = embeddings.embed_query("topic 3 clause 2")
+        expected_rows, expected_distances = exact_search(
+            np.array([query]), np.array(embeddings.embed_documents([c.page_content for c in chunks])), 5
+        )
+        hits = index.query([query], 5)[0]
+        assert [round(distance, 4) for _, distance in hits] == [round(float(d), 4) for d in expected_distances[0]]
+        assert hits[0][0].id in {ids[row] for row in expected_rows[0]}
+
+        hits = index.query([query], 5, where={"$and": [{"document_id": "doc-1"}, {"page": {"$ne": 0}}]})[0]
+        assert hits and all(doc.metadata["document_id"] == "doc-1" and doc.metadata["page"] != 0 for doc, _ in hits)
+
+        document = index.get_document("doc-2")
+        assert len(document) == 30 and document.vectors.shape == (30, embeddings.size)
+
+        index.delete_document("doc-1")
+        assert index.count() == 60
+        assert all(doc.metadata["document_id"] != "doc-1" for doc, _ in index.query([query], 50)[0])
+        index.close()
+
+        # Reopening maps the same vectors (and HNSW graph) from disk
+        reopened = LocalIndex(temp_dir, embeddings, search=search)
+        assert reopened.count() == 60
+        assert reopened.quantization == quantization
+        assert reopened.query([query], 3)[0][0][0].id == index.query([query], 3)[0][0][0].id
+        with pytest.raises(ValueError):
+            reopened.add_vectors(["x"], ["x"], [{}], np.zeros((1, 3)))
+
+
+def test_document_store_uses_the_local_backend(monkeypatch):
+    """Test that the document store searches through the local engine when configured."""
+    import app.core.document_store as document_store_module
+
+    monkeypatch.setitem(document_store_module.app_config, "vector_backend", "local")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = document_store_module.DocumentStore(persist_directory=temp_dir, embeddings=HashingEmbeddings())
+        assert isinstance(store.index, LocalIndex) and store.db is None
+        store._index_documents("doc-1", "a.txt", "txt", [Document(page_content="Refunds take a week.")])
+        store._index_documents("doc-2", "b.txt", "txt", [Document(page_content="Refunds take a month.")], group="g")
+
+        hits = store.search_many(["refunds month"], k=2)[0]
+        assert [doc.metadata["document_id"] for doc, _ in hits] == ["doc-2", "doc-1"]
+        assert store.search_many(["refunds"], filters={"file_name": "a.txt"}, k=2)[0][0][0].metadata["document_id"] == "doc-1"
+        assert 0 < store.relevance_score_fn()(hits[0][1]) <= 1
+        assert store.delete_document("doc-2")
+        assert store.search_many(["refunds"], ["doc-2"], k=1) == [[]]
@@ -0,0 +1,46 @@
+"""
+Tests for fast startup and warm-up readiness.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from app.core import warmup
+
+
+def test_importing_app_does_not_load_heavy_modules(tmp_path):
+    """Test that importing the app defers torch, the embedding model and Chroma."""
+    with open(tmp_path / "settings.json", "w") as f:
+        json.dump({"chroma_persist_dir": str(tmp_path / "chroma_db")}, f)
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    completed = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, app.main; print(sorted(m for m in ('torch', 'sentence_transformers', 'chromadb') if m in sys.modules))"],
+        cwd=tmp_path, env=dict(os.environ, PYTHONPATH=project_root), capture_output=True, text=True, check=True
+    )
+    assert completed.stdout.strip() == "[]"
+
+
+def test_readiness_waits_for_required_steps(monkeypatch):
+    """Test that a failed required step keeps the app unready while optional failures do not."""
+    def fail():
+        raise RuntimeError("boom")
+
+    steps = [
+        warmup.WarmupStep("ok", lambda: None),
+        warmup.WarmupStep("optional", fail, required=False),
+        warmup.WarmupStep("required", fail),
+    ]
+    monkeypatch.setattr(warmup, "WARMUP_STEPS", steps)
+    monkeypatch.setattr(warmup, "get_warmup_mode", lambda: "background")
+
+    assert not warmup.is_ready()
+    assert asyncio.run(warmup.run_warmup()) is False
+    report = warmup.readiness_report()
+    assert report["steps"]["ok"]["status"] == "ready"
+    assert report["steps"]["required"]["error"] == "boom"
+
+    steps[2].func = lambda: None
+    assert asyncio.run(warmup.run_warmup()) is True
+    assert warmup.is_ready()